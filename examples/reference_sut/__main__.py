@@ -0,0 +1,50 @@
+"""Multi-worker launcher for the reference SUT.
+
+    python -m examples.reference_sut --workers 4 --port 8001
+
+Runs uvicorn with N worker processes that behave as one logical registry: they share
+rate-limit buckets, the decision cache and the signing key set through files in
+`TSPP_REF_SHARED_DIR` (a fresh directory under /dev/shm unless one is given).
+All other configuration is read from the usual `TSPP_REF_*` environment variables.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import tempfile
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m examples.reference_sut", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    given = os.environ.get("TSPP_REF_SHARED_DIR")
+    if given:
+        shared_dir: "contextlib.AbstractContextManager[str]" = contextlib.nullcontext(given)
+    else:
+        shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        # Removed, with the segments in it, when the server exits.
+        shared_dir = tempfile.TemporaryDirectory(prefix="tspp-ref-", dir=shm)
+    with shared_dir as path:
+        # Workers are spawned processes; they inherit the environment set here.
+        os.environ["TSPP_REF_SHARED_DIR"] = path
+        uvicorn.run(
+            "examples.reference_sut.app:app",
+            host=args.host,
+            port=args.port,
+            workers=max(1, args.workers),
+            log_level=args.log_level,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,31 +5,227 @@ import hashlib
 import json
 import os
 import time
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple
 
 from fastapi import FastAPI, Header, HTTPException, Request
-from fastapi.responses import JSONResponse
-from jwcrypto import jwk, jws
+from fastapi.responses import Response, StreamingResponse
+from starlette.requests import ClientDisconnect
+from tspp_trqp_harness.jcs import canonicalize
+
+from . import cbor, render
+from .cache import DecisionCache
+from .changes import ChangeLog
+from .documents import DocumentCache, RenderedDocument, etag_matches
+from .history import parse_time
+from .merkle import MerkleBatchSigner
+from .policy import PolicyEngine
+from .ratelimit import TokenBucketLimiter
+from .recognition import RecognitionGraph
+from .render import Answer, SecondClock
+from .signing import KeySet, SignerSaturated, SigningPool, detached_requested, parse_accept_signature
+from .singleflight import Singleflight
+from .snapshot import FORMAT as SNAPSHOT_FORMAT, SnapshotPublisher
+from .store import DecisionStore
+from .tokens import AccessTokenVerifier, TokenRejected
+from .upstream import CircuitBreaker, HTTPPool, UpstreamBatcher, UpstreamError
 
 APP_VERSION = "0.2.0"
 
 ASSURANCE_LEVEL = os.environ.get("TSPP_REF_AL", os.environ.get("TSPP_EXPECT_AL", "AL1"))
 BEARER_TOKEN = os.environ.get("TSPP_REF_BEARER_TOKEN", "dev-token")
+AUTH_JWKS = os.environ.get("TSPP_REF_AUTH_JWKS")
+AUTH_ISSUER = os.environ.get("TSPP_REF_AUTH_ISSUER")
+AUTH_AUDIENCE = os.environ.get("TSPP_REF_AUTH_AUDIENCE", "urn:example:trqp-reference-sut")
+AUTH_JWKS_REFRESH_SECONDS = float(os.environ.get("TSPP_REF_AUTH_JWKS_REFRESH", "300"))
+AUTH_JWKS_MIN_REFRESH_SECONDS = float(os.environ.get("TSPP_REF_AUTH_JWKS_MIN_REFRESH", "1"))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get("TSPP_REF_AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_LEEWAY_SECONDS = float(os.environ.get("TSPP_REF_AUTH_LEEWAY", "30"))
 RATE_LIMIT_BURST = int(os.environ.get("TSPP_REF_RL_BURST", "999999"))
-RATE_LIMIT_WINDOW_SECONDS = int(os.environ.get("TSPP_REF_RL_WINDOW", "60"))
+RATE_LIMIT_CLIENT_RPS = int(os.environ.get("TSPP_REF_RL_CLIENT_RPS", "100"))
+RATE_LIMIT_IP_RPS = int(os.environ.get("TSPP_REF_RL_IP_RPS", "100"))
+RATE_LIMIT_SHARDS = int(os.environ.get("TSPP_REF_RL_SHARDS", "64"))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("TSPP_REF_RL_MAX_KEYS", "100000"))
+SIGNING_EXECUTOR = os.environ.get("TSPP_REF_SIGNING_EXECUTOR", "thread")
+SIGNING_WORKERS = int(os.environ.get("TSPP_REF_SIGNING_WORKERS", "0")) or None
+SIGNING_QUEUE = int(os.environ.get("TSPP_REF_SIGNING_QUEUE", "0")) or None
+SIGNING_ALGORITHMS = [a.strip() for a in os.environ.get("TSPP_REF_SIGNING_ALGS", "RS256,ES256,EdDSA").split(",")]
+SIGNING_BATCH_MS = float(os.environ.get("TSPP_REF_SIGNING_BATCH_MS", "0"))
+SIGNING_BATCH_MAX = int(os.environ.get("TSPP_REF_SIGNING_BATCH_MAX", "1024"))
+CACHE_MAX_ENTRIES = int(os.environ.get("TSPP_REF_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.environ.get("TSPP_REF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+COALESCE_ENABLED = os.environ.get("TSPP_REF_COALESCE", "1") != "0"
+BATCH_MAX_ITEMS = int(os.environ.get("TSPP_REF_BATCH_MAX_ITEMS", "100"))
+MATRIX_MAX_CELLS = int(os.environ.get("TSPP_REF_MATRIX_MAX_CELLS", "10000"))
+STREAM_CONCURRENCY = max(1, int(os.environ.get("TSPP_REF_STREAM_CONCURRENCY", "32")))
+STREAM_MAX_LINE_BYTES = int(os.environ.get("TSPP_REF_STREAM_MAX_LINE_BYTES", "65536"))
+DECISION_STORE_PATH = os.environ.get("TSPP_REF_DECISION_STORE")
+DECISION_DB_PATH = os.environ.get("TSPP_REF_DECISION_DB")
+DECISION_DB_READERS = int(os.environ.get("TSPP_REF_DECISION_DB_READERS", "4"))
+POLICY_PATH = os.environ.get("TSPP_REF_POLICY")
+POLICY_RELOAD_SECONDS = float(os.environ.get("TSPP_REF_POLICY_RELOAD_SECONDS", "2"))
+RECOGNITION_GRAPH_PATH = os.environ.get("TSPP_REF_RECOGNITION_GRAPH")
+RECOGNITION_MAX_DEPTH = int(os.environ.get("TSPP_REF_RECOGNITION_MAX_DEPTH", "1"))
+RECOGNITION_TRANSITIVE = os.environ.get("TSPP_REF_RECOGNITION_TRANSITIVE", "0") == "1"
+FEED_PAGE_MAX = max(1, int(os.environ.get("TSPP_REF_FEED_PAGE_MAX", "1000")))
+UPSTREAM_URL = os.environ.get("TSPP_REF_UPSTREAM_URL")
+UPSTREAM_BATCH_MS = float(os.environ.get("TSPP_REF_UPSTREAM_BATCH_MS", "2"))
+UPSTREAM_BATCH_MAX = int(os.environ.get("TSPP_REF_UPSTREAM_BATCH_MAX", "256"))
+UPSTREAM_POOL = int(os.environ.get("TSPP_REF_UPSTREAM_POOL", "8"))
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get("TSPP_REF_UPSTREAM_TIMEOUT", "2"))
+UPSTREAM_BUDGET_RESERVE_MS = float(os.environ.get("TSPP_REF_UPSTREAM_BUDGET_RESERVE_MS", "5"))
+UPSTREAM_HEDGE = os.environ.get("TSPP_REF_UPSTREAM_HEDGE", "1") != "0"
+UPSTREAM_BREAKER_FAILURES = int(os.environ.get("TSPP_REF_UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.environ.get("TSPP_REF_UPSTREAM_BREAKER_RESET", "5"))
+SNAPSHOT_MAX_AGE_SECONDS = int(os.environ.get("TSPP_REF_SNAPSHOT_MAX_AGE", "300"))
+SNAPSHOT_FP_RATE = float(os.environ.get("TSPP_REF_SNAPSHOT_FP_RATE", "0.01"))
+DOC_MAX_AGE_SECONDS = int(os.environ.get("TSPP_REF_DOC_MAX_AGE", "300"))
+SHARED_DIR = os.environ.get("TSPP_REF_SHARED_DIR")
+SHARED_CACHE_SLOT_BYTES = int(os.environ.get("TSPP_REF_SHARED_CACHE_SLOT_BYTES", "4096"))
+SIGNING_KEYS_FILE = os.environ.get("TSPP_REF_SIGNING_KEYS_FILE") or (
+    os.path.join(SHARED_DIR, "signing-keys.json") if SHARED_DIR else None
+)
+
+MAX_STALENESS_SECONDS = 120
+MAX_TOKEN_TTL_SECONDS = 900
+AUTHORIZATION_SCOPE = "trqp.authorization.query"
+RECOGNITION_SCOPE = "trqp.recognition.query"
+DEFAULT_EXPIRES_SECONDS = 300
+CONTEXT_ALLOWLIST = ["time_requested", "purpose", "audience", "locale"]
 
 JWKS_PATH = "/.well-known/jwks.json"
-KID = "ref-kid-1"
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl")
+
+PayloadBuilder = Callable[[], Awaitable[Answer]]
+
+# Response timestamps: second granularity, each second formatted once (see render.py).
+CLOCK = SecondClock()
+
+if SHARED_DIR:
+    # Multi-worker mode: every worker maps the same limiter and cache segments.
+    from .shared import SharedDecisionCache, SharedTokenBucketLimiter
+
+    CLIENT_LIMITER: Any = SharedTokenBucketLimiter(
+        os.path.join(SHARED_DIR, "ratelimit-client.bin"),
+        RATE_LIMIT_CLIENT_RPS, RATE_LIMIT_BURST, RATE_LIMIT_SHARDS, RATE_LIMIT_MAX_KEYS,
+    )
+    IP_LIMITER: Any = SharedTokenBucketLimiter(
+        os.path.join(SHARED_DIR, "ratelimit-ip.bin"),
+        RATE_LIMIT_IP_RPS, RATE_LIMIT_BURST, RATE_LIMIT_SHARDS, RATE_LIMIT_MAX_KEYS,
+    )
+    DECISION_CACHE: Any = SharedDecisionCache(
+        os.path.join(SHARED_DIR, "decision-cache.bin"),
+        CACHE_MAX_BYTES if CACHE_MAX_ENTRIES > 0 else 0,
+        MAX_STALENESS_SECONDS,
+        slot_bytes=SHARED_CACHE_SLOT_BYTES,
+    )
+else:
+    CLIENT_LIMITER = TokenBucketLimiter(RATE_LIMIT_CLIENT_RPS, RATE_LIMIT_BURST, RATE_LIMIT_SHARDS, RATE_LIMIT_MAX_KEYS)
+    IP_LIMITER = TokenBucketLimiter(RATE_LIMIT_IP_RPS, RATE_LIMIT_BURST, RATE_LIMIT_SHARDS, RATE_LIMIT_MAX_KEYS)
+    DECISION_CACHE = DecisionCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, MAX_STALENESS_SECONDS)
+
+if SIGNING_KEYS_FILE:
+    from .shared import keyset_from_file
+
+    SIGNING_KEYS = keyset_from_file(SIGNING_KEYS_FILE, SIGNING_ALGORITHMS)
+else:
+    SIGNING_KEYS = KeySet(SIGNING_ALGORITHMS)
+SIGNER = SigningPool(
+    SIGNING_KEYS,
+    executor=SIGNING_EXECUTOR,
+    workers=SIGNING_WORKERS,
+    max_pending=SIGNING_QUEUE,
+)
+BATCH_SIGNER = MerkleBatchSigner(SIGNER, SIGNING_BATCH_MS, SIGNING_BATCH_MAX) if SIGNING_BATCH_MS > 0 else None
+INFLIGHT = Singleflight(enabled=COALESCE_ENABLED)
+# An upstream system of record owns the authorization facts; the in-memory store is
+# then not loaded, so no local snapshot or feed contradicts it.
+UPSTREAM = (
+    UpstreamBatcher(
+        HTTPPool(UPSTREAM_URL, UPSTREAM_POOL, UPSTREAM_TIMEOUT_SECONDS),
+        UPSTREAM_BATCH_MS,
+        UPSTREAM_BATCH_MAX,
+        breaker=CircuitBreaker(UPSTREAM_BREAKER_FAILURES, UPSTREAM_BREAKER_RESET_SECONDS),
+        hedge=UPSTREAM_HEDGE,
+    )
+    if UPSTREAM_URL
+    else None
+)
+# Journals the in-memory facts as they load; the SQLite backend has no change feed.
+CHANGES = ChangeLog()
+if DECISION_DB_PATH:
+    # The SQLite backend takes precedence over the in-memory store.
+    from .sqlite_store import SQLiteDecisionStore
+
+    DECISION_DB: Optional[SQLiteDecisionStore] = SQLiteDecisionStore(DECISION_DB_PATH, DECISION_DB_READERS)
+    DECISION_STORE = None
+else:
+    DECISION_DB = None
+    DECISION_STORE = (
+        DecisionStore.load(*DECISION_STORE_PATH.split(os.pathsep), journal=CHANGES.journal_authorizations)
+        if DECISION_STORE_PATH and UPSTREAM is None
+        else None
+    )
+RECOGNITION_GRAPH: Optional[RecognitionGraph] = None
+if RECOGNITION_GRAPH_PATH:
+    RECOGNITION_GRAPH = RecognitionGraph.load(
+        *RECOGNITION_GRAPH_PATH.split(os.pathsep),
+        max_chain_depth=RECOGNITION_MAX_DEPTH,
+        transitive_default=RECOGNITION_TRANSITIVE,
+        journal=lambda records: CHANGES.journal_recognitions(records, RECOGNITION_TRANSITIVE),
+    )
+elif DECISION_DB is not None:
+    # Chains need the whole graph; the SQLite backend's edges are read into memory once.
+    RECOGNITION_GRAPH = RecognitionGraph(RECOGNITION_MAX_DEPTH, RECOGNITION_TRANSITIVE)
+    for edge in DECISION_DB.recognition_edges():
+        RECOGNITION_GRAPH.add_edge(*edge)
+POLICY = PolicyEngine(POLICY_PATH, CONTEXT_ALLOWLIST) if POLICY_PATH else None
+# With an issuer JWKS configured, callers present JWT access tokens instead of BEARER_TOKEN.
+ACCESS_TOKENS = (
+    AccessTokenVerifier(
+        AUTH_JWKS,
+        AUTH_ISSUER,
+        AUTH_AUDIENCE,
+        MAX_TOKEN_TTL_SECONDS,
+        refresh_seconds=AUTH_JWKS_REFRESH_SECONDS,
+        min_refresh_seconds=AUTH_JWKS_MIN_REFRESH_SECONDS,
+        max_entries=AUTH_CACHE_MAX_ENTRIES,
+        leeway_seconds=AUTH_LEEWAY_SECONDS,
+    )
+    if AUTH_JWKS
+    else None
+)
+DOCUMENTS = DocumentCache()
+# Offline snapshots enumerate the in-memory store's grants; other backends publish none.
+SNAPSHOTS = SnapshotPublisher(SNAPSHOT_MAX_AGE_SECONDS, SNAPSHOT_FP_RATE) if DECISION_STORE is not None else None
+# Upstream deadline (`time.monotonic()`) of the request being served, set from its budget.
+DEADLINE: ContextVar[Optional[float]] = ContextVar("tspp_ref_deadline", default=None)
+# Signed change-feed checkpoints by (seq, alg, policy version). Only the current head and policy
+# version are kept, at most one entry per signing algorithm, however often the policy reloads.
+CHECKPOINTS: Dict[Tuple[int, str, str], Dict[str, Any]] = {}
+
 
-app = FastAPI(title="TSPP TRQP Reference SUT", version=APP_VERSION)
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    watchers = []
+    if POLICY is not None and POLICY_RELOAD_SECONDS > 0:
+        watchers.append(asyncio.create_task(POLICY.watch(POLICY_RELOAD_SECONDS)))
+    if ACCESS_TOKENS is not None and AUTH_JWKS_REFRESH_SECONDS > 0:
+        watchers.append(asyncio.create_task(ACCESS_TOKENS.watch()))
+    yield
+    for watcher in watchers:
+        watcher.cancel()
+    SIGNER.shutdown()
+    if DECISION_DB is not None:
+        DECISION_DB.close()
+    if UPSTREAM is not None:
+        await UPSTREAM.pool.close()
 
-WINDOW_START = time.time()
-WINDOW_COUNT = 0
-_RL_LOCK = asyncio.Lock()
 
-_SIGNING_KEY = jwk.JWK.generate(kty="RSA", size=2048)
-_SIGNING_KEY.kid = KID
+app = FastAPI(title="TSPP TRQP Reference SUT", version=APP_VERSION, lifespan=_lifespan)
 
 
 PUBLIC_DOCS = {
@@ -79,43 +275,70 @@ def _now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _iso(dt: datetime) -> str:
-    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-
-
 def _public_uri(base: str, path: str) -> str:
     return f"{base}{path}"
 
 
-async def _rate_limit_tick() -> Dict[str, str]:
-    global WINDOW_START, WINDOW_COUNT
-    async with _RL_LOCK:
-        now = time.time()
-        if now - WINDOW_START >= RATE_LIMIT_WINDOW_SECONDS:
-            WINDOW_START = now
-            WINDOW_COUNT = 0
-        WINDOW_COUNT += 1
-
-        remaining = max(0, RATE_LIMIT_BURST - WINDOW_COUNT)
-        reset = int(WINDOW_START + RATE_LIMIT_WINDOW_SECONDS)
-        headers = {
-            "RateLimit-Limit": str(RATE_LIMIT_BURST),
-            "RateLimit-Remaining": str(remaining),
-            "RateLimit-Reset": str(reset),
-        }
-        if WINDOW_COUNT >= RATE_LIMIT_BURST:
-            headers["Retry-After"] = "1"
-        return headers
+def _rate_limit_callers(req: Request, authorization: Optional[str]) -> Tuple[Optional[str], str]:
+    """Rate-limit keys for a request: a digest of its credential (if any) and its peer IP."""
+    client = hashlib.sha256(authorization.encode("utf-8")).hexdigest()[:32] if authorization else None
+    ip = req.client.host if req.client else "unknown"
+    return client, ip
+
+
+def _enforce_rate_limit(callers: Tuple[Optional[str], str], cost: int = 1) -> Dict[str, str]:
+    """Charge both the per-IP and per-client buckets; raise 429 if either is empty.
+
+    Every endpoint authenticates first, so requests refused with 401/403 cost no tokens.
+    Returns the RateLimit-* headers of the tighter of the two buckets.
+    """
+    client, ip = callers
+    decision = IP_LIMITER.take(ip, cost)
+    if decision.allowed and client is not None:
+        client_decision = CLIENT_LIMITER.take(client, cost)
+        if not client_decision.allowed:
+            IP_LIMITER.refund(ip, cost)
+        if not client_decision.allowed or client_decision.remaining < decision.remaining:
+            decision = client_decision
+    headers = decision.headers()
+    if not decision.allowed:
+        raise HTTPException(status_code=429, detail="rate_limited", headers=headers)
+    return headers
+
+
+def _start_budget(timeout_ms: Optional[str]) -> None:
+    """Bound upstream lookups by the client's `X-Request-Timeout-Ms`, less a reserve for signing."""
+    if UPSTREAM is None or not timeout_ms:
+        return
+    try:
+        budget = float(timeout_ms)
+    except ValueError:
+        return
+    if 0 < budget < float("inf"):
+        DEADLINE.set(time.monotonic() + (budget - UPSTREAM_BUDGET_RESERVE_MS) / 1000.0)
+
 
+async def _require_auth(authorization: Optional[str], *scopes: str) -> None:
+    """Authenticate the caller; with JWT access tokens, also require `scopes`.
 
-def _require_auth(authorization: Optional[str]) -> None:
+    Every rejected token gets the same `invalid_token`, whatever failed; the reasons are
+    counted in the `access_tokens` metrics block.
+    """
     if not authorization:
         raise HTTPException(status_code=401, detail="missing_authorization")
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="invalid_authorization_scheme")
     token = authorization.split(" ", 1)[1].strip()
-    if token != BEARER_TOKEN:
+    if ACCESS_TOKENS is None:
+        if token != BEARER_TOKEN:
+            raise HTTPException(status_code=403, detail="invalid_token")
+        return
+    try:
+        granted = await ACCESS_TOKENS.verify(token)
+    except TokenRejected:
         raise HTTPException(status_code=403, detail="invalid_token")
+    if not granted.issuperset(scopes):
+        raise HTTPException(status_code=403, detail="insufficient_scope")
 
 
 def _strip_unknown_context(ctx: Any, allowlist: list[str]) -> Any:
@@ -125,55 +348,195 @@ def _strip_unknown_context(ctx: Any, allowlist: list[str]) -> Any:
 
 
 def _query_hash(body: Dict[str, Any], allow_keys: list[str]) -> str:
+    """SHA-256 of the canonical query terms and allowlisted context.
+
+    Values RFC 8785 cannot canonicalize (integers beyond what a double holds exactly, lone
+    surrogates) are a `400 invalid_request`: they could be neither hashed nor signed.
+    """
     ctx = body.get("context") if isinstance(body, dict) else None
     ctx = ctx if isinstance(ctx, dict) else {}
     bound = {k: ctx.get(k) for k in allow_keys if k in ctx}
-    for k in ("entity_id", "subject_authority_id"):
+    for k in ("authority_id", "entity_id", "subject_authority_id", "authority_ids", "subject_authority_ids", "action", "resource"):
         if k in body:
             bound[k] = body.get(k)
-    raw = json.dumps(bound, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
-    return hashlib.sha256(raw).hexdigest()
+    try:
+        canonical = canonicalize(bound)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_request")
+    return hashlib.sha256(canonical).hexdigest()
+
+
+async def _sign_envelope(canonical: bytes, qh: str, ctx_keys: list[str], alg: str, detached: bool = False) -> bytes:
+    """The rendered signed envelope around a canonical (RFC 8785) payload.
+
+    The same bytes are the JWS payload, the Merkle leaf, and the `payload` member of the
+    body, which is itself canonical. With `detached`, the JWS signs those bytes unencoded
+    and leaves them out (RFC 7797), so the payload is not sent twice; Merkle-batched JWSs
+    sign the batch statement instead and are never detached.
+    """
+    detached = detached and BATCH_SIGNER is None
+    try:
+        if BATCH_SIGNER is not None:
+            batched = await BATCH_SIGNER.sign(canonical, alg)
+        else:
+            batched = {"jws": await SIGNER.sign(canonical, alg, detached)}
+    except SignerSaturated as exc:
+        raise HTTPException(status_code=503, detail="signing_unavailable", headers={"Retry-After": str(exc.retry_after)})
+
+    now = CLOCK.now()
+    issued_at = CLOCK.stamp(now)
+    template = render.signature_template(alg, SIGNING_KEYS.kid(alg), tuple(ctx_keys), detached)
+    signature = template.render(issued_at, batched["jws"], qh, batched.get("merkle"))
+    return render.signed_envelope(qh, issued_at, CLOCK.stamp(now + DEFAULT_EXPIRES_SECONDS), canonical, signature)
 
 
-def _sign_envelope(payload: Dict[str, Any], qh: str, ctx_keys: list[str]) -> Dict[str, Any]:
-    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
-    signer = jws.JWS(payload=canonical)
-    signer.add_signature(_SIGNING_KEY, None, protected={"alg": "RS256", "kid": KID}, header={})
-    compact = signer.serialize(compact=True)
+async def _sign_cbor_envelope(payload: Dict[str, Any], qh: str, ctx_keys: list[str], alg: str) -> bytes:
+    """The rendered CBOR envelope around `payload`, signed with a COSE_Sign1 (see `cbor.py`).
 
+    Always signed per response: Merkle-batched signing covers canonical JSON payloads.
+    """
+    encoded = cbor.encode(payload)
+    try:
+        sign1 = await SIGNER.sign_cose(encoded, alg)
+    except SignerSaturated as exc:
+        raise HTTPException(status_code=503, detail="signing_unavailable", headers={"Retry-After": str(exc.retry_after)})
+    return cbor.envelope(_envelope_meta(qh), encoded, _signature_block(alg, qh, ctx_keys), sign1)
+
+
+def _signature_block(alg: str, qh: str, ctx_keys: list[str]) -> Dict[str, Any]:
+    """An envelope's `signature` member, less the signature itself."""
     return {
-        "payload": payload,
-        "signature": {
-            "alg": "RS256",
-            "kid": KID,
-            "jws": compact,
-            "query_hash": qh,
-            "hash_alg": "SHA-256",
-            "canonicalization": {
-                "json": "operator-defined",
-                "unicode": "none",
-                "context_keys_included": ctx_keys,
-            },
-            "issued_at": _iso(_now()),
-        },
-        "meta": {
-            "query_hash": qh,
-            "iat": _iso(_now()),
-            "exp": _iso(_now() + timedelta(seconds=300)),
+        "alg": alg,
+        "kid": SIGNING_KEYS.kid(alg),
+        "query_hash": qh,
+        "hash_alg": "SHA-256",
+        "canonicalization": {
+            "json": "RFC8785",
+            "unicode": "none",
+            "context_keys_included": ctx_keys,
         },
+        "issued_at": CLOCK.stamp(CLOCK.now()),
     }
 
 
+def _envelope_meta(qh: str) -> Dict[str, Any]:
+    now = CLOCK.now()
+    return {
+        "query_hash": qh,
+        "iat": CLOCK.stamp(now),
+        "exp": CLOCK.stamp(now + DEFAULT_EXPIRES_SECONDS),
+    }
+
+
+def _cbor_requested(accept: Optional[str]) -> bool:
+    """Whether to answer in CBOR; 406 when only CBOR is acceptable and cbor2 is not installed."""
+    if not cbor.wants_cbor(accept):
+        return False
+    if cbor.available():
+        return True
+    if cbor.json_acceptable(accept):
+        return False
+    raise HTTPException(status_code=406, detail="not_acceptable")
+
+
 def _should_sign_success(accept_signature: Optional[str]) -> bool:
     if ASSURANCE_LEVEL in {"AL3", "AL4"}:
         return True
-    return ASSURANCE_LEVEL == "AL2" and (accept_signature or "").lower() == "jws"
+    return ASSURANCE_LEVEL == "AL2" and any(scheme == "jws" for scheme, _ in parse_accept_signature(accept_signature))
+
+
+async def _answer(
+    endpoint: str,
+    body: Dict[str, Any],
+    ctx: Any,
+    accept_signature: Optional[str],
+    build_payload: PayloadBuilder,
+    accept: Optional[str] = None,
+) -> Response:
+    """Serve a query result from the decision cache, or evaluate, sign and cache it.
+
+    Concurrent identical queries (same cache key) share a single evaluation and signature.
+    Each waits for it within its own budget: the shared evaluation runs without any one
+    caller's deadline, and a caller whose budget runs out gets `503 upstream_unavailable`.
+    """
+    qh = _query_hash(body, CONTEXT_ALLOWLIST)
+    sign = _should_sign_success(accept_signature)
+    alg = SIGNING_KEYS.select(accept_signature) if sign else "none"
+    detached = sign and detached_requested(accept_signature)
+    as_cbor = _cbor_requested(accept)
+    media_type = cbor.MEDIA_TYPE if as_cbor else "application/json"
+    # Keyed on the policy version, so a reloaded policy is never answered from the old one's cache.
+    key = (endpoint, qh, alg, detached, as_cbor, POLICY.version if POLICY is not None else "")
+    cached = DECISION_CACHE.get(key)
+    if cached is not None:
+        return Response(content=cached, media_type=media_type)
+
+    async def render() -> bytes:
+        if INFLIGHT.enabled:
+            # Shared by every coalesced caller, so not bounded by whichever one started it.
+            DEADLINE.set(None)
+        answer = await build_payload()
+        if sign:
+            ctx_keys = [k for k in CONTEXT_ALLOWLIST if isinstance(ctx, dict) and k in ctx]
+            if as_cbor:
+                rendered = await _sign_cbor_envelope(answer.as_dict(), qh, ctx_keys, alg)
+            else:
+                rendered = await _sign_envelope(answer.render(), qh, ctx_keys, alg, detached)
+        else:
+            rendered = cbor.encode(answer.as_dict()) if as_cbor else answer.render()
+        # Cached no longer than the answer's own `meta.expires_at`.
+        DECISION_CACHE.put(key, rendered, answer.expires_epoch - time.time())
+        return rendered
+
+    deadline = DEADLINE.get()
+    try:
+        # The wait also covers signing, so it gets the reserve the upstream deadline holds back.
+        rendered = await INFLIGHT.do(key, render, None if deadline is None else deadline + UPSTREAM_BUDGET_RESERVE_MS / 1000.0)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="upstream_unavailable", headers={"Retry-After": "1"})
+    return Response(content=rendered, media_type=media_type)
+
+
+def _document_response(doc: RenderedDocument, if_none_match: Optional[str], media_type: str = "application/json", vary: bool = False) -> Response:
+    headers = {"ETag": doc.etag, "Cache-Control": f"public, max-age={DOC_MAX_AGE_SECONDS}"}
+    if vary:
+        headers["Vary"] = "Accept"
+    if etag_matches(if_none_match, doc.etag):
+        DOCUMENTS.note_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=doc.body, media_type=media_type, headers=headers)
+
+
+def _metadata_inputs() -> Tuple[Any, ...]:
+    """Everything besides the base URL that the metadata document is rendered from."""
+    return (
+        ASSURANCE_LEVEL,
+        SIGNING_KEYS.fingerprint,
+        tuple(SIGNING_KEYS.algorithms),
+        tuple(CONTEXT_ALLOWLIST),
+        RATE_LIMIT_CLIENT_RPS,
+        RATE_LIMIT_IP_RPS,
+        RATE_LIMIT_BURST,
+        MAX_STALENESS_SECONDS,
+        DEFAULT_EXPIRES_SECONDS,
+        RECOGNITION_MAX_DEPTH,
+        RECOGNITION_TRANSITIVE,
+        SNAPSHOTS is not None and SNAPSHOTS.max_age_seconds,
+    )
 
 
 @app.get("/.well-known/trqp-metadata")
-def get_metadata(request: Request):
+def get_metadata(request: Request, if_none_match: Optional[str] = Header(default=None), accept: Optional[str] = Header(default=None)):
     base = str(request.base_url).rstrip("/")
-    allowlist = ["purpose", "audience", "locale"]
+    if _cbor_requested(accept):
+        doc = DOCUMENTS.get(("metadata", base, _metadata_inputs(), cbor.MEDIA_TYPE), lambda: _build_metadata(base), cbor.encode)
+        return _document_response(doc, if_none_match, cbor.MEDIA_TYPE, vary=True)
+    doc = DOCUMENTS.get(("metadata", base, _metadata_inputs()), lambda: _build_metadata(base))
+    return _document_response(doc, if_none_match, vary=True)
+
+
+def _build_metadata(base: str) -> Dict[str, Any]:
+    allowlist = CONTEXT_ALLOWLIST
     metadata = {
         "profile": "TSPP-TRQP-0.1",
         "assurance_level": ASSURANCE_LEVEL,
@@ -187,20 +550,21 @@ def get_metadata(request: Request):
         "auth": {
             "required": True,
             "methods": ["bearer"],
-            "max_token_ttl_seconds": 900,
-            "required_scopes": ["trqp.authorization.query", "trqp.recognition.query"],
-            "audience": "urn:example:trqp-reference-sut",
+            "max_token_ttl_seconds": MAX_TOKEN_TTL_SECONDS,
+            "required_scopes": [AUTHORIZATION_SCOPE, RECOGNITION_SCOPE],
+            "audience": AUTH_AUDIENCE,
         },
         "rate_limits": {
-            "per_client_rps": 100,
-            "per_ip_rps": 100,
+            "per_client_rps": min(RATE_LIMIT_CLIENT_RPS, 100000),
+            "per_ip_rps": min(RATE_LIMIT_IP_RPS, 100000),
             "burst": min(RATE_LIMIT_BURST, 100000),
         },
         "freshness": {
-            "max_staleness_seconds": 120,
-            "default_expires_seconds": 300,
+            "max_staleness_seconds": MAX_STALENESS_SECONDS,
+            "default_expires_seconds": DEFAULT_EXPIRES_SECONDS,
         },
         "context_allowlist": allowlist,
+        "response_media_types": ["application/json", cbor.MEDIA_TYPE] if cbor.available() else ["application/json"],
         "namespacing": {
             "action_required": True,
             "resource_required": False,
@@ -211,10 +575,11 @@ def get_metadata(request: Request):
             "supported": True,
             "required_for_al2": ASSURANCE_LEVEL == "AL2",
             "default_signed_responses": ASSURANCE_LEVEL in {"AL3", "AL4"},
-            "algorithms": ["RS256"],
+            "algorithms": list(SIGNING_KEYS.algorithms),
             "jwks_uri": f"{base}{JWKS_PATH}",
+            "detached_payload": BATCH_SIGNER is None,
             "canonicalization": {
-                "json_canonicalization": "operator-defined",
+                "json_canonicalization": "RFC8785",
                 "unicode_normalization": "none",
                 "context_keys_included_in_hash": allowlist,
             },
@@ -222,8 +587,8 @@ def get_metadata(request: Request):
         "recognition_policy": {
             "scoped_required": True,
             "expiry_required": True,
-            "transitive_default": False,
-            "max_chain_depth": 1,
+            "transitive_default": RECOGNITION_TRANSITIVE,
+            "max_chain_depth": RECOGNITION_MAX_DEPTH,
         },
         "transparency": {
             "service_docs_uri": _public_uri(base, "/.well-known/service-docs"),
@@ -231,6 +596,12 @@ def get_metadata(request: Request):
             "security_txt_uri": _public_uri(base, "/.well-known/service-docs"),
         },
     }
+    if SNAPSHOTS is not None:
+        metadata["snapshot"] = {
+            "uri": _public_uri(base, "/snapshot"),
+            "format": SNAPSHOT_FORMAT,
+            "max_age_seconds": SNAPSHOTS.max_age_seconds,
+        }
     if ASSURANCE_LEVEL in {"AL3", "AL4"}:
         metadata["audit"] = {
             "independent_assessment_uri": _public_uri(base, "/.well-known/assessment/al3-independent-assessment"),
@@ -258,63 +629,147 @@ def get_metadata(request: Request):
 
 
 @app.get(JWKS_PATH)
-def get_jwks():
-    pub = jwk.JWK.from_json(_SIGNING_KEY.export_public())
-    pub.kid = KID
-    return {"keys": [json.loads(pub.export_public())]}
+def get_jwks(if_none_match: Optional[str] = Header(default=None)):
+    doc = DOCUMENTS.get(("jwks", SIGNING_KEYS.fingerprint), SIGNING_KEYS.public_jwks)
+    return _document_response(doc, if_none_match)
 
 
-@app.get("/{doc_path:path}")
-def get_public_doc(doc_path: str):
-    path = "/" + doc_path
-    if path in PUBLIC_DOCS:
-        return PUBLIC_DOCS[path]
-    raise HTTPException(status_code=404, detail="not_found")
+@app.get("/metrics")
+async def get_metrics(authorization: Optional[str] = Header(default=None)):
+    await _require_auth(authorization)
+    metrics: Dict[str, Any] = {
+        "process": {"pid": os.getpid(), "shared_state": bool(SHARED_DIR)},
+        "signing": SIGNER.stats(),
+        "decision_cache": DECISION_CACHE.stats(),
+        "coalescing": INFLIGHT.stats(),
+        "documents": DOCUMENTS.stats(),
+        "rate_limit": {"client": CLIENT_LIMITER.stats(), "ip": IP_LIMITER.stats()},
+    }
+    if BATCH_SIGNER is not None:
+        metrics["batch_signing"] = BATCH_SIGNER.stats()
+    if DECISION_DB is not None:
+        metrics["decision_store"] = DECISION_DB.stats()
+    elif DECISION_STORE is not None:
+        metrics["decision_store"] = DECISION_STORE.stats()
+    if UPSTREAM is not None:
+        metrics["upstream"] = UPSTREAM.stats()
+    if POLICY is not None:
+        metrics["policy"] = POLICY.stats()
+    if ACCESS_TOKENS is not None:
+        metrics["access_tokens"] = ACCESS_TOKENS.stats()
+    if RECOGNITION_GRAPH is not None:
+        metrics["recognition_graph"] = RECOGNITION_GRAPH.stats()
+    if CHANGES.types:
+        metrics["change_feed"] = CHANGES.stats()
+    if SNAPSHOTS is not None:
+        metrics["snapshot"] = SNAPSHOTS.stats()
+    return metrics
 
 
-@app.post("/authorization")
-async def post_authorization(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature")):
-    rl_headers = await _rate_limit_tick()
-    if rl_headers and int(rl_headers.get("RateLimit-Remaining", "1")) == 0 and WINDOW_COUNT >= RATE_LIMIT_BURST:
-        raise HTTPException(status_code=429, detail="rate_limited", headers=rl_headers)
+def _query_terms(body: Dict[str, Any], keys: Tuple[str, ...]) -> list[str]:
+    return [t if isinstance(t, str) else "" for t in (body.get(k) for k in keys)]
 
-    _require_auth(authorization)
 
-    body = await req.json()
-    allowlist = ["purpose", "audience", "locale"]
-    ctx = _strip_unknown_context(body.get("context"), allowlist)
-    if isinstance(body, dict):
-        body["context"] = ctx
+def _as_of(ctx: Any) -> Optional[float]:
+    """`context.time_requested` as epoch seconds, or None to evaluate now."""
+    value = ctx.get("time_requested") if isinstance(ctx, dict) else None
+    if value is None:
+        return None
+    try:
+        if not isinstance(value, str):
+            raise ValueError(value)
+        return parse_time(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "invalid_context",
+                "message": "context.time_requested must be an RFC 3339 timestamp.",
+            },
+        )
+
+
+async def _authorized(body: Dict[str, Any]) -> str:
+    """The tri-state decision for an authorization query, raising the uniform 404 for an unknown entity.
 
-    entity_id = body.get("entity_id") if isinstance(body, dict) else None
+    A matching policy rule decides first; queries no rule matches fall through to the facts
+    as of `context.time_requested`.
+    """
+    at = _as_of(body.get("context"))
+    if POLICY is not None:
+        terms = _query_terms(body, ("authority_id", "entity_id", "action", "resource"))
+        outcome = POLICY.evaluate(*terms, body.get("context"))
+        if outcome is not None:
+            return "true" if outcome else "false"
+    if UPSTREAM is not None or DECISION_DB is not None or DECISION_STORE is not None:
+        terms = _query_terms(body, ("authority_id", "entity_id", "action", "resource"))
+        if UPSTREAM is not None:
+            try:
+                outcome = await UPSTREAM.lookup(*terms, at, DEADLINE.get())
+            except UpstreamError as exc:
+                # One surface for every upstream failure: slow, down, or shed by the breaker.
+                raise HTTPException(
+                    status_code=503, detail="upstream_unavailable", headers={"Retry-After": str(exc.retry_after)}
+                )
+        elif DECISION_DB is not None:
+            outcome = await DECISION_DB.lookup(*terms, at)
+        else:
+            outcome = DECISION_STORE.lookup(*terms, at)
+        if outcome is None:
+            raise HTTPException(status_code=404, detail="not_found")
+        return "true" if outcome else "false"
+    entity_id = body.get("entity_id")
     if isinstance(entity_id, str) and "unknown" in entity_id.lower():
         raise HTTPException(status_code=404, detail="not_found")
+    return "true"
 
-    now = _now()
-    payload = {
-        "decision": {"authorized": "true"},
-        "meta": {
-            "time_evaluated": _iso(now),
-            "expires_at": _iso(now + timedelta(seconds=300)),
-        },
-        "context": ctx if isinstance(ctx, dict) else {},
-    }
 
-    if _should_sign_success(accept_signature):
-        qh = _query_hash(body, allowlist)
-        return _sign_envelope(payload, qh, [k for k in allowlist if isinstance(ctx, dict) and k in ctx])
+def _expiry(until: Optional[float]) -> Optional[int]:
+    """A recognition graph expiry (epoch seconds, possibly unbounded) as a whole-second cap."""
+    if until is None or until == float("inf"):
+        return None
+    return int(until)
 
-    return payload
 
+async def _recognized(body: Dict[str, Any]) -> Tuple[bool, Optional[int]]:
+    """Whether the subject authority is recognized, and until when if that is bounded.
 
-@app.post("/recognition")
-async def post_recognition(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature")):
-    _require_auth(authorization)
-    body = await req.json()
-    allowlist = ["purpose", "audience", "locale"]
-    raw_ctx = body.get("context") if isinstance(body, dict) else None
+    As of a `context.time_requested`, the answer describes that moment and no expiry caps it.
+    """
+    authority, subject, action, resource = _query_terms(body, ("authority_id", "subject_authority_id", "action", "resource"))
+    # `entity_id` is the deprecated alias of `subject_authority_id`.
+    subject = subject or _query_terms(body, ("entity_id",))[0]
+    at = _as_of(body.get("context"))
+    if RECOGNITION_GRAPH is not None:
+        until = RECOGNITION_GRAPH.recognized_until(authority, subject, action, resource, at)
+        return until is not None, _expiry(until) if at is None else None
+    return True, None
+
+
+def _authorization_query(body: Any) -> Tuple[Any, PayloadBuilder]:
+    """Validate one authorization query; return its stripped context and payload builder.
+
+    The decision itself is looked up by the builder, so cache hits never touch the store.
+    """
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="invalid_request")
+    ctx = _strip_unknown_context(body.get("context"), CONTEXT_ALLOWLIST)
+    body["context"] = ctx
+
+    async def build_payload() -> Answer:
+        authorized = await _authorized(body)
+        now = CLOCK.now()
+        expires = now + DEFAULT_EXPIRES_SECONDS
+        context = ctx if isinstance(ctx, dict) else {}
+        return Answer(render.AUTHORIZATION, authorized, context, CLOCK.stamp(now), CLOCK.stamp(expires), expires)
+
+    return ctx, build_payload
+
+
+def _recognition_context(raw_ctx: Any) -> Any:
+    """Reject recognition context keys outside the allowlist (400 `invalid_context`)."""
     if isinstance(raw_ctx, dict):
-        unknown_keys = [k for k in raw_ctx if k not in allowlist]
+        unknown_keys = [k for k in raw_ctx if k not in CONTEXT_ALLOWLIST]
         if unknown_keys:
             raise HTTPException(
                 status_code=400,
@@ -322,23 +777,386 @@ async def post_recognition(req: Request, authorization: Optional[str] = Header(d
                     "error": "invalid_context",
                     "message": "Request context contains keys not declared in the server allowlist.",
                     "unknown_keys": unknown_keys,
-                    "allowlist": allowlist,
+                    "allowlist": CONTEXT_ALLOWLIST,
                 },
             )
-    ctx = _strip_unknown_context(raw_ctx, allowlist)
-    if isinstance(body, dict):
-        body["context"] = ctx
+    return _strip_unknown_context(raw_ctx, CONTEXT_ALLOWLIST)
+
+
+def _recognition_query(body: Any) -> Tuple[Any, PayloadBuilder]:
+    """Validate one recognition query; return its stripped context and payload builder."""
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="invalid_request")
+    ctx = body["context"] = _recognition_context(body.get("context"))
+
+    async def build_payload() -> Answer:
+        recognized, until = await _recognized(body)
+        now = CLOCK.now()
+        expires = now + DEFAULT_EXPIRES_SECONDS
+        if until is not None:
+            expires = min(expires, until)
+        context = ctx if isinstance(ctx, dict) else {}
+        return Answer(render.RECOGNITION, recognized, context, CLOCK.stamp(now), CLOCK.stamp(expires), expires)
+
+    return ctx, build_payload
+
+
+async def _answer_batch(
+    endpoint: str,
+    req: Request,
+    accept_signature: Optional[str],
+    prepare: Callable[[Any], Tuple[Any, PayloadBuilder]],
+    callers: Tuple[Optional[str], str],
+) -> Response:
+    """Evaluate an array of queries concurrently, answering in order; one signature covers the whole batch."""
+    queries = await req.json()
+    if not isinstance(queries, list):
+        raise HTTPException(status_code=400, detail="invalid_request")
+    if len(queries) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail="batch_too_large")
+    rl_headers = _enforce_rate_limit(callers, cost=max(1, len(queries)))
+
+    async def evaluate(q: Any) -> Tuple[bytes, Optional[str], Any]:
+        try:
+            ctx, build_payload = prepare(q)
+            qh = _query_hash(q, CONTEXT_ALLOWLIST)
+            answer = await build_payload()
+        except HTTPException as exc:
+            return render.batch_error(exc.status_code, exc.detail), None, None
+        return render.batch_item(answer), qh, ctx
+
+    # Evaluated concurrently, so the upstream adapter can merge the items' lookups into one call.
+    evaluated = await asyncio.gather(*(evaluate(q) for q in queries))
+    results = [item for item, _, _ in evaluated]
+    hashes = [h for _, h, _ in evaluated]
+    ctx_keys: set[str] = set()
+    for _, _, ctx in evaluated:
+        if isinstance(ctx, dict):
+            ctx_keys.update(k for k in ctx if k in CONTEXT_ALLOWLIST)
+
+    payload = render.batch(results)
+    if _should_sign_success(accept_signature):
+        batch_hash = hashlib.sha256(canonicalize(hashes)).hexdigest()
+        alg = SIGNING_KEYS.select(accept_signature)
+        ctx_included = [k for k in CONTEXT_ALLOWLIST if k in ctx_keys]
+        rendered = await _sign_envelope(payload, batch_hash, ctx_included, alg, detached_requested(accept_signature))
+    else:
+        rendered = payload
+    return Response(content=rendered, media_type="application/json", headers=rl_headers)
+
+
+async def _ndjson_lines(req: Request) -> AsyncIterator[Optional[bytes]]:
+    """Yield request body lines as they arrive; `None` stands in for an oversized line."""
+    buf = b""
+    skipping = False
+    async for chunk in req.stream():
+        lines = (buf + chunk).split(b"\n")
+        buf = lines.pop()
+        for line in lines:
+            if skipping:
+                # Tail of a line already reported as oversized.
+                skipping = False
+                continue
+            yield line if len(line) <= STREAM_MAX_LINE_BYTES else None
+        if len(buf) > STREAM_MAX_LINE_BYTES:
+            if not skipping:
+                yield None
+                skipping = True
+            buf = b""
+    if buf and not skipping:
+        yield buf if len(buf) <= STREAM_MAX_LINE_BYTES else None
+
+
+async def _stream_item(
+    endpoint: str,
+    raw: Optional[bytes],
+    accept_signature: Optional[str],
+    prepare: Callable[[Any], Tuple[Any, PayloadBuilder]],
+    callers: Tuple[Optional[str], str],
+) -> bytes:
+    """Answer one NDJSON line; the body is byte-for-byte what the single-query endpoint returns."""
+    try:
+        if raw is None:
+            raise HTTPException(status_code=413, detail="line_too_large")
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid_request")
+        _enforce_rate_limit(callers)
+        ctx, build_payload = prepare(body)
+        resp = await _answer(endpoint, body, ctx, accept_signature, build_payload)
+    except HTTPException as exc:
+        item = {"status": exc.status_code, "error": {"detail": exc.detail}}
+        return json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+    return b'{"status":200,"body":' + resp.body + b"}\n"
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves `receive` to the request body.
+
+    On ASGI < 2.4 servers, StreamingResponse polls `receive` for disconnects while it
+    streams, which would consume the NDJSON request body the result generator is still
+    reading. Here a disconnect surfaces through `req.stream()` or a failed send instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+
+def _answer_stream(
+    endpoint: str,
+    req: Request,
+    accept_signature: Optional[str],
+    prepare: Callable[[Any], Tuple[Any, PayloadBuilder]],
+    callers: Tuple[Optional[str], str],
+) -> StreamingResponse:
+    """Evaluate NDJSON queries as they arrive and stream one result line per query, in order.
+
+    At most STREAM_CONCURRENCY queries are in flight, so memory stays bounded however
+    long the stream is, while signing still overlaps across queries.
+    """
+    media_type = req.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in NDJSON_MEDIA_TYPES:
+        raise HTTPException(status_code=415, detail="unsupported_media_type")
+
+    async def results() -> AsyncIterator[bytes]:
+        pending: "deque[asyncio.Future[bytes]]" = deque()
+        try:
+            async for raw in _ndjson_lines(req):
+                if raw is not None and not raw.strip():
+                    continue
+                pending.append(asyncio.ensure_future(_stream_item(endpoint, raw, accept_signature, prepare, callers)))
+                if len(pending) >= STREAM_CONCURRENCY:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    return _DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.post("/authorization")
+async def post_authorization(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature"), request_timeout: Optional[str] = Header(default=None, alias="X-Request-Timeout-Ms"), accept: Optional[str] = Header(default=None)):
+    _start_budget(request_timeout)
+    await _require_auth(authorization, AUTHORIZATION_SCOPE)
+    rl_headers = _enforce_rate_limit(_rate_limit_callers(req, authorization))
+
+    body = await req.json()
+    ctx, build_payload = _authorization_query(body)
+    resp = await _answer("authorization", body, ctx, accept_signature, build_payload, accept)
+    resp.headers.update(rl_headers)
+    return resp
+
+
+@app.post("/authorization/batch")
+async def post_authorization_batch(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature"), request_timeout: Optional[str] = Header(default=None, alias="X-Request-Timeout-Ms")):
+    _start_budget(request_timeout)
+    callers = _rate_limit_callers(req, authorization)
+    await _require_auth(authorization, AUTHORIZATION_SCOPE)
+    return await _answer_batch("authorization", req, accept_signature, _authorization_query, callers)
+
+
+@app.post("/authorization/stream")
+async def post_authorization_stream(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature")):
+    callers = _rate_limit_callers(req, authorization)
+    await _require_auth(authorization, AUTHORIZATION_SCOPE)
+    return _answer_stream("authorization", req, accept_signature, _authorization_query, callers)
+
+
+@app.post("/recognition")
+async def post_recognition(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature"), accept: Optional[str] = Header(default=None)):
+    await _require_auth(authorization, RECOGNITION_SCOPE)
+    rl_headers = _enforce_rate_limit(_rate_limit_callers(req, authorization))
+
+    body = await req.json()
+    ctx, build_payload = _recognition_query(body)
+    resp = await _answer("recognition", body, ctx, accept_signature, build_payload, accept)
+    resp.headers.update(rl_headers)
+    return resp
+
+
+@app.post("/recognition/batch")
+async def post_recognition_batch(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature")):
+    callers = _rate_limit_callers(req, authorization)
+    await _require_auth(authorization, RECOGNITION_SCOPE)
+    return await _answer_batch("recognition", req, accept_signature, _recognition_query, callers)
+
+
+@app.post("/recognition/stream")
+async def post_recognition_stream(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature")):
+    callers = _rate_limit_callers(req, authorization)
+    await _require_auth(authorization, RECOGNITION_SCOPE)
+    return _answer_stream("recognition", req, accept_signature, _recognition_query, callers)
+
+
+def _id_list(value: Any) -> list[str]:
+    if not isinstance(value, list) or not value or not all(isinstance(v, str) for v in value):
+        raise HTTPException(status_code=400, detail="invalid_request")
+    return value
+
+
+async def _recognition_matrix(
+    authorities: list[str], subjects: list[str], action: str, resource: str, at: Optional[float]
+) -> Tuple[list[list[bool]], Optional[int]]:
+    if RECOGNITION_GRAPH is not None:
+        rows, until = RECOGNITION_GRAPH.recognition_matrix(authorities, subjects, action, resource, at)
+        return rows, _expiry(until) if at is None else None
+    return [[True] * len(subjects) for _ in authorities], None
+
 
-    now = _now()
-    payload = {
-        "recognized": True,
+@app.post("/recognition/matrix")
+async def post_recognition_matrix(req: Request, authorization: Optional[str] = Header(default=None), accept_signature: Optional[str] = Header(default="none", alias="Accept-Signature")):
+    """Answer `recognized` for every (authority, subject authority) pair in one round-trip.
+
+    Charged like the single queries it replaces, one rate-limit token per cell, so a
+    matrix is no faster a way to enumerate recognitions than single queries.
+    """
+    callers = _rate_limit_callers(req, authorization)
+    await _require_auth(authorization, RECOGNITION_SCOPE)
+    body = await req.json()
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="invalid_request")
+    authorities, subjects = _id_list(body.get("authority_ids")), _id_list(body.get("subject_authority_ids"))
+    if len(authorities) * len(subjects) > MATRIX_MAX_CELLS:
+        raise HTTPException(status_code=413, detail="matrix_too_large")
+    ctx = body["context"] = _recognition_context(body.get("context"))
+    at = _as_of(ctx)
+    qh = _query_hash(body, CONTEXT_ALLOWLIST)
+    rl_headers = _enforce_rate_limit(callers, cost=len(authorities) * len(subjects))
+
+    rows, until = await _recognition_matrix(authorities, subjects, *_query_terms(body, ("action", "resource")), at)
+    now = CLOCK.now()
+    expires = now + DEFAULT_EXPIRES_SECONDS
+    payload: Dict[str, Any] = {
+        "authority_ids": authorities,
+        "subject_authority_ids": subjects,
+        "recognized": rows,
         "meta": {
-            "time_evaluated": _iso(now),
-            "expires_at": _iso(now + timedelta(seconds=300)),
+            "time_evaluated": CLOCK.stamp(now),
+            "expires_at": CLOCK.stamp(min(expires, until) if until is not None else expires),
         },
         "context": ctx if isinstance(ctx, dict) else {},
     }
+    canonical = canonicalize(payload)
     if _should_sign_success(accept_signature):
-        qh = _query_hash(body, allowlist)
-        return _sign_envelope(payload, qh, [k for k in allowlist if isinstance(ctx, dict) and k in ctx])
-    return payload
+        ctx_keys = [k for k in CONTEXT_ALLOWLIST if isinstance(ctx, dict) and k in ctx]
+        alg = SIGNING_KEYS.select(accept_signature)
+        rendered = await _sign_envelope(canonical, qh, ctx_keys, alg, detached_requested(accept_signature))
+    else:
+        rendered = canonical
+    return Response(content=rendered, media_type="application/json", headers=rl_headers)
+
+
+async def _signed_checkpoint(alg: str) -> Dict[str, Any]:
+    """The feed head and chain hash, signed; memoized until the head or the policy changes."""
+    policy_version = POLICY.version if POLICY is not None else ""
+    key = (CHANGES.head, alg, policy_version)
+    checkpoint = CHECKPOINTS.get(key)
+    if checkpoint is None:
+        statement = CHANGES.checkpoint()
+        if policy_version:
+            # Rules are not in the feed: mirrors must leave authorization queries to the registry.
+            statement["policy_version"] = policy_version
+        statement["issued_at"] = CLOCK.stamp(CLOCK.now())
+        try:
+            jws = await SIGNER.sign(canonicalize(statement), alg)
+        except SignerSaturated as exc:
+            raise HTTPException(status_code=503, detail="signing_unavailable", headers={"Retry-After": str(exc.retry_after)})
+        checkpoint = dict(statement, signature={"alg": alg, "kid": SIGNING_KEYS.kid(alg), "jws": jws})
+        for stale in [k for k in CHECKPOINTS if (k[0], k[2]) != (key[0], key[2])]:
+            del CHECKPOINTS[stale]
+        CHECKPOINTS[key] = checkpoint
+    return checkpoint
+
+
+@app.get("/changes")
+async def get_changes(
+    req: Request,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    authorization: Optional[str] = Header(default=None),
+    accept_signature: Optional[str] = Header(default=None),
+):
+    """Entries after `cursor`, oldest first, with a signed checkpoint of the feed head.
+
+    The cursor is the sequence number of the last entry a client applied; no cursor
+    starts from the beginning. A cursor past the head belongs to another log, and the
+    client must resynchronize from scratch (410).
+    """
+    callers = _rate_limit_callers(req, authorization)
+    await _require_auth(authorization, AUTHORIZATION_SCOPE, RECOGNITION_SCOPE)
+    if not CHANGES.types:
+        raise HTTPException(status_code=404, detail="not_found")
+    if not ((cursor or "0").isascii() and (cursor or "0").isdigit()):
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+    after = int(cursor or "0")
+    if after > CHANGES.head:
+        raise HTTPException(status_code=410, detail="cursor_unknown")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="invalid_limit")
+    rl_headers = _enforce_rate_limit(callers)
+
+    entries = CHANGES.page(after, min(limit or FEED_PAGE_MAX, FEED_PAGE_MAX))
+    last = after + len(entries)
+    tail = json.dumps(
+        {
+            "next_cursor": str(last),
+            "has_more": last < CHANGES.head,
+            "checkpoint": await _signed_checkpoint(SIGNING_KEYS.select(accept_signature)),
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+    # Entries were rendered when journaled; splice them in rather than re-encoding.
+    body = b'{"entries":[' + b",".join(entries) + b"]," + tail[1:]
+    return Response(content=body, media_type="application/json", headers=rl_headers)
+
+
+def _snapshot_keys(start: float, end: float) -> Iterator[Tuple[str, str, str, str]]:
+    """Every key that grants between `start` and `end`: store grants and policy allow rules."""
+    yield from DECISION_STORE.granted(start, end)
+    if POLICY is not None:
+        yield from POLICY.allow_patterns()
+
+
+async def _sign_snapshot(payload: bytes) -> str:
+    try:
+        return await SIGNER.sign(payload, SIGNING_KEYS.default_alg)
+    except SignerSaturated as exc:
+        raise HTTPException(status_code=503, detail="signing_unavailable", headers={"Retry-After": str(exc.retry_after)})
+
+
+@app.get("/snapshot")
+async def get_snapshot(
+    req: Request,
+    authorization: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """The signed Bloom-filter snapshot of authorized keys (compact JWS, see `snapshot`)."""
+    callers = _rate_limit_callers(req, authorization)
+    await _require_auth(authorization, AUTHORIZATION_SCOPE)
+    if SNAPSHOTS is None:
+        raise HTTPException(status_code=404, detail="not_found")
+    rl_headers = _enforce_rate_limit(callers)
+
+    snap = await SNAPSHOTS.get(POLICY.version if POLICY is not None else "", _snapshot_keys, _sign_snapshot)
+    remaining = max(0, int(snap.issued_at + SNAPSHOTS.max_age_seconds - _now().timestamp()))
+    headers = dict(rl_headers, ETag=snap.etag)
+    headers["Cache-Control"] = f"private, max-age={remaining}"
+    if etag_matches(if_none_match, snap.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snap.body, media_type="application/jose", headers=headers)
+
+
+# Registered last: the catch-all must not shadow any other GET route.
+@app.get("/{doc_path:path}")
+def get_public_doc(doc_path: str):
+    path = "/" + doc_path
+    if path in PUBLIC_DOCS:
+        return PUBLIC_DOCS[path]
+    raise HTTPException(status_code=404, detail="not_found")
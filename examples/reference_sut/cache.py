@@ -0,0 +1,83 @@
+"""In-process decision cache for the reference SUT.
+
+Successful query results are cached as the exact response bytes, keyed on
+`(endpoint, query_hash, signing alg)`, so a hit skips evaluation, signing and JSON
+serialization entirely.
+
+Entries are evicted least-recently-used when either `max_entries` or `max_bytes` is
+exceeded, and expire at the earlier of the response's own `expires_at` and the
+freshness policy's `max_staleness_seconds`, so a cached answer is never served
+staler than the metadata promises.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class DecisionCache:
+    def __init__(self, max_entries: int, max_bytes: int, max_ttl_seconds: float) -> None:
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self.max_ttl_seconds = max(0.0, max_ttl_seconds)
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0 and self.max_ttl_seconds > 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        deadline, body = entry
+        if deadline <= time.monotonic():
+            self._drop(key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return body
+
+    def put(self, key: Hashable, body: bytes, expires_in_seconds: float) -> None:
+        """Cache `body` for at most `expires_in_seconds`, capped by `max_ttl_seconds`."""
+        ttl = min(self.max_ttl_seconds, expires_in_seconds)
+        if not self.enabled or ttl <= 0 or len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, body)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "max_ttl_seconds": self.max_ttl_seconds,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
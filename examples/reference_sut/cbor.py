@@ -0,0 +1,104 @@
+"""CBOR response encoding for the reference SUT.
+
+Verifiers on constrained devices spend much of their time parsing JSON and decoding JWS.
+A client that prefers `application/cbor` in its `Accept` header gets `/authorization`,
+`/recognition` and the metadata document in CBOR (RFC 8949), encoded deterministically
+(section 4.2.1), so equal documents are equal bytes. Errors stay JSON.
+
+A signed CBOR response mirrors the JSON envelope, with a COSE_Sign1 (RFC 9052) in place
+of the JWS:
+
+    {"meta": {...},
+     "payload": h'<deterministic CBOR of the payload>',
+     "signature": {"alg", "kid", "cose_sign1": 18([protected, {}, nil, signature]), ...}}
+
+`payload` is a byte string so verifiers hash and verify the exact bytes that were signed
+rather than re-encoding a decoded map. The COSE_Sign1 detaches it (`nil` payload) so it
+is sent once. Its protected header carries the algorithm and the `kid` of the JWKS key
+that verifies it; COSE and JWS signatures have the same byte format for the algorithms
+the SUT signs with.
+
+cbor2 is optional. Without it, a client that accepts JSON too gets JSON, and one that
+accepts only CBOR gets `406`.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - optional dependency
+    cbor2 = None
+
+MEDIA_TYPE = "application/cbor"
+
+COSE_ALGORITHMS = {"ES256": -7, "EdDSA": -8, "RS256": -257}
+_COSE_ALG, _COSE_KID = 1, 4
+_COSE_SIGN1_TAG = 18
+
+
+def available() -> bool:
+    return cbor2 is not None
+
+
+def _media_ranges(accept: Optional[str]) -> List[Tuple[str, float]]:
+    out: List[Tuple[str, float]] = []
+    for item in (accept or "").split(","):
+        parts = [p.strip() for p in item.split(";")]
+        if not parts[0]:
+            continue
+        q = 1.0
+        for p in parts[1:]:
+            name, _, val = p.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        out.append((parts[0].lower(), q if math.isfinite(q) else 0.0))
+    return out
+
+
+def _preference(ranges: List[Tuple[str, float]], media_type: str) -> Tuple[float, int]:
+    """`(q, -position)` of the most specific range matching `media_type`; `(0, 0)` if none does."""
+    wildcard = media_type.split("/")[0] + "/*"
+    best: Optional[Tuple[int, float, int]] = None
+    for position, (media, q) in enumerate(ranges):
+        specificity = {media_type: 2, wildcard: 1, "*/*": 0}.get(media)
+        if specificity is not None and (best is None or specificity > best[0]):
+            best = (specificity, q, -position)
+    return (best[1], best[2]) if best is not None else (0.0, 0)
+
+
+def wants_cbor(accept: Optional[str]) -> bool:
+    """Whether `Accept` ranks CBOR above JSON; on a tie, whichever is listed first wins."""
+    ranges = _media_ranges(accept)
+    cbor_pref = _preference(ranges, MEDIA_TYPE)
+    return cbor_pref[0] > 0 and cbor_pref > _preference(ranges, "application/json")
+
+
+def json_acceptable(accept: Optional[str]) -> bool:
+    ranges = _media_ranges(accept)
+    return not ranges or _preference(ranges, "application/json")[0] > 0
+
+
+def encode(obj: Any) -> bytes:
+    """Deterministic CBOR (RFC 8949 section 4.2.1) of a JSON-like value."""
+    return cbor2.dumps(obj, canonical=True)
+
+
+def sig_structure(alg: str, kid: str, payload: bytes) -> Tuple[bytes, bytes]:
+    """The encoded protected header and the COSE_Sign1 `Sig_structure` to sign (RFC 9052, section 4.4)."""
+    protected = encode({_COSE_ALG: COSE_ALGORITHMS[alg], _COSE_KID: kid.encode("utf-8")})
+    return protected, encode(["Signature1", protected, b"", payload])
+
+
+def sign1(protected: bytes, signature: bytes) -> bytes:
+    """An encoded COSE_Sign1 with a detached payload."""
+    return encode(cbor2.CBORTag(_COSE_SIGN1_TAG, [protected, {}, None, signature]))
+
+
+def envelope(meta: Dict[str, Any], payload: bytes, signature: Dict[str, Any], cose_sign1: bytes) -> bytes:
+    return encode({"meta": meta, "payload": payload, "signature": dict(signature, cose_sign1=cbor2.loads(cose_sign1))})
@@ -0,0 +1,160 @@
+"""Change feed for the reference SUT.
+
+Relying parties that answer most queries from a local replica need the registry's
+facts as a sequence of deltas. `ChangeLog` journals facts as they load into the
+decision store and the recognition graph. Each record that changes what the registry
+holds becomes one entry with the next sequence number:
+
+- `added`: a key the registry did not hold;
+- `changed`: a new value for a held key;
+- `revoked`: a grant or recognition withdrawn, either `authorized` turning false or an
+  edge removed by a `recognized: false` record.
+
+A record that repeats what is already held produces no entry. Keys are the query
+tuple plus `valid_from`, as in the stores, so each version of a fact is its own key.
+
+Entries are rendered to canonical (RFC 8785) JSON once, when journaled, and pages are assembled
+from those bytes. The log also keeps a hash chain, `h[n] = SHA-256(h[n-1] ||
+entry[n])` with `h[0]` all zeros. A checkpoint `(seq, chain_hash)` signed by the
+registry therefore commits to every entry up to `seq`. A mirror that recomputes the
+chain over the entries it applied and reaches the signed hash holds exactly the
+registry's facts.
+
+The log is rebuilt from the source files at startup, so sequence numbers are stable
+across restarts as long as the files are only appended to.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tspp_trqp_harness.jcs import canonicalize
+
+from .history import parse_time
+from .store import _record_key, _truthy
+
+
+def _iso(epoch: float) -> Optional[str]:
+    if math.isinf(epoch):
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class ChangeLog:
+    def __init__(self) -> None:
+        self._entries: List[bytes] = []
+        self._chain: List[bytes] = [bytes(32)]
+        # key -> value currently held, to classify each record
+        self._current: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+        self.types: List[str] = []
+
+        self._skipped = 0
+        self._pages = 0
+
+    @property
+    def head(self) -> int:
+        """Sequence number of the latest entry (0 while empty)."""
+        return len(self._entries)
+
+    def chain_hash(self, seq: int) -> str:
+        return self._chain[seq].hex()
+
+    def _append(self, op: str, entry: Dict[str, Any]) -> None:
+        entry = {"seq": len(self._entries) + 1, "op": op, **{k: v for k, v in entry.items() if v is not None}}
+        raw = canonicalize(entry)
+        self._entries.append(raw)
+        self._chain.append(hashlib.sha256(self._chain[-1] + raw).digest())
+
+    def _classify(self, key: Tuple[Any, ...], value: Optional[Tuple[Any, ...]], granted: bool) -> Optional[str]:
+        """The op for moving `key` to `value` (None: withdrawn), or None if nothing changes."""
+        old = self._current.get(key)
+        if value is None:
+            if old is None:
+                return None
+            del self._current[key]
+            return "revoked"
+        if old == value:
+            return None
+        self._current[key] = value
+        if old is None:
+            return "added"
+        return "revoked" if old[0] and not granted else "changed"
+
+    def journal_authorizations(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass authorization fact records through, journaling each change."""
+        if "authorization" not in self.types:
+            self.types.append("authorization")
+        for rec in records:
+            authority, entity, action, resource = _record_key(rec)
+            authorized = _truthy(rec.get("authorized"))
+            valid_from = _iso(parse_time(rec.get("valid_from"), -math.inf))
+            valid_until = _iso(parse_time(rec.get("valid_until")))
+            key = ("authorization", authority, entity, action, resource, valid_from)
+            op = self._classify(key, (authorized, valid_until), authorized)
+            if op is None:
+                self._skipped += 1
+            else:
+                self._append(op, {
+                    "type": "authorization",
+                    "authority": authority,
+                    "entity": entity,
+                    "action": action,
+                    "resource": resource,
+                    "authorized": authorized,
+                    "valid_from": valid_from,
+                    "valid_until": valid_until,
+                })
+            yield rec
+
+    def journal_recognitions(self, records: Iterable[Dict[str, Any]], transitive_default: bool) -> Iterator[Dict[str, Any]]:
+        """Pass recognition edge records through, journaling each change."""
+        if "recognition" not in self.types:
+            self.types.append("recognition")
+        for rec in records:
+            authority = rec.get("authority") or rec.get("authority_id") or ""
+            subject = rec.get("subject_authority") or rec.get("subject_authority_id") or ""
+            action, resource = rec.get("action") or "*", rec.get("resource") or "*"
+            valid_from = _iso(parse_time(rec.get("valid_from"), -math.inf))
+            recognized = _truthy(rec.get("recognized", True))
+            transitive = rec.get("transitive")
+            transitive = transitive_default if transitive is None else bool(transitive)
+            expires_at = _iso(parse_time(rec.get("expires_at")))
+            key = ("recognition", authority, subject, action, resource, valid_from)
+            value = (True, expires_at, transitive) if recognized else None
+            op = self._classify(key, value, recognized)
+            if op is None:
+                self._skipped += 1
+            else:
+                self._append(op, {
+                    "type": "recognition",
+                    "authority": authority,
+                    "subject_authority": subject,
+                    "action": action,
+                    "resource": resource,
+                    "recognized": recognized,
+                    "transitive": transitive if recognized else None,
+                    "valid_from": valid_from,
+                    "expires_at": expires_at if recognized else None,
+                })
+            yield rec
+
+    def page(self, after: int, limit: int) -> List[bytes]:
+        """Rendered entries with sequence numbers after `after`, at most `limit` of them."""
+        self._pages += 1
+        return self._entries[after : after + limit]
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """The statement a signed checkpoint covers: the head and its chain hash."""
+        return {"seq": self.head, "chain_hash": self.chain_hash(self.head), "hash_alg": "SHA-256", "types": self.types}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "head": self.head,
+            "entries_bytes": sum(len(e) for e in self._entries),
+            "keys": len(self._current),
+            "unchanged_records": self._skipped,
+            "pages_served": self._pages,
+        }
@@ -0,0 +1,75 @@
+"""Pre-rendered discovery documents for the reference SUT.
+
+Metadata and the JWKS are fetched constantly by verifiers but change only when the
+configuration or the key set does. Each document is rendered once per key (base URL,
+assurance level, key-set fingerprint, relevant config) into JSON bytes with a strong
+ETag, and served from memory until its key changes. Nothing is invalidated explicitly:
+a change to any input is a new key, and the stale entry ages out. Keys include the
+request's base URL, which comes from the Host header, so the cache is a small LRU
+rather than an unbounded dict.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+
+class RenderedDocument(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def render_document(doc: Any, encode: Optional[Callable[[Any], bytes]] = None) -> RenderedDocument:
+    """Render to JSON, or with `encode` (e.g. CBOR); the ETag differs per representation."""
+    body = encode(doc) if encode else json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return RenderedDocument(body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 `If-None-Match` evaluation (weak comparison, `*` matches anything)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class DocumentCache:
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max(1, max_entries)
+        self._docs: "OrderedDict[Hashable, RenderedDocument]" = OrderedDict()
+        self._hits = 0
+        self._renders = 0
+        self._not_modified = 0
+
+    def get(self, key: Hashable, build: Callable[[], Any], encode: Optional[Callable[[Any], bytes]] = None) -> RenderedDocument:
+        doc = self._docs.get(key)
+        if doc is not None:
+            self._docs.move_to_end(key)
+            self._hits += 1
+            return doc
+        doc = self._docs[key] = render_document(build(), encode)
+        self._renders += 1
+        while len(self._docs) > self.max_entries:
+            self._docs.popitem(last=False)
+        return doc
+
+    def note_not_modified(self) -> None:
+        self._not_modified += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._docs),
+            "hits": self._hits,
+            "renders": self._renders,
+            "not_modified": self._not_modified,
+        }
@@ -0,0 +1,72 @@
+"""Per-key version history for as-of (`context.time_requested`) queries.
+
+A fact may carry `valid_from` and `valid_until` (RFC 3339). A missing `valid_from` means
+"since always", and a missing `valid_until` means "until superseded". Each version
+supersedes the previous one from its `valid_from` on. So the fact in force at time T is
+the version with the latest `valid_from` at or before T, unless T is at or past that
+version's `valid_until`, in which case there is none. A later version with the same
+`valid_from` replaces the earlier one.
+
+`Timeline` keeps a key's versions sorted by `valid_from` in parallel arrays, so finding
+the version in force at T is one binary search: O(log n) in the key's history, with no
+scan.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Generic, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def parse_time(value: Optional[str], default: float = math.inf) -> float:
+    """RFC 3339 timestamp as epoch seconds; `default` if missing."""
+    if not value:
+        return default
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class Timeline(Generic[T]):
+    __slots__ = ("_starts", "_ends", "_values")
+
+    def __init__(self) -> None:
+        self._starts = array("d")
+        self._ends = array("d")
+        self._values: List[T] = []
+
+    def put(self, value: T, valid_from: float = -math.inf, valid_until: float = math.inf) -> None:
+        i = bisect_left(self._starts, valid_from)
+        if i < len(self._starts) and self._starts[i] == valid_from:
+            self._ends[i] = valid_until
+            self._values[i] = value
+            return
+        self._starts.insert(i, valid_from)
+        self._ends.insert(i, valid_until)
+        self._values.insert(i, value)
+
+    def at(self, when: float) -> Optional[T]:
+        """The value in force at `when`, or None."""
+        i = bisect_right(self._starts, when) - 1
+        if i < 0 or when >= self._ends[i]:
+            return None
+        return self._values[i]
+
+    def values_between(self, start: float, end: float) -> Iterator[T]:
+        """Values in force at some moment in `[start, end)`."""
+        i = max(0, bisect_right(self._starts, start) - 1)
+        while i < len(self._starts) and self._starts[i] < end:
+            # A version is in force until its `valid_until` or the next version's start.
+            until = self._ends[i] if i + 1 == len(self._starts) else min(self._ends[i], self._starts[i + 1])
+            if until > start:
+                yield self._values[i]
+            i += 1
+
+    def __len__(self) -> int:
+        return len(self._values)
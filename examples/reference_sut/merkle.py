@@ -0,0 +1,148 @@
+"""Merkle-batched response signing for the reference SUT.
+
+Opt-in alternative to one signature per response: responses produced within a short
+window are hashed into a Merkle tree (RFC 9162 hashing: 0x00 leaf / 0x01 node
+prefixes, SHA-256), the tree root is signed once, and each envelope carries its leaf
+hash, inclusion proof, and the shared root JWS.
+
+The root JWS payload is the canonical (RFC 8785) JSON statement
+`{"hash_alg": "SHA-256", "iat": ..., "merkle_root": <b64url>, "tree_size": n}`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from tspp_trqp_harness.jcs import canonicalize
+
+from .signing import SigningPool
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + data).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _split(n: int) -> int:
+    """Largest power of two strictly smaller than n (n >= 2)."""
+    k = 1
+    while k << 1 < n:
+        k <<= 1
+    return k
+
+
+def build_tree(leaves: List[bytes]) -> Tuple[bytes, List[List[bytes]]]:
+    """Return the root over leaf hashes and the inclusion proof for every leaf."""
+    proofs: List[List[bytes]] = [[] for _ in leaves]
+
+    def _mth(lo: int, hi: int) -> bytes:
+        if hi - lo == 1:
+            return leaves[lo]
+        k = lo + _split(hi - lo)
+        left, right = _mth(lo, k), _mth(k, hi)
+        # RFC 9162 audit paths list siblings leaf-to-root, so append as recursion unwinds.
+        for i in range(lo, k):
+            proofs[i].append(right)
+        for i in range(k, hi):
+            proofs[i].append(left)
+        return node_hash(left, right)
+
+    return _mth(0, len(leaves)), proofs
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.leaves: List[bytes] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MerkleBatchSigner:
+    def __init__(self, pool: SigningPool, window_ms: float, max_batch: int = 1024) -> None:
+        self.pool = pool
+        self.window_seconds = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._open: Dict[str, _Batch] = {}
+
+        self._batches = 0
+        self._leaves = 0
+        self._max_tree = 0
+
+    async def sign(self, data: bytes, alg: str) -> Dict[str, Any]:
+        """Queue `data` for the current batch of `alg`; resolve to its root JWS and proof."""
+        loop = asyncio.get_running_loop()
+        batch = self._open.get(alg)
+        if batch is None:
+            batch = self._open[alg] = _Batch()
+            batch.timer = loop.call_later(self.window_seconds, self._flush, alg)
+        fut = loop.create_future()
+        batch.leaves.append(leaf_hash(data))
+        batch.futures.append(fut)
+        if len(batch.leaves) >= self.max_batch:
+            self._flush(alg)
+        return await fut
+
+    def _flush(self, alg: str) -> None:
+        batch = self._open.pop(alg, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        asyncio.ensure_future(self._sign_batch(batch, alg))
+
+    async def _sign_batch(self, batch: _Batch, alg: str) -> None:
+        root, proofs = build_tree(batch.leaves)
+        n = len(batch.leaves)
+        statement = {
+            "hash_alg": "SHA-256",
+            "iat": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "merkle_root": b64url(root),
+            "tree_size": n,
+        }
+        try:
+            compact = await self.pool.sign(canonicalize(statement), alg)
+        except Exception as exc:
+            for fut in batch.futures:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        self._batches += 1
+        self._leaves += n
+        self._max_tree = max(self._max_tree, n)
+        for i, fut in enumerate(batch.futures):
+            if fut.done():
+                continue
+            fut.set_result(
+                {
+                    "jws": compact,
+                    "merkle": {
+                        "leaf_hash": b64url(batch.leaves[i]),
+                        "leaf_index": i,
+                        "tree_size": n,
+                        "proof": [b64url(p) for p in proofs[i]],
+                        "root": b64url(root),
+                    },
+                }
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": round(self.window_seconds * 1000.0, 3),
+            "max_batch": self.max_batch,
+            "batches": self._batches,
+            "leaves": self._leaves,
+            "avg_tree_size": round(self._leaves / self._batches, 2) if self._batches else 0.0,
+            "max_tree_size": self._max_tree,
+        }
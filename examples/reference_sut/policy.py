@@ -0,0 +1,311 @@
+"""Declarative authorization policy for the reference SUT.
+
+A policy file is JSON with a `rules` array. Each rule has an `effect` (`allow` or
+`deny`) and the patterns it applies to:
+
+```json
+{"id": "kyc-issuers", "effect": "allow", "authority": "did:example:authority",
+ "entity": "did:example:*", "action": "https://example.org/vocab/action/*",
+ "resource": "*", "context": {"purpose": ["kyc", "aml"]}}
+```
+
+A missing pattern is `*`. A pattern ending in `*` covers every value starting with
+the text before it, which must be empty or end in a namespace separator (`/`, `:`
+or `#`), as in `DecisionStore`. `context` constrains allowlisted context keys to a
+value or a list of values.
+
+When several rules match, the most specific wins. Specificity is compared field by
+field (authority, entity, action, resource). An exact value beats any prefix, and a
+longer prefix beats a shorter one. Then more context constraints beat fewer, and
+`deny` beats `allow`.
+
+The file is compiled at load time into one trie per field, nested in that order, with
+edges labelled by namespace segments. A query walks each field's value once per
+trie it reaches, so it visits only the patterns that could match it, and the rule
+count never enters the cost. Rules at a leaf are indexed by their `(context key,
+value)` constraints, so rules that differ only in context do not pile up either.
+
+`PolicyEngine.watch` recompiles the file in a worker thread when it changes on disk
+and swaps the compiled tables in with one assignment. Queries always see either the
+old policy or the new one, never a mix. A file that fails to compile leaves the
+current policy in force.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+_FIELDS = ("authority", "entity", "action", "resource")
+_SEGMENT = re.compile(r"[^/:#]*[/:#]|[^/:#]+")
+
+
+def _segments(value: str) -> List[str]:
+    """`value` split after each namespace separator."""
+    return _SEGMENT.findall(value)
+
+
+class _Rule(NamedTuple):
+    id: str
+    authorized: bool
+    # (context key, admitted values), sorted by key
+    context: Tuple[Tuple[str, FrozenSet[str]], ...]
+
+    def admits(self, ctx: Dict[str, Any]) -> bool:
+        for key, values in self.context:
+            value = ctx.get(key)
+            if not isinstance(value, str) or value not in values:
+                return False
+        return True
+
+
+class _Leaf:
+    __slots__ = ("unconstrained", "by_context")
+
+    def __init__(self) -> None:
+        self.unconstrained: List[_Rule] = []
+        self.by_context: Dict[Tuple[str, str], List[_Rule]] = {}
+
+    def add(self, rule: _Rule) -> None:
+        if not rule.context:
+            self.unconstrained.append(rule)
+            return
+        key, values = rule.context[0]
+        for value in values:
+            self.by_context.setdefault((key, value), []).append(rule)
+
+    def best(self, ctx: Dict[str, Any]) -> Optional[_Rule]:
+        candidates = list(self.unconstrained)
+        for item in ctx.items():
+            if isinstance(item[1], str):
+                candidates += self.by_context.get(item, ())
+        best: Optional[_Rule] = None
+        for rule in candidates:
+            if rule.admits(ctx) and (best is None or _rank(rule) > _rank(best)):
+                best = rule
+        return best
+
+
+def _rank(rule: _Rule) -> Tuple[int, bool]:
+    return len(rule.context), not rule.authorized
+
+
+class _Trie:
+    """Patterns over one field, keyed by namespace segment; values are the next field's trie (or a leaf)."""
+
+    __slots__ = ("children", "exact", "prefix")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _Trie] = {}
+        self.exact: Any = None
+        self.prefix: Any = None
+
+    def insert(self, pattern: str, make: Any) -> Any:
+        """The slot under `pattern`, created with `make()` if absent."""
+        is_prefix = pattern.endswith("*")
+        node = self
+        for seg in _segments(pattern[:-1] if is_prefix else pattern):
+            node = node.children.setdefault(seg, _Trie())
+        attr = "prefix" if is_prefix else "exact"
+        slot = getattr(node, attr)
+        if slot is None:
+            slot = make()
+            setattr(node, attr, slot)
+        return slot
+
+    def matches(self, segments: Sequence[str]) -> List[Any]:
+        """Slots whose pattern covers the value split into `segments`, most specific first."""
+        found: List[Any] = []
+        node: Optional[_Trie] = self
+        for seg in segments:
+            if node.prefix is not None:
+                found.append(node.prefix)
+            node = node.children.get(seg)
+            if node is None:
+                break
+        if node is not None:
+            if node.prefix is not None:
+                found.append(node.prefix)
+            if node.exact is not None:
+                found.append(node.exact)
+        found.reverse()
+        return found
+
+    def nodes(self) -> int:
+        """Trie nodes here and in the nested tries of later fields."""
+        count = 1 + sum(child.nodes() for child in self.children.values())
+        for slot in (self.exact, self.prefix):
+            if isinstance(slot, _Trie):
+                count += slot.nodes()
+        return count
+
+
+def _check_pattern(pattern: Any, where: str) -> str:
+    if pattern is None:
+        return "*"
+    if not isinstance(pattern, str):
+        raise ValueError(f"{where} must be a string")
+    if "*" in pattern[:-1] or (pattern.endswith("*") and len(pattern) > 1 and pattern[-2] not in "/:#"):
+        raise ValueError(f"{where} may only end in '*' after a namespace separator")
+    return pattern
+
+
+class CompiledPolicy(NamedTuple):
+    policy_id: str
+    version: str
+    rules: int
+    nodes: int
+    root: _Trie
+    # (authority, entity, action, resource) patterns of the allow rules
+    allows: Tuple[Tuple[str, str, str, str], ...]
+
+    def evaluate(self, terms: Sequence[str], ctx: Dict[str, Any]) -> Optional[_Rule]:
+        """The winning rule for `(authority, entity, action, resource)` under `ctx`, if any rule matches."""
+        split = [_segments(t) for t in terms]
+        return self._walk(self.root, split, 0, ctx)
+
+    def _walk(self, trie: _Trie, split: List[List[str]], depth: int, ctx: Dict[str, Any]) -> Optional[_Rule]:
+        # Candidates come most specific first, so the first field that matches at all decides.
+        for slot in trie.matches(split[depth]):
+            if depth == len(_FIELDS) - 1:
+                rule = slot.best(ctx)
+            else:
+                rule = self._walk(slot, split, depth + 1, ctx)
+            if rule is not None:
+                return rule
+        return None
+
+
+def compile_policy(doc: Any, context_keys: Iterable[str], version: str = "") -> CompiledPolicy:
+    """Compile a parsed policy document; raises ValueError naming the first bad rule."""
+    if not isinstance(doc, dict) or not isinstance(doc.get("rules"), list):
+        raise ValueError("policy must be an object with a 'rules' array")
+    allowed_keys = set(context_keys)
+    root = _Trie()
+    allows = []
+    for i, raw in enumerate(doc["rules"]):
+        where = f"rule {i}"
+        if not isinstance(raw, dict):
+            raise ValueError(f"{where} must be an object")
+        effect = raw.get("effect")
+        if effect not in ("allow", "deny"):
+            raise ValueError(f"{where}: effect must be 'allow' or 'deny'")
+        constraints = raw.get("context") or {}
+        if not isinstance(constraints, dict):
+            raise ValueError(f"{where}: context must be an object")
+        context = []
+        for key in sorted(constraints):
+            if key not in allowed_keys:
+                raise ValueError(f"{where}: context key '{key}' is not allowlisted")
+            values = constraints[key]
+            values = [values] if isinstance(values, str) else values
+            if not isinstance(values, list) or not values or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"{where}: context.{key} must be a string or a non-empty list of strings")
+            context.append((key, frozenset(values)))
+        rule = _Rule(str(raw.get("id", i)), effect == "allow", tuple(context))
+
+        node: Any = root
+        patterns = []
+        for depth, field in enumerate(_FIELDS):
+            pattern = _check_pattern(raw.get(field), f"{where}: {field}")
+            patterns.append(pattern)
+            last = depth == len(_FIELDS) - 1
+            node = node.insert(pattern, _Leaf if last else _Trie)
+        node.add(rule)
+        if rule.authorized:
+            allows.append(tuple(patterns))
+    return CompiledPolicy(
+        str(doc.get("policy_id", "")), version, len(doc["rules"]), root.nodes(), root, tuple(allows)
+    )
+
+
+class PolicyEngine:
+    def __init__(self, path: Union[str, Path], context_keys: Iterable[str]) -> None:
+        self.path = Path(path)
+        self.context_keys = list(context_keys)
+        self._stamp = self._stat()
+        self._compiled = self._compile()
+
+        self._evaluations = 0
+        self._matched = 0
+        self._reloads = 0
+        self._reload_failures = 0
+        self._last_error: Optional[str] = None
+
+    def _stat(self) -> Tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def _compile(self) -> CompiledPolicy:
+        started = time.perf_counter()
+        raw = self.path.read_bytes()
+        version = hashlib.sha256(raw).hexdigest()[:16]
+        compiled = compile_policy(json.loads(raw), self.context_keys, version)
+        self._compile_ms = round((time.perf_counter() - started) * 1000, 3)
+        return compiled
+
+    @property
+    def version(self) -> str:
+        return self._compiled.version
+
+    def evaluate(self, authority: str, entity: str, action: str, resource: str, ctx: Any) -> Optional[bool]:
+        """The policy decision for a query, or None if no rule matches it."""
+        self._evaluations += 1
+        rule = self._compiled.evaluate((authority, entity, action, resource), ctx if isinstance(ctx, dict) else {})
+        if rule is None:
+            return None
+        self._matched += 1
+        return rule.authorized
+
+    def allow_patterns(self) -> Tuple[Tuple[str, str, str, str], ...]:
+        """`(authority, entity, action, resource)` patterns of every allow rule, context aside."""
+        return self._compiled.allows
+
+    def reload_if_changed(self) -> bool:
+        """Recompile if the file changed on disk; True if a new policy is now in force."""
+        try:
+            stamp = self._stat()
+        except OSError as exc:
+            self._last_error = str(exc)
+            return False
+        if stamp == self._stamp:
+            return False
+        # A file that fails to compile is not retried until it changes again.
+        self._stamp = stamp
+        try:
+            compiled = self._compile()
+        except (OSError, ValueError) as exc:
+            self._reload_failures += 1
+            self._last_error = str(exc)
+            return False
+        self._compiled = compiled
+        self._reloads += 1
+        self._last_error = None
+        return True
+
+    async def watch(self, interval_seconds: float) -> None:
+        """Poll the policy file and swap in recompiled tables until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(self.reload_if_changed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "policy_id": self._compiled.policy_id,
+            "version": self._compiled.version,
+            "rules": self._compiled.rules,
+            "trie_nodes": self._compiled.nodes,
+            "compile_ms": self._compile_ms,
+            "evaluations": self._evaluations,
+            "matched": self._matched,
+            "reloads": self._reloads,
+            "reload_failures": self._reload_failures,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,129 @@
+"""Per-caller token-bucket rate limiting for the reference SUT.
+
+Each caller key (a client credential digest or a peer IP) owns a token bucket that
+refills at `rate` tokens per second up to `burst`. Buckets are spread across shards,
+each with its own lock and LRU, so callers never contend on a single global lock.
+
+A bucket that has been idle long enough to refill completely behaves exactly like a
+missing one, so it is dropped on the next sweep of its shard. When a shard still holds
+more than its share of `max_keys`, its least-recently-used buckets are evicted too,
+keeping memory bounded under key churn (e.g. spoofed source addresses).
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class RateDecision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: float
+    retry_after_seconds: float
+
+    def headers(self) -> Dict[str, str]:
+        """RateLimit-* fields for this caller (reset is delta-seconds until the bucket is full)."""
+        h = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_seconds)),
+        }
+        if not self.allowed:
+            h["Retry-After"] = str(max(1, math.ceil(self.retry_after_seconds)))
+        return h
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets", "allowed", "limited", "idle_evictions", "pressure_evictions")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # key -> [tokens, last_update_monotonic], least recently used first.
+        self.buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+        self.idle_evictions = 0
+        self.pressure_evictions = 0
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate: float, burst: int, shards: int = 64, max_keys: int = 100000) -> None:
+        self.rate = max(1e-9, float(rate))
+        self.burst = max(1, int(burst))
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._max_per_shard = max(1, max_keys // len(self._shards))
+        # An untouched bucket is full again after this long, so it can be forgotten.
+        self._idle_seconds = self.burst / self.rate
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def take(self, key: str, cost: int = 1, now: Optional[float] = None) -> RateDecision:
+        """Consume `cost` tokens from `key`'s bucket if available."""
+        now = time.monotonic() if now is None else now
+        shard = self._shard(key)
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                self._sweep(shard, now)
+                bucket = shard.buckets[key] = [float(self.burst), now]
+            else:
+                bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                shard.buckets.move_to_end(key)
+            allowed = bucket[0] >= cost
+            if allowed:
+                bucket[0] -= cost
+                shard.allowed += 1
+            else:
+                shard.limited += 1
+            tokens = bucket[0]
+
+        return RateDecision(
+            allowed=allowed,
+            limit=self.burst,
+            remaining=int(tokens),
+            reset_seconds=(self.burst - tokens) / self.rate,
+            retry_after_seconds=0.0 if allowed else (cost - tokens) / self.rate,
+        )
+
+    def refund(self, key: str, cost: int = 1) -> None:
+        """Return tokens taken by a request that another limiter then rejected."""
+        shard = self._shard(key)
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(float(self.burst), bucket[0] + cost)
+
+    def _sweep(self, shard: _Shard, now: float) -> None:
+        buckets = shard.buckets
+        # LRU order means the first bucket that is not yet full-again ends the idle scan.
+        while buckets:
+            key, (_, last) = next(iter(buckets.items()))
+            if now - last < self._idle_seconds:
+                break
+            del buckets[key]
+            shard.idle_evictions += 1
+        while len(buckets) >= self._max_per_shard:
+            buckets.popitem(last=False)
+            shard.pressure_evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        allowed = sum(s.allowed for s in self._shards)
+        limited = sum(s.limited for s in self._shards)
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "shards": len(self._shards),
+            "keys": sum(len(s.buckets) for s in self._shards),
+            "max_keys": self._max_per_shard * len(self._shards),
+            "allowed": allowed,
+            "limited": limited,
+            "idle_evictions": sum(s.idle_evictions for s in self._shards),
+            "pressure_evictions": sum(s.pressure_evictions for s in self._shards),
+        }
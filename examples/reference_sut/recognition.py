@@ -0,0 +1,375 @@
+"""Recognition graph for the reference SUT.
+
+An edge is a recognition fact: authority A recognizes authority B, for a scope (an
+`action` / `resource` pattern, with `*` namespaces as in `DecisionStore`), until an
+expiry. A transitive edge also accepts the authorities B recognizes. A chain A -> B -> C
+therefore recognizes C for A when:
+
+- every edge except the last is transitive;
+- every edge is in force: past its `valid_from` (if any) and not yet expired;
+- every edge's scope covers the query;
+- the chain has at most `max_chain_depth` edges.
+
+Queries do not walk the graph. For every (source, target) pair reachable within
+`max_chain_depth` edges, the graph keeps the Pareto-optimal path summaries: depth,
+latest start, earliest expiry, intersected scope, and whether the chain may be
+extended. A query scans the few summaries for its pair, so it costs the same however
+large or deep the graph is. Each summary is a validity interval, so a query as of a
+past time (`context.time_requested`) is the same scan against a different clock. Adding an edge joins the paths into its tail with the paths out of its head.
+Removing one recomputes only the sources whose paths could have used it.
+
+Recognition matrices ("which of these M authorities does each of these N recognize?")
+use per-source bitsets over interned subject ids. One bitset marks every subject the
+source reaches at all. The other marks the subjects it reaches by an unscoped chain, and
+holds while every such chain is in force. A matrix row is two integer ANDs with the mask
+of requested subjects, and only reached subjects outside the second bitset are checked
+one by one.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from .history import parse_time
+
+
+class _Path(NamedTuple):
+    depth: int
+    valid_from: float
+    expires_at: float
+    action: str
+    resource: str
+    open: bool  # the last edge is transitive, so the chain may continue
+
+
+# Joining with the empty path is the identity.
+_EMPTY = _Path(0, -math.inf, math.inf, "*", "*", True)
+
+
+def _covers(pattern: str, value: str) -> bool:
+    return pattern == "*" or pattern == value or (pattern.endswith("*") and value.startswith(pattern[:-1]))
+
+
+def _narrower(a: str, b: str) -> Optional[str]:
+    """Intersection of two scope patterns, or None if they are disjoint."""
+    if _covers(a, b):
+        return b
+    if _covers(b, a):
+        return a
+    return None
+
+
+def _dominates(p: _Path, q: _Path) -> bool:
+    return (
+        p.depth <= q.depth
+        and p.valid_from <= q.valid_from
+        and p.expires_at >= q.expires_at
+        and (p.open or not q.open)
+        and _covers(p.action, q.action)
+        and _covers(p.resource, q.resource)
+    )
+
+
+def _join(first: _Path, second: _Path, max_depth: int) -> Optional[_Path]:
+    if second.depth == 0:
+        return first
+    if not first.open or first.depth + second.depth > max_depth:
+        return None
+    action = _narrower(first.action, second.action)
+    resource = _narrower(first.resource, second.resource)
+    valid_from = max(first.valid_from, second.valid_from)
+    expires_at = min(first.expires_at, second.expires_at)
+    if action is None or resource is None or valid_from >= expires_at:
+        return None
+    return _Path(
+        first.depth + second.depth,
+        valid_from,
+        expires_at,
+        action,
+        resource,
+        second.open,
+    )
+
+
+def _set_bits(x: int) -> Iterator[int]:
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+class RecognitionGraph:
+    def __init__(self, max_chain_depth: int = 1, transitive_default: bool = False) -> None:
+        self.max_chain_depth = max(0, max_chain_depth)
+        self.transitive_default = transitive_default
+        # authority -> (subject, action, resource, valid_from) -> edge, as a depth-1 path
+        self._edges: Dict[str, Dict[Tuple[str, str, str, float], _Path]] = {}
+        # source -> target -> non-dominated path summaries
+        self._reach: Dict[str, Dict[str, List[_Path]]] = {}
+        # target -> sources holding summaries for it
+        self._sources: Dict[str, Set[str]] = {}
+        # Subject bit ids, and per-source bitsets for matrix queries.
+        self._bit: Dict[str, int] = {}
+        self._subjects: List[str] = []
+        self._reach_bits: Dict[str, int] = {}
+        self._unscoped_bits: Dict[str, int] = {}
+        # Bounds on the validity of every unscoped chain in `_unscoped_bits`: all start
+        # by `_unscoped_from` and none expires before `_unscoped_until`.
+        self._unscoped_from: Dict[str, float] = {}
+        self._unscoped_until: Dict[str, float] = {}
+
+        self._lookups = 0
+        self._recognized = 0
+        self._rebuilds = 0
+        self._matrix_queries = 0
+        self._matrix_cells = 0
+        self._matrix_checked = 0
+
+    def _record(self, source: str, target: str, path: _Path) -> bool:
+        """Add `path` to the index unless an existing summary dominates it."""
+        paths = self._reach.setdefault(source, {}).setdefault(target, [])
+        if any(_dominates(p, path) for p in paths):
+            return False
+        paths[:] = [p for p in paths if not _dominates(path, p)]
+        paths.append(path)
+        self._sources.setdefault(target, set()).add(source)
+
+        bit = self._bit.get(target)
+        if bit is None:
+            bit = self._bit[target] = len(self._subjects)
+            self._subjects.append(target)
+        self._reach_bits[source] = self._reach_bits.get(source, 0) | (1 << bit)
+        if path.action == "*" and path.resource == "*":
+            # A summary that later dominates this one is unscoped too, starts no later and expires no earlier.
+            self._unscoped_bits[source] = self._unscoped_bits.get(source, 0) | (1 << bit)
+            self._unscoped_from[source] = max(self._unscoped_from.get(source, -math.inf), path.valid_from)
+            self._unscoped_until[source] = min(self._unscoped_until.get(source, math.inf), path.expires_at)
+        return True
+
+    def add_edge(
+        self,
+        authority: str,
+        subject: str,
+        action: str = "*",
+        resource: str = "*",
+        expires_at: float = math.inf,
+        transitive: Optional[bool] = None,
+        valid_from: float = -math.inf,
+    ) -> None:
+        """Add (or replace) a recognition edge and every chain through it."""
+        edge = _Path(
+            1,
+            valid_from,
+            expires_at,
+            action or "*",
+            resource or "*",
+            self.transitive_default if transitive is None else transitive,
+        )
+        key = (subject, edge.action, edge.resource, valid_from)
+        if key in self._edges.get(authority, {}):
+            self.remove_edge(authority, subject, edge.action, edge.resource, valid_from)
+        if valid_from >= expires_at:
+            # Never in force: the record only withdraws the edge it replaces.
+            return
+        self._edges.setdefault(authority, {})[key] = edge
+
+        limit = self.max_chain_depth
+        heads = [(authority, _EMPTY)] + [
+            (s, p) for s in self._sources.get(authority, ()) for p in self._reach[s][authority] if p.open
+        ]
+        tails = [(subject, _EMPTY)] + [(t, q) for t, qs in self._reach.get(subject, {}).items() for q in qs]
+        for source, head in heads:
+            first = _join(head, edge, limit)
+            if first is None:
+                continue
+            for target, tail in tails:
+                path = _join(first, tail, limit)
+                if path is not None:
+                    self._record(source, target, path)
+
+    def remove_edge(
+        self, authority: str, subject: str, action: str = "*", resource: str = "*", valid_from: float = -math.inf
+    ) -> bool:
+        out = self._edges.get(authority)
+        key = (subject, action or "*", resource or "*", valid_from)
+        if not out or key not in out:
+            return False
+        del out[key]
+        # Only chains that reach `authority` still open could have continued over the edge.
+        affected = {authority} | {
+            s for s in self._sources.get(authority, ()) if any(p.open for p in self._reach[s][authority])
+        }
+        for source in affected:
+            self._rebuild(source)
+        return True
+
+    def _rebuild(self, source: str) -> None:
+        """Recompute `source`'s summaries breadth-first, one chain depth per round."""
+        self._rebuilds += 1
+        for target in self._reach.pop(source, {}):
+            sources = self._sources[target]
+            sources.discard(source)
+            if not sources:
+                del self._sources[target]
+        self._reach_bits.pop(source, None)
+        self._unscoped_bits.pop(source, None)
+        self._unscoped_from.pop(source, None)
+        self._unscoped_until.pop(source, None)
+        limit = self.max_chain_depth
+        frontier = [(source, _EMPTY)]
+        for _ in range(limit):
+            nxt = []
+            for node, head in frontier:
+                for (subject, _, _, _), edge in self._edges.get(node, {}).items():
+                    path = _join(head, edge, limit)
+                    if path is not None and self._record(source, subject, path):
+                        nxt.append((subject, path))
+            frontier = nxt
+
+    def recognized_until(
+        self,
+        authority: str,
+        subject: str,
+        action: str = "",
+        resource: str = "",
+        now: Optional[float] = None,
+    ) -> Optional[float]:
+        """Expiry of the longest-lived chain by which `authority` recognizes `subject` at `now`, or None."""
+        self._lookups += 1
+        best = self._until(authority, subject, action, resource, time.time() if now is None else now)
+        if best is not None:
+            self._recognized += 1
+        return best
+
+    def _until(self, authority: str, subject: str, action: str, resource: str, now: float) -> Optional[float]:
+        best: Optional[float] = None
+        for p in self._reach.get(authority, {}).get(subject, ()):
+            if p.valid_from <= now < p.expires_at and _covers(p.action, action) and _covers(p.resource, resource):
+                if best is None or p.expires_at > best:
+                    best = p.expires_at
+        return best
+
+    def recognition_matrix(
+        self,
+        authorities: List[str],
+        subjects: List[str],
+        action: str = "",
+        resource: str = "",
+        now: Optional[float] = None,
+    ) -> Tuple[List[List[bool]], Optional[float]]:
+        """Whether each authority recognizes each subject, and the earliest expiry among the recognitions."""
+        now = time.time() if now is None else now
+        columns: Dict[int, List[int]] = {}
+        mask = 0
+        for j, subject in enumerate(subjects):
+            bit = self._bit.get(subject)
+            if bit is not None:
+                columns.setdefault(bit, []).append(j)
+                mask |= 1 << bit
+
+        rows: List[List[bool]] = []
+        until: Optional[float] = None
+        checked = 0
+        for authority in authorities:
+            row = [False] * len(subjects)
+            hits = self._reach_bits.get(authority, 0) & mask
+            sure = 0
+            if (
+                hits
+                and self._unscoped_from.get(authority, math.inf) <= now
+                and self._unscoped_until.get(authority, -math.inf) > now
+            ):
+                sure = hits & self._unscoped_bits.get(authority, 0)
+                if sure:
+                    bound = self._unscoped_until[authority]
+                    until = bound if until is None else min(until, bound)
+            for bit in _set_bits(sure):
+                for j in columns[bit]:
+                    row[j] = True
+            for bit in _set_bits(hits & ~sure):
+                checked += 1
+                best = self._until(authority, self._subjects[bit], action, resource, now)
+                if best is not None:
+                    until = best if until is None else min(until, best)
+                    for j in columns[bit]:
+                        row[j] = True
+            rows.append(row)
+
+        self._matrix_queries += 1
+        self._matrix_cells += len(authorities) * len(subjects)
+        self._matrix_checked += checked
+        return rows, until
+
+    @classmethod
+    def load(
+        cls,
+        *paths: Union[str, Path],
+        max_chain_depth: int = 1,
+        transitive_default: bool = False,
+        journal: Optional[Callable[[Iterable[Dict[str, Any]]], Iterable[Dict[str, Any]]]] = None,
+    ) -> "RecognitionGraph":
+        """Load edges from JSONL files, or from the `edges` arrays of `.json` fixture files.
+
+        `journal`, if given, wraps each file's records on their way in (see `changes.ChangeLog`).
+        """
+        graph = cls(max_chain_depth, transitive_default)
+        for path in paths:
+            records = _read_edges(Path(path))
+            graph.extend(journal(records) if journal else records)
+        return graph
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for rec in records:
+            recognized = rec.get("recognized", True)
+            if isinstance(recognized, str):
+                recognized = recognized.strip().lower() == "true"
+            if not recognized:
+                # A withdrawn recognition removes the edge an earlier record added.
+                self.remove_edge(
+                    rec.get("authority") or rec.get("authority_id") or "",
+                    rec.get("subject_authority") or rec.get("subject_authority_id") or "",
+                    rec.get("action") or "*",
+                    rec.get("resource") or "*",
+                    parse_time(rec.get("valid_from"), -math.inf),
+                )
+                continue
+            transitive = rec.get("transitive")
+            self.add_edge(
+                rec.get("authority") or rec.get("authority_id") or "",
+                rec.get("subject_authority") or rec.get("subject_authority_id") or "",
+                rec.get("action") or "*",
+                rec.get("resource") or "*",
+                parse_time(rec.get("expires_at")),
+                None if transitive is None else bool(transitive),
+                parse_time(rec.get("valid_from"), -math.inf),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_chain_depth": self.max_chain_depth,
+            "transitive_default": self.transitive_default,
+            "edges": sum(len(out) for out in self._edges.values()),
+            "reachable_pairs": sum(len(targets) for targets in self._reach.values()),
+            "path_summaries": sum(len(p) for targets in self._reach.values() for p in targets.values()),
+            "lookups": self._lookups,
+            "recognized": self._recognized,
+            "rebuilds": self._rebuilds,
+            "subjects_indexed": len(self._subjects),
+            "matrix_queries": self._matrix_queries,
+            "matrix_cells": self._matrix_cells,
+            "matrix_cells_checked": self._matrix_checked,
+        }
+
+
+def _read_edges(path: Path) -> Iterator[Dict[str, Any]]:
+    if path.suffix == ".json":
+        yield from json.loads(path.read_text(encoding="utf-8")).get("edges", [])
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,144 @@
+"""Byte-template rendering of authorization and recognition responses.
+
+Two responses differ only in their decision, context, timestamps, query hash and
+signature. Everything else is rendered once into byte templates, and each response
+splices its own values in. That covers member names, and the algorithm, key id and
+canonicalization parameters of the signature block. No per-response dicts are built
+or serialized.
+
+The templates write members in RFC 8785 order. A rendered payload is byte-for-byte
+`canonicalize()` of the equivalent dict (`Answer.as_dict`), so it is still exactly what
+is hashed and signed. `scripts/bench_rendering.py` checks this and times both paths.
+
+Timestamps have one-second granularity. They come from a shared `SecondClock`, which
+formats each second once for all the responses rendered within it.
+"""
+
+from __future__ import annotations
+
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from tspp_trqp_harness.jcs import canonicalize
+
+AUTHORIZATION = "authorization"
+RECOGNITION = "recognition"
+
+_SCALARS = {True: b"true", False: b"false", "true": b'"true"', "false": b'"false"', "indeterminate": b'"indeterminate"'}
+
+
+class SecondClock:
+    """Wall-clock epoch seconds, with RFC 3339 stamps memoized per second."""
+
+    def __init__(self, time_fn: Callable[[], float] = time.time, max_stamps: int = 256) -> None:
+        self._time = time_fn
+        self.max_stamps = max(1, max_stamps)
+        self._stamps: Dict[int, str] = {}
+
+    def now(self) -> int:
+        return int(self._time())
+
+    def stamp(self, epoch: int) -> str:
+        """`YYYY-MM-DDTHH:MM:SSZ` for `epoch`; formatted once per distinct second."""
+        s = self._stamps.get(epoch)
+        if s is None:
+            if len(self._stamps) >= self.max_stamps:
+                # Stamps in use cluster around the current second: start over rather than track recency.
+                self._stamps.clear()
+            s = self._stamps[epoch] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
+        return s
+
+
+def _scalar(value: Any) -> bytes:
+    rendered = _SCALARS.get(value) if type(value) in (bool, str) else None
+    return rendered if rendered is not None else canonicalize(value)
+
+
+def _context(ctx: Dict[str, Any]) -> bytes:
+    return canonicalize(ctx) if ctx else b"{}"
+
+
+class Answer(NamedTuple):
+    """One authorization or recognition result, before rendering."""
+
+    kind: str  # AUTHORIZATION or RECOGNITION
+    value: Any  # `decision.authorized` (tri-state string) or `recognized` (bool)
+    context: Dict[str, Any]
+    time_evaluated: str
+    expires_at: str
+    expires_epoch: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        meta = {"time_evaluated": self.time_evaluated, "expires_at": self.expires_at}
+        if self.kind == AUTHORIZATION:
+            return {"decision": {"authorized": self.value}, "meta": meta, "context": self.context}
+        return {"recognized": self.value, "meta": meta, "context": self.context}
+
+    def render(self) -> bytes:
+        """The canonical (RFC 8785) JSON payload."""
+        ctx, value = _context(self.context), _scalar(self.value)
+        expires_at, time_evaluated = self.expires_at.encode("ascii"), self.time_evaluated.encode("ascii")
+        if self.kind == AUTHORIZATION:
+            return b"".join((
+                b'{"context":', ctx,
+                b',"decision":{"authorized":', value,
+                b'},"meta":{"expires_at":"', expires_at, b'","time_evaluated":"', time_evaluated, b'"}}',
+            ))
+        return b"".join((
+            b'{"context":', ctx,
+            b',"meta":{"expires_at":"', expires_at, b'","time_evaluated":"', time_evaluated,
+            b'"},"recognized":', value, b"}",
+        ))
+
+
+class SignatureTemplate:
+    """The `signature` member of an envelope, for one key, algorithm and set of bound context keys."""
+
+    def __init__(self, alg: str, kid: str, ctx_keys: Tuple[str, ...], detached: bool) -> None:
+        head = {
+            "alg": alg,
+            "canonicalization": {"json": "RFC8785", "unicode": "none", "context_keys_included": list(ctx_keys)},
+        }
+        self._head = (
+            canonicalize(head)[:-1]
+            + (b',"detached_payload":true' if detached else b"")
+            + b',"hash_alg":"SHA-256","issued_at":"'
+        )
+        self._kid = b'","kid":' + canonicalize(kid) + b","
+
+    def render(self, issued_at: str, jws: str, query_hash: str, merkle: Optional[Dict[str, Any]] = None) -> bytes:
+        return b"".join((
+            self._head, issued_at.encode("ascii"),
+            b'","jws":"', jws.encode("ascii"),
+            self._kid,
+            b'"merkle":' + canonicalize(merkle) + b"," if merkle is not None else b"",
+            b'"query_hash":"', query_hash.encode("ascii"), b'"}',
+        ))
+
+
+@lru_cache(maxsize=256)
+def signature_template(alg: str, kid: str, ctx_keys: Tuple[str, ...], detached: bool) -> SignatureTemplate:
+    return SignatureTemplate(alg, kid, ctx_keys, detached)
+
+
+def signed_envelope(query_hash: str, iat: str, exp: str, payload: bytes, signature: bytes) -> bytes:
+    """A signed envelope around a canonical payload and a rendered signature member."""
+    return b"".join((
+        b'{"meta":{"exp":"', exp.encode("ascii"), b'","iat":"', iat.encode("ascii"),
+        b'","query_hash":"', query_hash.encode("ascii"),
+        b'"},"payload":', payload, b',"signature":', signature, b"}",
+    ))
+
+
+def batch_item(answer: Answer) -> bytes:
+    return b'{"body":' + answer.render() + b',"status":200}'
+
+
+def batch_error(status: int, detail: Any) -> bytes:
+    return canonicalize({"status": status, "error": {"detail": detail}})
+
+
+def batch(items: List[bytes]) -> bytes:
+    """A batch payload from rendered items, in request order."""
+    return b'{"results":[' + b",".join(items) + b"]}"
@@ -0,0 +1,325 @@
+"""Cross-worker shared state for the multi-process reference SUT.
+
+When the SUT runs under several worker processes (`python -m examples.reference_sut
+--workers N`), each worker maps the same files from `TSPP_REF_SHARED_DIR`:
+
+- rate-limit buckets, so limits apply to the host as a whole rather than N times over;
+- the decision cache, so a result computed by one worker is served by all of them;
+- the signing key set, so every worker signs with, and publishes, the same JWKS.
+
+Segments are fixed-size, zero-initialised files mapped with `mmap`. Each segment is
+split into shards guarded by one-byte `fcntl` record locks (plus a thread lock, since
+record locks do not exclude threads of the same process), so workers contend only
+when they touch the same shard. A zeroed slot is empty, so a fresh file needs no
+initialisation beyond sizing. POSIX only.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, Optional, Sequence
+
+from jwcrypto import jwk
+
+from .ratelimit import RateDecision
+from .signing import KeySet
+
+_PROBE_WINDOW = 16
+
+
+def _tag(key: str) -> int:
+    """Non-zero 64-bit key tag (zero marks an empty slot)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+
+def keyset_from_file(path: str, algorithms: Sequence[str]) -> KeySet:
+    """Load the signing keys at `path`, generating and saving any that are missing.
+
+    The file is locked while it is read and written, so workers starting together all
+    end up with the key set written by whichever of them got there first.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(fd, "r+", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        raw = f.read()
+        stored = {k["alg"]: jwk.JWK(**k) for k in json.loads(raw)["keys"]} if raw.strip() else {}
+        keys = KeySet(algorithms, stored)
+        if any(alg not in stored for alg in keys.algorithms):
+            merged = {k["alg"]: k for k in (json.loads(raw)["keys"] if raw.strip() else [])}
+            merged.update({k["alg"]: k for k in json.loads(keys.private_json())["keys"]})
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({"keys": list(merged.values())}))
+            f.flush()
+            os.fsync(f.fileno())
+    return keys
+
+
+class SharedSegment:
+    """A zero-initialised file of `size` bytes mapped by every worker, with per-shard locks."""
+
+    def __init__(self, path: str, size: int, shards: int) -> None:
+        self.path = path
+        self.size = size
+        self.shards = max(1, shards)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            current = os.fstat(self._fd).st_size
+            if current == 0:
+                os.ftruncate(self._fd, size)
+            elif current != size:
+                raise ValueError(
+                    f"shared segment {path} is {current} bytes, expected {size}; "
+                    "all workers must share the same rate-limit and cache configuration"
+                )
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self.buf = mmap.mmap(self._fd, size)
+        self._thread_locks = [threading.Lock() for _ in range(self.shards)]
+
+    @contextmanager
+    def locked(self, shard: int) -> Iterator[None]:
+        with self._thread_locks[shard]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, shard)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, shard)
+
+
+class SharedTokenBucketLimiter:
+    """`TokenBucketLimiter` with its buckets in a shared segment.
+
+    Each shard is a small open-addressed table of `(tag, tokens, last)` slots probed over
+    a fixed window. A slot whose bucket has refilled completely counts as free; when a
+    window has no free slot, the least recently used bucket in it is evicted.
+    """
+
+    _SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, path: str, rate: float, burst: int, shards: int = 64, max_keys: int = 100000) -> None:
+        self.rate = max(1e-9, float(rate))
+        self.burst = max(1, int(burst))
+        shards = max(1, shards)
+        self._per_shard = max(1, max_keys // shards)
+        self._window = min(_PROBE_WINDOW, self._per_shard)
+        self._idle_seconds = self.burst / self.rate
+        self._seg = SharedSegment(path, shards * self._per_shard * self._SLOT.size, shards)
+
+        self._allowed = 0
+        self._limited = 0
+        self._idle_evictions = 0
+        self._pressure_evictions = 0
+
+    def _slots(self, tag: int) -> Iterator[int]:
+        shard = tag % self._seg.shards
+        base = shard * self._per_shard
+        start = (tag // self._seg.shards) % self._per_shard
+        for i in range(self._window):
+            yield (base + (start + i) % self._per_shard) * self._SLOT.size
+
+    def _find(self, tag: int, now: float) -> tuple[int, bool]:
+        """Offset of `tag`'s slot, or of the slot to reuse for it; and whether it was found."""
+        buf = self._seg.buf
+        free: Optional[int] = None
+        free_idle = False
+        oldest, oldest_last = -1, math.inf
+        for off in self._slots(tag):
+            t, _, last = self._SLOT.unpack_from(buf, off)
+            if t == tag:
+                return off, True
+            if free is None and (t == 0 or now - last >= self._idle_seconds):
+                free, free_idle = off, t != 0
+            if last < oldest_last:
+                oldest, oldest_last = off, last
+        if free is not None:
+            if free_idle:
+                self._idle_evictions += 1
+            return free, False
+        self._pressure_evictions += 1
+        return oldest, False
+
+    def take(self, key: str, cost: int = 1, now: Optional[float] = None) -> RateDecision:
+        # CLOCK_MONOTONIC is system-wide on Linux, so timestamps are comparable across workers.
+        now = time.monotonic() if now is None else now
+        tag = _tag(key)
+        buf = self._seg.buf
+        with self._seg.locked(tag % self._seg.shards):
+            off, found = self._find(tag, now)
+            if found:
+                _, tokens, last = self._SLOT.unpack_from(buf, off)
+                tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            else:
+                tokens = float(self.burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._SLOT.pack_into(buf, off, tag, tokens, now)
+        if allowed:
+            self._allowed += 1
+        else:
+            self._limited += 1
+
+        return RateDecision(
+            allowed=allowed,
+            limit=self.burst,
+            remaining=int(tokens),
+            reset_seconds=(self.burst - tokens) / self.rate,
+            retry_after_seconds=0.0 if allowed else (cost - tokens) / self.rate,
+        )
+
+    def refund(self, key: str, cost: int = 1) -> None:
+        tag = _tag(key)
+        buf = self._seg.buf
+        with self._seg.locked(tag % self._seg.shards):
+            for off in self._slots(tag):
+                t, tokens, last = self._SLOT.unpack_from(buf, off)
+                if t == tag:
+                    self._SLOT.pack_into(buf, off, tag, min(float(self.burst), tokens + cost), last)
+                    return
+
+    def stats(self) -> Dict[str, Any]:
+        buf = self._seg.buf
+        keys = sum(1 for off in range(0, self._seg.size, self._SLOT.size) if self._SLOT.unpack_from(buf, off)[0])
+        return {
+            "shared": True,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "shards": self._seg.shards,
+            "keys": keys,
+            "max_keys": self._per_shard * self._seg.shards,
+            # Counters below are for this worker only.
+            "allowed": self._allowed,
+            "limited": self._limited,
+            "idle_evictions": self._idle_evictions,
+            "pressure_evictions": self._pressure_evictions,
+        }
+
+
+class SharedDecisionCache:
+    """`DecisionCache` stored in a shared segment of fixed-size slots.
+
+    The segment holds `max_bytes // slot_bytes` slots grouped into sets of `ways`. A key
+    maps to one set; a new entry replaces an expired or empty slot there, else the slot
+    closest to expiry. Responses larger than a slot are not cached.
+    """
+
+    _HEADER = struct.Struct("<16sdI4x")
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        max_ttl_seconds: float,
+        slot_bytes: int = 4096,
+        ways: int = 8,
+        shards: int = 64,
+    ) -> None:
+        self.slot_bytes = max(self._HEADER.size + 1, slot_bytes)
+        self.max_ttl_seconds = max(0.0, max_ttl_seconds)
+        self.ways = max(1, ways)
+        self._sets = max_bytes // (self.slot_bytes * self.ways)
+        self._seg = SharedSegment(path, max(1, self._sets) * self.ways * self.slot_bytes, shards) if self._sets else None
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._oversize = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._seg is not None and self.max_ttl_seconds > 0
+
+    def _locate(self, key: Hashable) -> tuple[bytes, int, int]:
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+        index = int.from_bytes(digest[:8], "little") % self._sets
+        return digest, index, index * self.ways * self.slot_bytes
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        if self._seg is None:
+            self._misses += 1
+            return None
+        digest, index, base = self._locate(key)
+        buf = self._seg.buf
+        now = time.monotonic()
+        with self._seg.locked(index % self._seg.shards):
+            for w in range(self.ways):
+                off = base + w * self.slot_bytes
+                d, deadline, length = self._HEADER.unpack_from(buf, off)
+                if d != digest:
+                    continue
+                if deadline <= now:
+                    self._HEADER.pack_into(buf, off, bytes(16), 0.0, 0)
+                    self._expirations += 1
+                    break
+                start = off + self._HEADER.size
+                self._hits += 1
+                return bytes(buf[start:start + length])
+        self._misses += 1
+        return None
+
+    def put(self, key: Hashable, body: bytes, expires_in_seconds: float) -> None:
+        ttl = min(self.max_ttl_seconds, expires_in_seconds)
+        if self._seg is None or ttl <= 0:
+            return
+        if len(body) > self.slot_bytes - self._HEADER.size:
+            self._oversize += 1
+            return
+        digest, index, base = self._locate(key)
+        buf = self._seg.buf
+        now = time.monotonic()
+        with self._seg.locked(index % self._seg.shards):
+            target, target_deadline = -1, math.inf
+            for w in range(self.ways):
+                off = base + w * self.slot_bytes
+                d, deadline, _ = self._HEADER.unpack_from(buf, off)
+                if d == digest or deadline <= now:
+                    target, target_deadline = off, -math.inf
+                    if d == digest:
+                        break
+                elif deadline < target_deadline:
+                    target, target_deadline = off, deadline
+            if target_deadline != -math.inf:
+                self._evictions += 1
+            start = target + self._HEADER.size
+            buf[start:start + len(body)] = body
+            self._HEADER.pack_into(buf, target, digest, now + ttl, len(body))
+
+    def stats(self) -> Dict[str, Any]:
+        entries = used = 0
+        if self._seg is not None:
+            now = time.monotonic()
+            buf = self._seg.buf
+            for off in range(0, self._seg.size, self.slot_bytes):
+                _, deadline, length = self._HEADER.unpack_from(buf, off)
+                if deadline > now:
+                    entries += 1
+                    used += length
+        lookups = self._hits + self._misses
+        return {
+            "shared": True,
+            "entries": entries,
+            "bytes": used,
+            "max_entries": self._sets * self.ways,
+            "max_bytes": self._sets * self.ways * self.slot_bytes,
+            "slot_bytes": self.slot_bytes,
+            "max_ttl_seconds": self.max_ttl_seconds,
+            # Counters below are for this worker only.
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "oversize": self._oversize,
+        }
@@ -0,0 +1,274 @@
+"""Response-signing subsystem for the reference SUT.
+
+JWS signatures are produced on a dedicated worker pool so that a slow asymmetric
+signature never stalls the event loop serving other in-flight requests.
+
+- `executor="thread"` keeps signing in-process (default; frees the event loop).
+- `executor="process"` signs in worker processes so throughput scales with cores.
+
+The pool admits at most `max_pending` queued + in-flight signatures. Beyond that,
+`sign()` raises `SignerSaturated` so the caller can shed load (HTTP 503 +
+Retry-After) instead of building an unbounded backlog.
+
+Keys live in a `KeySet` with one key per algorithm (RS256, ES256, EdDSA). Clients
+pick an algorithm with `Accept-Signature: jws;alg=EdDSA`; anything unsupported
+falls back to the default algorithm so RS256-only verifiers keep working.
+
+`Accept-Signature: jws;b64=false` asks for a detached JWS with an unencoded payload
+(RFC 7797): the signature covers the payload bytes as they are, and the compact
+serialization leaves them out (`header..signature`), so an envelope that already
+carries the payload does not carry it a second time, base64url-encoded.
+
+`sign_cose` signs with the same keys as a COSE_Sign1 (RFC 9052) for CBOR responses;
+see `cbor.py`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from jwcrypto import jwk, jws
+from jwcrypto.jwa import JWA
+
+from . import cbor
+
+SUPPORTED_ALGORITHMS = ("RS256", "ES256", "EdDSA")
+
+_KEY_PARAMS: Dict[str, Dict[str, Any]] = {
+    "RS256": {"kty": "RSA", "size": 2048},
+    "ES256": {"kty": "EC", "crv": "P-256"},
+    "EdDSA": {"kty": "OKP", "crv": "Ed25519"},
+}
+
+
+def parse_accept_signature(value: Optional[str]) -> List[Tuple[str, Dict[str, str]]]:
+    """Parse `Accept-Signature` into `(scheme, params)` entries in preference order.
+
+    Accepts `none`, `jws`, `jws;alg=EdDSA` and comma-separated lists of those.
+    Scheme names and parameter names are case-insensitive; values are kept as sent.
+    """
+    out: List[Tuple[str, Dict[str, str]]] = []
+    for item in (value or "").split(","):
+        parts = [p.strip() for p in item.split(";") if p.strip()]
+        if not parts:
+            continue
+        params: Dict[str, str] = {}
+        for p in parts[1:]:
+            name, _, val = p.partition("=")
+            params[name.strip().lower()] = val.strip().strip('"')
+        out.append((parts[0].lower(), params))
+    return out
+
+
+def detached_requested(value: Optional[str]) -> bool:
+    """Whether the client's first `jws` preference asks for a detached, unencoded payload (`b64=false`)."""
+    for scheme, params in parse_accept_signature(value):
+        if scheme == "jws":
+            return params.get("b64", "").lower() == "false"
+    return False
+
+
+class KeySet:
+    """One signing key per algorithm; the first algorithm is the default."""
+
+    def __init__(self, algorithms: Sequence[str], keys: Optional[Dict[str, jwk.JWK]] = None) -> None:
+        algs = [a for a in algorithms if a]
+        unknown = [a for a in algs if a not in SUPPORTED_ALGORITHMS]
+        if not algs or unknown:
+            raise ValueError(f"unsupported signing algorithms: {unknown or algs!r}")
+        self.algorithms: List[str] = algs
+        self.default_alg = algs[0]
+        self._keys: Dict[str, jwk.JWK] = {}
+        self._fingerprint: Optional[str] = None
+        for alg in algs:
+            key = (keys or {}).get(alg) or jwk.JWK.generate(**_KEY_PARAMS[alg])
+            key.update({"kid": f"ref-{alg.lower()}-1", "alg": alg, "use": "sig"})
+            self._keys[alg] = key
+
+    def kid(self, alg: str) -> str:
+        return self._keys[alg]["kid"]
+
+    def select(self, accept_signature: Optional[str]) -> str:
+        """Return the first JWS algorithm the client asked for that we hold, else the default."""
+        for scheme, params in parse_accept_signature(accept_signature):
+            if scheme == "jws" and params.get("alg") in self._keys:
+                return params["alg"]
+        return self.default_alg
+
+    def public_jwks(self) -> Dict[str, Any]:
+        return {"keys": [json.loads(self._keys[a].export_public()) for a in self.algorithms]}
+
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the public key set; changes whenever a key is added, removed or rotated."""
+        if self._fingerprint is None:
+            raw = json.dumps(self.public_jwks(), sort_keys=True, separators=(",", ":")).encode("utf-8")
+            self._fingerprint = hashlib.sha256(raw).hexdigest()
+        return self._fingerprint
+
+    def private_json(self) -> str:
+        return json.dumps({"keys": [json.loads(self._keys[a].export_private()) for a in self.algorithms]})
+
+
+_WORKER_KEYS: Dict[str, jwk.JWK] = {}
+
+
+def _worker_init(keys_json: str) -> None:
+    global _WORKER_KEYS
+    _WORKER_KEYS = {k["alg"]: jwk.JWK(**k) for k in json.loads(keys_json)["keys"]}
+
+
+def _worker_sign(payload: bytes, alg: str, detached: bool = False) -> Tuple[str, float]:
+    t0 = time.perf_counter()
+    key = _WORKER_KEYS[alg]
+    protected: Dict[str, Any] = {"alg": alg, "kid": key["kid"]}
+    if detached:
+        protected.update(b64=False, crit=["b64"])
+    signer = jws.JWS(payload=payload)
+    signer.add_signature(key, None, protected=protected, header={})
+    if detached:
+        signer.detach_payload()
+    return signer.serialize(compact=True), time.perf_counter() - t0
+
+
+def _worker_sign_cose(payload: bytes, alg: str) -> Tuple[bytes, float]:
+    t0 = time.perf_counter()
+    key = _WORKER_KEYS[alg]
+    protected, to_sign = cbor.sig_structure(alg, key["kid"], payload)
+    # JWS and COSE share the signature encoding for RS256, ES256 (r || s) and EdDSA.
+    return cbor.sign1(protected, JWA.signing_alg(alg).sign(key, to_sign)), time.perf_counter() - t0
+
+
+class SignerSaturated(Exception):
+    """Raised when the signing queue is full; `retry_after` is a whole-second hint."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("signing queue saturated")
+        self.retry_after = retry_after
+
+
+class SigningPool:
+    def __init__(
+        self,
+        keys: KeySet,
+        executor: str = "thread",
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ) -> None:
+        if executor not in {"thread", "process"}:
+            raise ValueError(f"unsupported signing executor: {executor!r}")
+        self.keys = keys
+        self.executor_kind = executor
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_pending = max(1, max_pending or self.workers * 64)
+        self._keys_json = keys.private_json()
+        self._executor: Optional[Executor] = None
+
+        self._pending = 0
+        self._peak_pending = 0
+        self._signed = 0
+        self._signed_by_alg: Dict[str, int] = {a: 0 for a in keys.algorithms}
+        self._signed_detached = 0
+        self._signed_cose = 0
+        self._rejected = 0
+        self._errors = 0
+        self._sign_seconds_total = 0.0
+        self._sign_seconds_max = 0.0
+        self._queue_seconds_total = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_worker_init,
+                    initargs=(self._keys_json,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="tspp-signer",
+                    initializer=_worker_init,
+                    initargs=(self._keys_json,),
+                )
+        return self._executor
+
+    def _retry_after(self) -> int:
+        avg = self._sign_seconds_total / self._signed if self._signed else 0.0
+        return max(1, math.ceil(self._pending * avg / self.workers))
+
+    async def sign(self, payload: bytes, alg: Optional[str] = None, detached: bool = False) -> str:
+        """Return a compact JWS over `payload` using `alg` (default key if omitted).
+
+        With `detached`, the JWS signs `payload` unencoded and leaves it out (RFC 7797).
+        """
+        alg = alg or self.keys.default_alg
+        compact = await self._run(_worker_sign, payload, alg, detached)
+        self._signed_detached += detached
+        return compact
+
+    async def sign_cose(self, payload: bytes, alg: Optional[str] = None) -> bytes:
+        """Return an encoded COSE_Sign1 over `payload`, which it leaves detached."""
+        alg = alg or self.keys.default_alg
+        sign1 = await self._run(_worker_sign_cose, payload, alg)
+        self._signed_cose += 1
+        return sign1
+
+    async def _run(self, fn: Any, payload: bytes, alg: str, *args: Any) -> Any:
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise SignerSaturated(self._retry_after())
+
+        self._pending += 1
+        self._peak_pending = max(self._peak_pending, self._pending)
+        t0 = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            signed, sign_seconds = await loop.run_in_executor(self._get_executor(), fn, payload, alg, *args)
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        elapsed = time.perf_counter() - t0
+        self._signed += 1
+        self._signed_by_alg[alg] += 1
+        self._sign_seconds_total += sign_seconds
+        self._sign_seconds_max = max(self._sign_seconds_max, sign_seconds)
+        self._queue_seconds_total += max(0.0, elapsed - sign_seconds)
+        return signed
+
+    def stats(self) -> Dict[str, Any]:
+        n = self._signed
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "peak_pending": self._peak_pending,
+            "signed": n,
+            "signed_by_alg": dict(self._signed_by_alg),
+            "signed_detached": self._signed_detached,
+            "signed_cose": self._signed_cose,
+            "rejected": self._rejected,
+            "errors": self._errors,
+            "sign_seconds_total": round(self._sign_seconds_total, 6),
+            "sign_seconds_avg": round(self._sign_seconds_total / n, 6) if n else 0.0,
+            "sign_seconds_max": round(self._sign_seconds_max, 6),
+            "queue_seconds_avg": round(self._queue_seconds_total / n, 6) if n else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
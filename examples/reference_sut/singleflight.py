@@ -0,0 +1,74 @@
+"""Request coalescing ("singleflight") for the reference SUT.
+
+When identical queries arrive concurrently, only the first one evaluates and signs;
+the rest await the same in-flight task and share its result (or its exception, so
+error surfaces stay uniform). The work runs as its own task, so a leader whose client
+disconnects does not cancel the result its followers are waiting on. For the same reason
+each caller waits up to its own deadline: one that gives up stops only its own wait, and
+the shared work runs on for the others.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Singleflight:
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+        self._leaders = 0
+        self._coalesced = 0
+        self._peak_inflight = 0
+        self._deadline_exceeded = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        """Await `fn()`, or the identical call already in flight under `key`.
+
+        `deadline` (`time.monotonic()` seconds) bounds this caller's wait only; past it,
+        `asyncio.TimeoutError` is raised and the shared task keeps running. Disabled, `fn()`
+        is awaited directly and bounds itself.
+        """
+        if not self.enabled:
+            return await fn()
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced += 1
+        else:
+            self._leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._peak_inflight = max(self._peak_inflight, len(self._inflight))
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        if deadline is None:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            self._deadline_exceeded += 1
+            raise
+
+    def _done(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter has gone away.
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self._leaders + self._coalesced
+        return {
+            "enabled": self.enabled,
+            "inflight": len(self._inflight),
+            "peak_inflight": self._peak_inflight,
+            "leaders": self._leaders,
+            "coalesced": self._coalesced,
+            "coalesced_ratio": round(self._coalesced / total, 4) if total else 0.0,
+            "deadline_exceeded": self._deadline_exceeded,
+        }
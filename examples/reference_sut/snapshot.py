@@ -0,0 +1,168 @@
+"""Signed authorization snapshot for offline verification.
+
+Air-gapped and high-QPS verifiers can download a Bloom filter of every key that grants
+authorization and answer "definitely not authorized" without a network call. A key is
+the query tuple `(authority, entity, action, resource)`, and it may be a pattern. Only
+positives need to be confirmed with `POST /authorization`.
+
+Format `bloom-sha256-v1`: an element is the UTF-8 encoding of the four terms joined by
+U+001F. Its `k` bit positions in the `m`-bit filter are `(h1 + i * h2) mod m`, for `i`
+in `0..k-1`. `h1` and `h2` are the first and second big-endian 64-bit words of the
+element's SHA-256 digest, with the low bit of `h2` forced to 1. Bit `j` is bit
+`j % 8` (least significant first) of byte `j // 8`. The filter is sized for the
+requested false-positive rate.
+
+A key is included if it grants at some moment between the snapshot's `issued_at` and
+`expires_at`, so a snapshot has no false negatives for queries evaluated in that window.
+Denials that shadow a broader grant, and context constraints on policy rules, are
+ignored: they only add false positives, which the fallback query resolves.
+`pattern_fields` lists the fields that hold patterns. A checker tries each of those
+fields' namespace patterns, as `DecisionStore` does, and other fields only verbatim.
+
+The snapshot is the compact JWS of the canonical (RFC 8785) JSON document. It is rebuilt in a
+worker thread once half its lifetime has passed, or when the policy changes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from tspp_trqp_harness.jcs import canonicalize
+
+FORMAT = "bloom-sha256-v1"
+_FIELDS = ("authority", "entity", "action", "resource")
+
+Terms = Tuple[str, str, str, str]
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float) -> None:
+        n = max(1, capacity)
+        self.m = max(8, math.ceil(-n * math.log(fp_rate) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / n * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+
+    def _positions(self, element: bytes) -> Iterable[int]:
+        digest = hashlib.sha256(element).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        m = self.m
+        return ((h1 + i * h2) % m for i in range(self.k))
+
+    def add(self, element: bytes) -> None:
+        bits = self.bits
+        for j in self._positions(element):
+            bits[j >> 3] |= 1 << (j & 7)
+
+    def __contains__(self, element: bytes) -> bool:
+        bits = self.bits
+        return all(bits[j >> 3] >> (j & 7) & 1 for j in self._positions(element))
+
+
+def element(terms: Terms) -> bytes:
+    return "\x1f".join(terms).encode("utf-8")
+
+
+def build_snapshot(
+    keys: Callable[[], Iterable[Terms]], issued_at: float, max_age_seconds: int, fp_rate: float
+) -> Dict[str, Any]:
+    """The snapshot document for the keys `keys()` yields; it is called twice (to size, then to fill)."""
+    count, pattern_fields = 0, set()
+    for terms in keys():
+        count += 1
+        pattern_fields.update(f for f, t in zip(_FIELDS, terms) if t.endswith("*"))
+    bloom = BloomFilter(count, fp_rate)
+    for terms in keys():
+        bloom.add(element(terms))
+    return {
+        "format": FORMAT,
+        "issued_at": _iso(issued_at),
+        "expires_at": _iso(issued_at + max_age_seconds),
+        "elements": count,
+        "bits": bloom.m,
+        "hashes": bloom.k,
+        "pattern_fields": [f for f in _FIELDS if f in pattern_fields],
+        "filter": base64.urlsafe_b64encode(bytes(bloom.bits)).rstrip(b"=").decode("ascii"),
+    }
+
+
+class SignedSnapshot(NamedTuple):
+    body: bytes
+    etag: str
+    issued_at: float
+    version: str
+
+
+class SnapshotPublisher:
+    def __init__(self, max_age_seconds: int, fp_rate: float) -> None:
+        self.max_age_seconds = max(1, max_age_seconds)
+        self.fp_rate = min(max(fp_rate, 1e-9), 0.5)
+        self._current: Optional[SignedSnapshot] = None
+        self._lock = asyncio.Lock()
+
+        self._builds = 0
+        self._build_ms = 0.0
+        self._elements = 0
+        self._bytes = 0
+        self._served = 0
+
+    def _stale(self, snap: Optional[SignedSnapshot], version: str, now: float) -> bool:
+        return snap is None or snap.version != version or now >= snap.issued_at + self.max_age_seconds / 2
+
+    async def get(
+        self,
+        version: str,
+        keys: Callable[[float, float], Iterable[Terms]],
+        sign: Callable[[bytes], Awaitable[str]],
+    ) -> SignedSnapshot:
+        """The current snapshot, rebuilt from `keys(start, end)` and signed with `sign` when stale.
+
+        `version` identifies the source (e.g. the policy version); a new one forces a rebuild.
+        """
+        snap = self._current
+        if not self._stale(snap, version, time.time()):
+            self._served += 1
+            return snap
+        async with self._lock:
+            # Another request may have rebuilt it while this one waited.
+            snap = self._current
+            now = time.time()
+            if self._stale(snap, version, now):
+                started = time.perf_counter()
+                end = now + self.max_age_seconds
+                doc = await asyncio.to_thread(
+                    build_snapshot, lambda: keys(now, end), now, self.max_age_seconds, self.fp_rate
+                )
+                if version:
+                    doc["policy_version"] = version
+                body = (await sign(canonicalize(doc))).encode("ascii")
+                snap = self._current = SignedSnapshot(
+                    body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"', now, version
+                )
+                self._builds += 1
+                self._build_ms = round((time.perf_counter() - started) * 1000, 3)
+                self._elements = doc["elements"]
+                self._bytes = len(body)
+        self._served += 1
+        return snap
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "builds": self._builds,
+            "last_build_ms": self._build_ms,
+            "elements": self._elements,
+            "snapshot_bytes": self._bytes,
+            "served": self._served,
+            "max_age_seconds": self.max_age_seconds,
+            "fp_rate": self.fp_rate,
+        }
@@ -0,0 +1,380 @@
+"""SQLite-backed system-of-record decision store for the reference SUT.
+
+`DecisionStore` holds every fact in RAM. This backend keeps them in a SQLite file and
+pages in only what queries touch, so the registry can be far larger than memory and
+survives restarts without a reload.
+
+Authorization facts live in a `WITHOUT ROWID` table keyed by the TRQP query tuple
+`(authority, entity, action, resource)`. The primary key is the table's clustered
+B-tree, so it is a covering index: a lookup is a single seek that finds the decision
+column in the same leaf, and its `(authority, entity)` prefix answers the known-entity
+check. Lookup semantics match `DecisionStore`, including `*` namespace grants and the
+uniform `not_found` for an entity unknown to the authority.
+
+Recognition edges, with their scope, expiry and transitivity, are stored alongside
+them. They are few next to authorization facts, and chains need the whole graph, so
+the registry reads them once into a `RecognitionGraph` (`recognition_edges()`).
+
+Each fact is one version of its key, and `valid_from` (epoch seconds, `-inf` when
+absent) ends the primary key. A lookup as of time T keeps, for each candidate key,
+only the version whose `valid_from` is the key's latest at or before T. That `max()`
+is a single seek on the primary key, so lookups cost about what they did without
+history. The loader converts timestamps with SQLite's `unixepoch()`, to the second.
+
+The database runs in WAL mode, so readers never block each other or a concurrent
+loader. Queries run on a small thread pool, each thread borrowing one of a fixed set
+of read-only connections, so the event loop never waits on disk.
+
+Build a database with the bulk loader:
+
+    python -m examples.reference_sut.sqlite_store registry.db facts.jsonl [more.jsonl ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .recognition import _read_edges
+from .store import _SEPARATORS, _read_records
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS authorization_facts (
+    authority  TEXT NOT NULL,
+    entity     TEXT NOT NULL,
+    action     TEXT NOT NULL,
+    resource   TEXT NOT NULL,
+    valid_from  REAL NOT NULL,
+    valid_until REAL NOT NULL,
+    authorized INTEGER NOT NULL,
+    PRIMARY KEY (authority, entity, action, resource, valid_from)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS recognition_facts (
+    authority         TEXT NOT NULL,
+    subject_authority TEXT NOT NULL,
+    action            TEXT NOT NULL,
+    resource          TEXT NOT NULL,
+    valid_from        REAL NOT NULL,
+    valid_until       REAL NOT NULL,
+    transitive        INTEGER,  -- NULL: the registry's transitive_default
+    recognized        INTEGER NOT NULL,
+    PRIMARY KEY (authority, subject_authority, action, resource, valid_from)
+) WITHOUT ROWID;
+"""
+
+_LOAD_CHUNK = 50000
+
+
+def _candidates(value: str) -> List[str]:
+    """`value` and its namespace patterns, most specific first."""
+    out = [value]
+    for pos in range(len(value) - 1, -1, -1):
+        if value[pos] in _SEPARATORS:
+            out.append(value[: pos + 1] + "*")
+    if value != "*":
+        out.append("*")
+    return out
+
+
+class SQLiteDecisionStore:
+    def __init__(self, path: Union[str, Path], readers: int = 4) -> None:
+        self.path = str(path)
+        if not os.path.isfile(self.path):
+            raise FileNotFoundError(f"decision database {self.path} does not exist; build it with the bulk loader")
+        self.readers = max(1, readers)
+        self._pool: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
+        self._connections = [self._connect() for _ in range(self.readers)]
+        columns = {row[1] for row in self._connections[0].execute("PRAGMA table_info(authorization_facts)")}
+        if "valid_from" not in columns:
+            self.close_connections()
+            raise ValueError(f"decision database {self.path} predates fact history; rebuild it with the bulk loader")
+        columns = {row[1] for row in self._connections[0].execute("PRAGMA table_info(recognition_facts)")}
+        if "transitive" not in columns:
+            self.close_connections()
+            raise ValueError(f"decision database {self.path} predates scoped recognition edges; rebuild it with the bulk loader")
+        for conn in self._connections:
+            self._pool.put(conn)
+        # One worker per connection, so a worker never waits for a connection.
+        self._executor = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="tspp-sqlite")
+
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._exact_hits = 0
+        self._prefix_hits = 0
+        self._not_found = 0
+        self._query_seconds = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute("PRAGMA mmap_size = 268435456")
+        return conn
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._with_connection, fn, args)
+
+    def _with_connection(self, fn: Callable[..., Any], args: Tuple[Any, ...]) -> Any:
+        conn = self._pool.get()
+        started = time.perf_counter()
+        try:
+            return fn(conn, *args)
+        finally:
+            self._pool.put(conn)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._query_seconds += elapsed
+
+    async def lookup(
+        self, authority: str, entity: str, action: str, resource: str, at: Optional[float] = None
+    ) -> Optional[bool]:
+        """True/False for a grant or denial matching as of `at` (default now); None if the entity is unknown."""
+        when = time.time() if at is None else at
+        return await self._run(self._lookup, authority, entity, action or "", resource or "", when)
+
+    def _lookup(
+        self, conn: sqlite3.Connection, authority: str, entity: str, action: str, resource: str, at: float
+    ) -> Optional[bool]:
+        actions, resources = _candidates(action), _candidates(resource)
+        # ?1-?3 are authority, entity and time; the candidate terms follow.
+        action_params = ",".join(f"?{4 + i}" for i in range(len(actions)))
+        resource_params = ",".join(f"?{4 + len(actions) + i}" for i in range(len(resources)))
+        rows = conn.execute(
+            "SELECT f.action, f.resource, f.authorized FROM authorization_facts f "
+            "WHERE f.authority = ?1 AND f.entity = ?2 "
+            f"AND f.action IN ({action_params}) AND f.resource IN ({resource_params}) "
+            "AND f.valid_until > ?3 AND f.valid_from = ("
+            "  SELECT max(g.valid_from) FROM authorization_facts g "
+            "  WHERE g.authority = ?1 AND g.entity = ?2 AND g.action = f.action AND g.resource = f.resource "
+            "  AND g.valid_from <= ?3)",
+            (authority, entity, at, *actions, *resources),
+        ).fetchall()
+        if rows:
+            act_rank = {a: i for i, a in enumerate(actions)}
+            res_rank = {r: i for i, r in enumerate(resources)}
+            act, res, authorized = min(rows, key=lambda r: (act_rank[r[0]], res_rank[r[1]]))
+            with self._lock:
+                self._lookups += 1
+                if act == action and res == resource:
+                    self._exact_hits += 1
+                else:
+                    self._prefix_hits += 1
+            return bool(authorized)
+        known = conn.execute(
+            "SELECT 1 FROM authorization_facts WHERE authority = ? AND entity = ? LIMIT 1",
+            (authority, entity),
+        ).fetchone()
+        with self._lock:
+            self._lookups += 1
+            if known is None:
+                self._not_found += 1
+        return None if known is None else False
+
+    def recognition_edges(self) -> Iterator[Tuple[str, str, str, str, float, Optional[bool], float]]:
+        """Recognition edges in force at some time, as `RecognitionGraph.add_edge` arguments.
+
+        A withdrawal (`recognized: false`) replaced the edge it names when loaded, so it yields nothing.
+        """
+        conn = self._pool.get()
+        try:
+            rows = conn.execute(
+                "SELECT authority, subject_authority, action, resource, valid_until, transitive, valid_from "
+                "FROM recognition_facts WHERE recognized"
+            ).fetchall()
+        finally:
+            self._pool.put(conn)
+        for authority, subject, action, resource, until, transitive, since in rows:
+            yield authority, subject, action, resource, until, None if transitive is None else bool(transitive), since
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.close_connections()
+
+    def close_connections(self) -> None:
+        for conn in self._connections:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = self._lookups
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "db_bytes": os.path.getsize(self.path),
+                "readers": self.readers,
+                "lookups": self._lookups,
+                "exact_hits": self._exact_hits,
+                "prefix_hits": self._prefix_hits,
+                "not_found": self._not_found,
+                "avg_query_ms": round(1000 * self._query_seconds / queries, 4) if queries else 0.0,
+            }
+
+
+def _truthy_sql(field: str, missing: str = "0") -> str:
+    """SQL for `store._truthy` of a JSON field of the staged `line`, `missing` if absent or null."""
+    value = f"json_extract(line, '$.{field}')"
+    return (
+        f"CASE coalesce(json_type(line, '$.{field}'), 'null') WHEN 'null' THEN {missing} "
+        f"WHEN 'true' THEN 1 WHEN 'text' THEN lower(trim({value})) = 'true' "
+        f"WHEN 'integer' THEN {value} != 0 WHEN 'real' THEN {value} != 0 ELSE 0 END"
+    )
+
+
+def _text_sql(*fields: str, missing: str = "''") -> str:
+    """SQL for the first non-empty of several JSON string fields of the staged `line`."""
+    terms = [f"nullif(json_extract(line, '$.{f}'), '')" for f in fields]
+    return f"coalesce({', '.join(terms)}, {missing})"
+
+
+def _epoch_sql(missing: str, *fields: str) -> str:
+    """SQL for the first present of several JSON RFC 3339 fields of the staged `line` as epoch
+    seconds, `missing` if all are absent.
+
+    An unparseable timestamp becomes NULL and fails the NOT NULL constraint.
+    """
+    value = _text_sql(*fields)
+    return f"CASE WHEN {value} = '' THEN {missing} ELSE unixepoch({value}) END"
+
+
+_SUBJECT = _text_sql("subject_authority", "subject_authority_id")
+# SQLite reads an out-of-range literal as an infinity.
+_SINCE_ALWAYS, _FOREVER = "-9e999", "9e999"
+
+_LOAD_AUTHORIZATIONS = f"""
+INSERT OR REPLACE INTO authorization_facts
+SELECT authority, entity, action, resource, valid_from, valid_until, authorized FROM (
+    SELECT rowid AS seq,
+           {_text_sql("authority", "authority_id")} AS authority,
+           {_text_sql("entity", "entity_id")} AS entity,
+           {_text_sql("action")} AS action,
+           {_text_sql("resource")} AS resource,
+           {_epoch_sql(_SINCE_ALWAYS, "valid_from")} AS valid_from,
+           {_epoch_sql(_FOREVER, "valid_until")} AS valid_until,
+           {_truthy_sql("authorized")} AS authorized
+    FROM staged_lines
+    WHERE instr(line, '"subject_authority') = 0 OR {_SUBJECT} = ''
+)
+ORDER BY authority, entity, action, resource, valid_from, seq
+"""
+
+_LOAD_RECOGNITIONS = f"""
+INSERT OR REPLACE INTO recognition_facts
+SELECT authority, subject_authority, action, resource, valid_from, valid_until, transitive, recognized FROM (
+    SELECT rowid AS seq,
+           {_text_sql("authority", "authority_id")} AS authority,
+           {_SUBJECT} AS subject_authority,
+           {_text_sql("action", missing="'*'")} AS action,
+           {_text_sql("resource", missing="'*'")} AS resource,
+           {_epoch_sql(_SINCE_ALWAYS, "valid_from")} AS valid_from,
+           {_epoch_sql(_FOREVER, "expires_at", "valid_until")} AS valid_until,
+           {_truthy_sql("transitive", missing="NULL")} AS transitive,
+           {_truthy_sql("recognized", missing="1")} AS recognized
+    FROM staged_lines
+    WHERE instr(line, '"subject_authority') > 0
+)
+WHERE subject_authority != ''
+ORDER BY authority, subject_authority, action, resource, valid_from, seq
+"""
+
+
+def _source_lines(path: Path) -> Iterator[str]:
+    """Fact records of a source file as JSON text, one per record."""
+    if path.suffix == ".json":
+        for rec in chain(_read_records(path), _read_edges(path)):
+            yield json.dumps(rec)
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def bulk_load(path: Union[str, Path], sources: Iterable[Union[str, Path]]) -> Dict[str, int]:
+    """Import fact files into the database at `path`, creating it if needed.
+
+    Sources are JSONL files (one fact per line) or `.json` fixture files (`facts`, bridge
+    `cases` and recognition `edges` arrays). Records with a `subject_authority` (or
+    `subject_authority_id`) are recognition edges, read as `RecognitionGraph` reads them,
+    the rest authorization facts, with the same field aliases as `DecisionStore`; later
+    facts replace earlier ones.
+
+    Python only copies raw lines into a staging table. SQLite's JSON functions then
+    parse them and the fact tables are filled in key order, so the B-trees are built by
+    appending rather than by random inserts. The import is one transaction with
+    durability relaxed; a failed load leaves the previous contents.
+    """
+    conn = sqlite3.connect(str(path), isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(_SCHEMA)
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -262144")
+        conn.execute("CREATE TEMP TABLE staged_lines (line TEXT NOT NULL)")
+        conn.execute("BEGIN")
+        try:
+            for src in sources:
+                lines = _source_lines(Path(src))
+                while True:
+                    chunk = [(line,) for line in islice(lines, _LOAD_CHUNK)]
+                    if not chunk:
+                        break
+                    conn.executemany("INSERT INTO staged_lines VALUES (?)", chunk)
+            try:
+                counts = {
+                    "authorization": conn.execute(_LOAD_AUTHORIZATIONS).rowcount,
+                    "recognition": conn.execute(_LOAD_RECOGNITIONS).rowcount,
+                }
+            except (sqlite3.OperationalError, sqlite3.IntegrityError):
+                bad = conn.execute("SELECT rowid FROM staged_lines WHERE NOT json_valid(line) LIMIT 1").fetchone()
+                if bad is not None:
+                    raise ValueError(f"record {bad[0]} is not valid JSON") from None
+                bad = conn.execute(
+                    f"SELECT rowid FROM staged_lines WHERE {_epoch_sql('0', 'valid_from')} IS NULL "
+                    f"OR {_epoch_sql('0', 'expires_at', 'valid_until')} IS NULL LIMIT 1"
+                ).fetchone()
+                if bad is not None:
+                    raise ValueError(f"record {bad[0]} has an invalid valid_from, valid_until or expires_at") from None
+                raise
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA optimize")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return counts
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m examples.reference_sut.sqlite_store",
+        description="Bulk-load decision facts (JSONL, or fixture .json) into a SQLite decision database.",
+    )
+    parser.add_argument("database", help="SQLite file to create or extend")
+    parser.add_argument("sources", nargs="+", help="JSONL fact files, or fixture .json files")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = bulk_load(args.database, args.sources)
+    elapsed = time.perf_counter() - started
+    total = counts["authorization"] + counts["recognition"]
+    print(
+        f"loaded {counts['authorization']} authorization and {counts['recognition']} recognition facts "
+        f"into {args.database} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} records/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Indexed system-of-record decision store for the reference SUT.
+
+Loads authorization facts `(authority, entity, action, resource) -> authorized` from
+JSONL (one record per line) or from the `system_of_record_truth` blocks of a bridge
+fixture file, and answers exact lookups in O(1).
+
+Memory layout, sized for tens of millions of records:
+
+- every distinct string is interned once and referred to by a 32-bit id;
+- a record key is the four ids packed into two 64-bit words, stored in an
+  open-addressed (linear probing) table of parallel `array`s, with one byte of
+  state per slot. That is ~17 bytes per slot, against hundreds for a dict of tuples.
+
+An `(authority, entity)` marker is stored in the same table (action and resource id 0)
+so "entity unknown to this authority" (uniform `not_found`) is told apart from
+"known entity, no grant" (`authorized: false`).
+
+URI namespaces: an action or resource ending in `*` is a prefix grant. `.../resource/*`
+covers every resource under `.../resource/`, and `*` alone covers everything. Prefix
+records sit in the same table under their interned pattern, so a query that misses
+exactly is retried with each namespace prefix of its action and resource (split at
+`/`, `:` and `#`), most specific first.
+
+History: a record with `valid_from` / `valid_until` is one version of its key (see
+`history`). Such a key's slot is marked versioned and its versions live in a `Timeline`,
+so a lookup as of any time costs one binary search per candidate key. Keys without
+history, the common case, stay one slot each. Whether the entity is known to the
+authority does not depend on time.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .history import Timeline, parse_time
+
+_EMPTY, _ALLOW, _DENY, _KNOWN, _VERSIONED = 0, 1, 2, 3, 4
+_SEPARATORS = "/:#"
+_MIX = 0x9E3779B97F4A7C15
+_MIX_LO = 0xC2B2AE3D27D4EB4F
+_MASK64 = (1 << 64) - 1
+
+
+class DecisionStore:
+    def __init__(self, capacity: int = 1024) -> None:
+        self._ids: Dict[str, int] = {"": 0}
+        self._strings: List[str] = [""]
+        self._alloc(max(8, 1 << (max(1, capacity) - 1).bit_length()))
+        self._records = 0
+        self._prefix_records = 0
+        # (hi, lo) -> versions, for keys whose slot is _VERSIONED
+        self._history: Dict[Tuple[int, int], Timeline[bool]] = {}
+
+        self._lookups = 0
+        self._exact_hits = 0
+        self._prefix_hits = 0
+        self._not_found = 0
+
+    def _alloc(self, size: int) -> None:
+        self._mask = size - 1
+        self._shift = 64 - (size.bit_length() - 1)
+        self._hi = array("Q", bytes(8 * size))
+        self._lo = array("Q", bytes(8 * size))
+        self._state = array("B", bytes(size))
+        self._used = 0
+
+    def _intern(self, s: str) -> int:
+        i = self._ids.get(s)
+        if i is None:
+            if len(self._strings) > 0xFFFFFFFF:
+                raise OverflowError("decision store is limited to 2**32 distinct strings")
+            i = self._ids[s] = len(self._strings)
+            self._strings.append(s)
+        return i
+
+    def _slot(self, hi: int, lo: int) -> int:
+        """Slot holding `(hi, lo)`, or the empty slot where it would go."""
+        # Fibonacci hashing: the top bits of the product mix every input bit.
+        i = (((hi ^ (lo * _MIX_LO)) * _MIX) & _MASK64) >> self._shift
+        state, his, los = self._state, self._hi, self._lo
+        while state[i] != _EMPTY and (his[i] != hi or los[i] != lo):
+            i = (i + 1) & self._mask
+        return i
+
+    def _put(self, hi: int, lo: int, value: int) -> None:
+        if (self._used + 1) * 10 > (self._mask + 1) * 7:
+            self._grow()
+        i = self._slot(hi, lo)
+        if self._state[i] == _EMPTY:
+            self._used += 1
+            self._hi[i], self._lo[i] = hi, lo
+        # A known-entity marker never overwrites a decision.
+        if value != _KNOWN or self._state[i] == _EMPTY:
+            self._state[i] = value
+
+    def _get(self, hi: int, lo: int) -> int:
+        return self._state[self._slot(hi, lo)]
+
+    def _grow(self) -> None:
+        his, los, states = self._hi, self._lo, self._state
+        self._alloc((self._mask + 1) * 2)
+        for hi, lo, st in zip(his, los, states):
+            if st != _EMPTY:
+                i = self._slot(hi, lo)
+                self._hi[i], self._lo[i], self._state[i] = hi, lo, st
+                self._used += 1
+
+    def add(
+        self,
+        authority: str,
+        entity: str,
+        action: str,
+        resource: str,
+        authorized: bool,
+        valid_from: float = -math.inf,
+        valid_until: float = math.inf,
+    ) -> None:
+        a, e = self._intern(authority), self._intern(entity)
+        act, res = self._intern(action or ""), self._intern(resource or "")
+        hi, lo = a << 32 | e, act << 32 | res
+        self._put(hi, 0, _KNOWN)
+        timeline = self._history.get((hi, lo))
+        if timeline is None and valid_from == -math.inf and valid_until == math.inf:
+            self._put(hi, lo, _ALLOW if authorized else _DENY)
+        else:
+            if timeline is None:
+                timeline = self._history[(hi, lo)] = Timeline()
+                st = self._get(hi, lo)
+                if st == _ALLOW or st == _DENY:
+                    timeline.put(st == _ALLOW)
+            timeline.put(authorized, valid_from, valid_until)
+            self._put(hi, lo, _VERSIONED)
+        self._records += 1
+        if (action or "").endswith("*") or (resource or "").endswith("*"):
+            self._prefix_records += 1
+
+    def _candidates(self, value: str) -> Iterator[int]:
+        """Ids of `value` and its interned namespace patterns, most specific first."""
+        i = self._ids.get(value)
+        if i is not None:
+            yield i
+        for pos in range(len(value) - 1, -1, -1):
+            if value[pos] in _SEPARATORS:
+                p = self._ids.get(value[: pos + 1] + "*")
+                if p is not None:
+                    yield p
+        p = self._ids.get("*")
+        if p is not None:
+            yield p
+
+    def lookup(
+        self, authority: str, entity: str, action: str, resource: str, at: Optional[float] = None
+    ) -> Optional[bool]:
+        """True/False for a grant or denial matching as of `at` (default now); None if the entity is unknown."""
+        self._lookups += 1
+        a, e = self._ids.get(authority), self._ids.get(entity)
+        # Any slot at (authority, entity, 0, 0) means the pair is known: a marker or an empty-term record.
+        if a is None or e is None or self._get(a << 32 | e, 0) == _EMPTY:
+            self._not_found += 1
+            return None
+        hi = a << 32 | e
+        exact = (self._ids.get(action or ""), self._ids.get(resource or ""))
+        for act in self._candidates(action or ""):
+            for res in self._candidates(resource or ""):
+                lo = act << 32 | res
+                st = self._get(hi, lo)
+                if st == _VERSIONED:
+                    value = self._history[(hi, lo)].at(time.time() if at is None else at)
+                    if value is None:
+                        continue
+                    st = _ALLOW if value else _DENY
+                if st == _ALLOW or st == _DENY:
+                    if (act, res) == exact:
+                        self._exact_hits += 1
+                    else:
+                        self._prefix_hits += 1
+                    return st == _ALLOW
+        return False
+
+    def granted(self, start: float, end: float) -> Iterator[Tuple[str, str, str, str]]:
+        """Keys (patterns included) that grant at some moment in `[start, end)`."""
+        strings, his, los = self._strings, self._hi, self._lo
+        for i, st in enumerate(self._state):
+            if st == _VERSIONED:
+                if not any(self._history[(his[i], los[i])].values_between(start, end)):
+                    continue
+            elif st != _ALLOW:
+                continue
+            hi, lo = his[i], los[i]
+            yield strings[hi >> 32], strings[hi & 0xFFFFFFFF], strings[lo >> 32], strings[lo & 0xFFFFFFFF]
+
+    @classmethod
+    def load(
+        cls,
+        *paths: Union[str, Path],
+        journal: Optional[Callable[[Iterable[Dict[str, Any]]], Iterable[Dict[str, Any]]]] = None,
+    ) -> "DecisionStore":
+        """Load `.jsonl` record files, or `.json` files' `facts` arrays and bridge `system_of_record_truth` blocks.
+
+        `journal`, if given, wraps each file's records on their way in (see `changes.ChangeLog`).
+        """
+        store = cls()
+        for path in paths:
+            records = _read_records(Path(path))
+            store.extend(journal(records) if journal else records)
+        return store
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for rec in records:
+            self.add(
+                *_record_key(rec),
+                _truthy(rec.get("authorized")),
+                parse_time(rec.get("valid_from"), -math.inf),
+                parse_time(rec.get("valid_until")),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        slots = self._mask + 1
+        return {
+            "records": self._records,
+            "prefix_records": self._prefix_records,
+            "versioned_keys": len(self._history),
+            "versions": sum(len(t) for t in self._history.values()),
+            "strings": len(self._strings),
+            "slots": slots,
+            "load_factor": round(self._used / slots, 4),
+            "table_bytes": slots * (8 + 8 + 1),
+            "lookups": self._lookups,
+            "exact_hits": self._exact_hits,
+            "prefix_hits": self._prefix_hits,
+            "not_found": self._not_found,
+        }
+
+
+def _truthy(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+def _read_records(path: Path) -> Iterator[Dict[str, Any]]:
+    if path.suffix == ".json":
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        yield from doc.get("facts", [])
+        for case in doc.get("cases", []):
+            truth = case.get("system_of_record_truth")
+            if isinstance(truth, dict):
+                yield truth
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _record_key(rec: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    return (
+        rec.get("authority") or rec.get("authority_id") or "",
+        rec.get("entity") or rec.get("entity_id") or "",
+        rec.get("action") or "",
+        rec.get("resource") or "",
+    )
@@ -0,0 +1,112 @@
+"""Policy compilation, rule precedence and hot reload."""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from examples.reference_sut.policy import PolicyEngine, compile_policy
+
+CONTEXT_KEYS = ["time_requested", "purpose", "audience", "locale"]
+EXAMPLE = Path(__file__).resolve().parents[1] / "policy.example.json"
+
+AUTHORITY = "did:example:authority"
+ENTITY = "did:example:entity"
+ISSUE = "https://example.org/vocab/action/issue-vc/v1"
+LICENSE = "https://example.org/vocab/resource/driver-license/v1"
+
+
+def _decide(policy, terms, ctx=None):
+    rule = policy.evaluate(terms, ctx or {})
+    return None if rule is None else (rule.id, rule.authorized)
+
+
+def test_most_specific_rule_wins():
+    policy = compile_policy({"rules": [
+        {"id": "any-entity", "effect": "deny", "authority": AUTHORITY},
+        {"id": "example-entities", "effect": "allow", "authority": AUTHORITY, "entity": "did:example:*"},
+        {"id": "vocab-actions", "effect": "deny", "authority": AUTHORITY, "entity": ENTITY, "action": "https://example.org/vocab/*"},
+        {"id": "issue-actions", "effect": "allow", "authority": AUTHORITY, "entity": ENTITY, "action": "https://example.org/vocab/action/issue-vc/*"},
+        {"id": "exact-issue", "effect": "deny", "authority": AUTHORITY, "entity": ENTITY, "action": ISSUE, "resource": LICENSE},
+    ]}, CONTEXT_KEYS)
+
+    # An exact value beats any prefix, a longer prefix a shorter one, and earlier fields decide first.
+    assert _decide(policy, (AUTHORITY, ENTITY, ISSUE, LICENSE)) == ("exact-issue", False)
+    assert _decide(policy, (AUTHORITY, ENTITY, ISSUE, "https://example.org/other")) == ("issue-actions", True)
+    assert _decide(policy, (AUTHORITY, ENTITY, "https://example.org/vocab/action/audit/v1", LICENSE)) == ("vocab-actions", False)
+    assert _decide(policy, (AUTHORITY, "did:example:other", ISSUE, LICENSE)) == ("example-entities", True)
+    assert _decide(policy, (AUTHORITY, "did:web:elsewhere", ISSUE, LICENSE)) == ("any-entity", False)
+    assert _decide(policy, ("did:example:another-authority", ENTITY, ISSUE, LICENSE)) is None
+
+
+def test_context_constraints_decide_and_deny_breaks_ties():
+    policy = compile_policy(json.loads(EXAMPLE.read_text(encoding="utf-8")), CONTEXT_KEYS)
+    terms = (AUTHORITY, ENTITY, ISSUE, LICENSE)
+
+    # More context constraints beat fewer: the marketing deny overrides the unconstrained allow.
+    assert _decide(policy, terms) == ("issue-vcs", True)
+    assert _decide(policy, terms, {"purpose": "kyc"}) == ("issue-vcs", True)
+    assert _decide(policy, terms, {"purpose": "marketing"}) == ("no-marketing-issuance", False)
+
+    # A context-constrained rule does not apply when the context does not match it.
+    audit = (AUTHORITY, "did:example:regulator", "https://example.org/vocab/action/audit/v1", LICENSE)
+    assert _decide(policy, audit, {"purpose": "supervision"}) == ("supervisory-audit", True)
+    assert _decide(policy, audit, {"purpose": "marketing"}) is None
+    assert _decide(policy, audit, {"purpose": ["audit"]}) is None
+    assert _decide(policy, audit) is None
+
+    # With equal specificity, deny beats allow.
+    tied = compile_policy({"rules": [
+        {"id": "allow", "effect": "allow", "authority": AUTHORITY},
+        {"id": "deny", "effect": "deny", "authority": AUTHORITY},
+    ]}, CONTEXT_KEYS)
+    assert _decide(tied, terms) == ("deny", False)
+
+
+@pytest.mark.parametrize("doc, message", [
+    ([], "'rules' array"),
+    ({"rules": [{"effect": "permit"}]}, "rule 0: effect"),
+    ({"rules": [{"effect": "allow"}, {"effect": "allow", "action": "https://example.org/*/v1"}]}, "rule 1: action"),
+    ({"rules": [{"effect": "allow", "entity": "did:example*"}]}, "rule 0: entity"),
+    ({"rules": [{"effect": "allow", "context": {"subject_ip": "10.0.0.1"}}]}, "not allowlisted"),
+    ({"rules": [{"effect": "allow", "context": {"purpose": []}}]}, "context.purpose"),
+])
+def test_malformed_policy_is_rejected(doc, message):
+    with pytest.raises(ValueError, match=message):
+        compile_policy(doc, CONTEXT_KEYS)
+
+
+def _rewrite(path, doc):
+    before = os.stat(path).st_mtime_ns
+    path.write_text(json.dumps(doc), encoding="utf-8")
+    # Make the change visible even on a filesystem with coarse timestamps.
+    os.utime(path, ns=(before + 10**9, before + 10**9))
+
+
+def test_reload_swaps_policy_atomically_and_keeps_it_on_a_bad_file(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"rules": [{"id": "v1", "effect": "allow", "authority": AUTHORITY}]}), encoding="utf-8")
+    engine = PolicyEngine(path, CONTEXT_KEYS)
+    terms = (AUTHORITY, ENTITY, ISSUE, LICENSE)
+    first, version = engine._compiled, engine.version
+    assert engine.evaluate(*terms, {}) is True
+    assert engine.reload_if_changed() is False
+
+    _rewrite(path, {"rules": [{"id": "v2", "effect": "deny", "authority": AUTHORITY}]})
+    assert engine.reload_if_changed() is True
+    assert engine.version != version and engine.evaluate(*terms, {}) is False
+    # The tables in force before are replaced whole, never edited, so a query that started on them finishes on them.
+    assert _decide(first, terms) == ("v1", True)
+
+    second = engine._compiled
+    _rewrite(path, {"rules": [{"id": "v3", "effect": "allow", "authority": "did:example:*x"}]})
+    assert engine.reload_if_changed() is False
+    assert engine._compiled is second and engine.evaluate(*terms, {}) is False
+    stats = engine.stats()
+    assert stats["reloads"] == 1 and stats["reload_failures"] == 1 and "rule 0: authority" in stats["last_error"]
+
+    path.write_text("{not json", encoding="utf-8")
+    os.utime(path, ns=(os.stat(path).st_mtime_ns + 10**9,) * 2)
+    assert engine.reload_if_changed() is False and engine._compiled is second
+    assert engine.stats()["reload_failures"] == 2
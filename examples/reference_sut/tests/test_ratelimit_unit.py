@@ -0,0 +1,61 @@
+"""Token buckets, the 429 they produce, and the refund between the per-IP and per-client buckets."""
+
+import pytest
+from fastapi import HTTPException
+
+from examples.reference_sut import app
+from examples.reference_sut.ratelimit import TokenBucketLimiter
+
+# Slow enough that nothing refills while a test runs.
+TRICKLE = 0.001
+
+
+def test_drained_bucket_rejects_with_ratelimit_headers():
+    limiter = TokenBucketLimiter(rate=1, burst=3)
+    decisions = [limiter.take("caller", now=100.0) for _ in range(4)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[1].headers() == {"RateLimit-Limit": "3", "RateLimit-Remaining": "1", "RateLimit-Reset": "2"}
+    assert decisions[3].headers() == {
+        "RateLimit-Limit": "3",
+        "RateLimit-Remaining": "0",
+        "RateLimit-Reset": "3",
+        "Retry-After": "1",
+    }
+    # A batch asking for more than is left waits for the whole shortfall.
+    assert limiter.take("caller", cost=3, now=100.0).headers()["Retry-After"] == "3"
+    assert limiter.take("caller", now=101.0).allowed
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    ip, client = TokenBucketLimiter(TRICKLE, burst=10), TokenBucketLimiter(TRICKLE, burst=2)
+    monkeypatch.setattr(app, "IP_LIMITER", ip)
+    monkeypatch.setattr(app, "CLIENT_LIMITER", client)
+    return ip, client
+
+
+def test_enforce_rate_limit_answers_429_with_the_tighter_buckets_headers(limiters):
+    callers = ("client-digest", "192.0.2.1")
+    assert app._enforce_rate_limit(callers)["RateLimit-Remaining"] == "1"
+    assert app._enforce_rate_limit(callers)["RateLimit-Remaining"] == "0"
+
+    with pytest.raises(HTTPException) as exc:
+        app._enforce_rate_limit(callers)
+    assert exc.value.status_code == 429 and exc.value.detail == "rate_limited"
+    assert exc.value.headers["RateLimit-Limit"] == "2" and exc.value.headers["RateLimit-Remaining"] == "0"
+    assert int(exc.value.headers["Retry-After"]) >= 1
+
+
+def test_ip_bucket_is_refunded_when_the_client_bucket_rejects(limiters):
+    ip, _ = limiters
+    callers = ("client-digest", "192.0.2.1")
+    for _ in range(2):
+        app._enforce_rate_limit(callers)
+    for _ in range(5):
+        with pytest.raises(HTTPException):
+            app._enforce_rate_limit(callers)
+
+    # Only the two admitted requests cost the IP anything; another client on it is unaffected.
+    assert app._enforce_rate_limit(("other-client", "192.0.2.1"))["RateLimit-Remaining"] == "1"
+    assert ip.take("192.0.2.1").remaining == 6
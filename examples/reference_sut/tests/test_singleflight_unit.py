@@ -0,0 +1,49 @@
+"""Coalesced callers share one evaluation, each within its own deadline."""
+
+import asyncio
+import time
+
+import pytest
+
+from examples.reference_sut.singleflight import Singleflight
+
+
+def test_a_caller_past_its_deadline_does_not_fail_the_others():
+    async def scenario():
+        flight = Singleflight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.2)
+            return b"answer"
+
+        # The first caller starts the work with a deadline shorter than the work takes.
+        leader = asyncio.ensure_future(flight.do("k", work, time.monotonic() + 0.05))
+        await asyncio.sleep(0)
+        patient = asyncio.ensure_future(flight.do("k", work, time.monotonic() + 5))
+        unbounded = asyncio.ensure_future(flight.do("k", work))
+        with pytest.raises(asyncio.TimeoutError):
+            await leader
+        assert await patient == b"answer" and await unbounded == b"answer"
+        return runs, flight.stats()
+
+    runs, stats = asyncio.run(scenario())
+    assert runs == [1]
+    assert stats["leaders"] == 1 and stats["coalesced"] == 2
+    assert stats["deadline_exceeded"] == 1 and stats["inflight"] == 0
+
+
+def test_a_shared_failure_reaches_every_caller():
+    async def scenario():
+        flight = Singleflight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream said no")
+
+        callers = [flight.do("k", work, time.monotonic() + 5) for _ in range(3)]
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [type(r) for r in results] == [ValueError] * 3
@@ -0,0 +1,79 @@
+"""The bundled fixtures, bulk-loaded into SQLite, answer as the in-memory backends do."""
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from examples.reference_sut.history import parse_time
+from examples.reference_sut.recognition import RecognitionGraph
+from examples.reference_sut.sqlite_store import SQLiteDecisionStore, bulk_load
+from examples.reference_sut.store import DecisionStore
+
+FIXTURES = Path(__file__).resolve().parents[3] / "harness" / "fixtures"
+SOURCES = [
+    FIXTURES / "bridge_golden_fixtures.json",
+    FIXTURES / "history_fixtures.json",
+    FIXTURES / "recognition_graph_fixtures.json",
+]
+MAX_DEPTH = 2
+
+
+def _cases(kind=None):
+    for src in SOURCES:
+        for case in json.loads(src.read_text(encoding="utf-8")).get("cases", []):
+            query = case.get("query") or case.get("trqp_query")
+            if kind is None or ("subject_authority_id" in query) == (kind == "recognition"):
+                yield case["id"], query
+
+
+def _at(query):
+    return parse_time((query.get("context") or {}).get("time_requested"), None)
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    path = tmp_path_factory.mktemp("sqlite") / "registry.db"
+    counts = bulk_load(path, SOURCES)
+    assert counts["authorization"] > 0 and counts["recognition"] > 0, counts
+    store = SQLiteDecisionStore(path, readers=2)
+    yield store
+    store.close()
+
+
+def test_authorization_facts_round_trip(db):
+    memory = DecisionStore.load(*SOURCES)
+    for case_id, q in _cases("authorization"):
+        terms = (q["authority_id"], q["entity_id"], q.get("action", ""), q.get("resource", ""))
+        want = memory.lookup(*terms, _at(q))
+        got = asyncio.run(db.lookup(*terms, _at(q)))
+        assert got == want, f"[{case_id}] sqlite {got}, in-memory {want}"
+
+
+def test_recognition_edges_round_trip(db):
+    memory = RecognitionGraph.load(*SOURCES, max_chain_depth=MAX_DEPTH)
+    loaded = RecognitionGraph(MAX_DEPTH)
+    for edge in db.recognition_edges():
+        loaded.add_edge(*edge)
+    assert loaded.stats()["edges"] == memory.stats()["edges"]
+    for case_id, q in _cases("recognition"):
+        terms = (q["authority_id"], q["subject_authority_id"], q.get("action", ""), q.get("resource", ""), _at(q))
+        assert loaded.recognized_until(*terms) == memory.recognized_until(*terms), f"[{case_id}]"
+
+
+def test_withdrawn_edge_is_not_loaded(tmp_path):
+    edges = tmp_path / "edges.jsonl"
+    edge = {"authority": "A", "subject_authority": "B", "expires_at": "2999-01-01T00:00:00Z", "transitive": True}
+    edges.write_text(
+        json.dumps(edge) + "\n"
+        + json.dumps(dict(edge, subject_authority="C")) + "\n"
+        + json.dumps(dict(edge, recognized=False)) + "\n",
+        encoding="utf-8",
+    )
+    bulk_load(tmp_path / "registry.db", [edges])
+    store = SQLiteDecisionStore(tmp_path / "registry.db", readers=1)
+    try:
+        assert list(store.recognition_edges()) == [("A", "C", "*", "*", parse_time("2999-01-01T00:00:00Z"), True, float("-inf"))]
+    finally:
+        store.close()
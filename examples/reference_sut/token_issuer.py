@@ -0,0 +1,130 @@
+"""Stand-in access-token issuer for exercising the reference SUT's JWT verification.
+
+    python -m examples.reference_sut.token_issuer --port 9002
+
+Publishes its public keys at `GET /jwks.json` and mints JWT access tokens (RFC 9068) at
+`POST /token`. The JSON body may override any claim a test needs to get wrong:
+
+- `scope` (default: both query scopes), `audience`, `issuer`, `subject`;
+- `ttl_seconds` (default 300), and `issued_at_offset`, seconds added to `iat`, so a
+  negative offset larger than the TTL mints an expired token;
+- `kid`, to sign with a key other than the current one, and `unpublished: true`, to sign
+  with a key that is not in the JWKS at all.
+
+Key rollover is driven over HTTP as well. `POST /keys` adds a key to the JWKS (`{"alg": ...}`,
+default the issuer's) and returns its `kid`. `DELETE /keys/{kid}` removes a key from the
+JWKS; tokens it signed should then stop being accepted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from jwcrypto import jwk, jws
+
+DEFAULT_SCOPE = "trqp.authorization.query trqp.recognition.query"
+DEFAULT_AUDIENCE = "urn:example:trqp-reference-sut"
+
+_KEY_PARAMS = {
+    "RS256": {"kty": "RSA", "size": 2048},
+    "ES256": {"kty": "EC", "crv": "P-256"},
+    "EdDSA": {"kty": "OKP", "crv": "Ed25519"},
+}
+
+
+def _generate(alg: str) -> jwk.JWK:
+    if alg not in _KEY_PARAMS:
+        raise HTTPException(status_code=400, detail="unsupported_alg")
+    return jwk.JWK.generate(kid=f"issuer-{alg.lower()}-{uuid.uuid4().hex[:8]}", **_KEY_PARAMS[alg])
+
+
+def create_app(issuer: str, audience: str = DEFAULT_AUDIENCE, alg: str = "RS256") -> FastAPI:
+    app = FastAPI(title="TSPP stand-in token issuer")
+    current = _generate(alg)
+    keys: Dict[str, jwk.JWK] = {current.key_id: current}
+    algs: Dict[str, str] = {current.key_id: alg}
+    minted = {"tokens": 0}
+
+    @app.get("/jwks.json")
+    def get_jwks() -> Dict[str, Any]:
+        return {"keys": [json.loads(k.export_public()) for k in keys.values()]}
+
+    @app.post("/keys")
+    async def add_key(req: Request) -> Dict[str, str]:
+        body = await req.json() if await req.body() else {}
+        key_alg = body.get("alg", alg) if isinstance(body, dict) else alg
+        key = _generate(key_alg)
+        keys[key.key_id] = key
+        algs[key.key_id] = key_alg
+        return {"kid": key.key_id, "alg": key_alg}
+
+    @app.delete("/keys/{kid}")
+    def delete_key(kid: str) -> Dict[str, str]:
+        if kid == current.key_id:
+            raise HTTPException(status_code=409, detail="current_key")
+        if keys.pop(kid, None) is None:
+            raise HTTPException(status_code=404, detail="not_found")
+        return {"kid": kid}
+
+    @app.post("/token")
+    async def token(req: Request) -> Dict[str, Any]:
+        body = await req.json() if await req.body() else {}
+        if not isinstance(body, dict):
+            raise HTTPException(status_code=400, detail="invalid_request")
+        if body.get("unpublished"):
+            key_alg = body.get("alg", alg)
+            key = _generate(key_alg)
+        else:
+            kid = body.get("kid", current.key_id)
+            key = keys.get(kid)
+            if key is None:
+                raise HTTPException(status_code=404, detail="unknown_kid")
+            key_alg = algs[kid]
+        ttl = int(body.get("ttl_seconds", 300))
+        iat = int(time.time()) + int(body.get("issued_at_offset", 0))
+        claims = {
+            "iss": body.get("issuer", issuer),
+            "sub": body.get("subject", "client-1"),
+            "aud": body.get("audience", audience),
+            "client_id": body.get("subject", "client-1"),
+            "scope": body.get("scope", DEFAULT_SCOPE),
+            "iat": iat,
+            "exp": iat + ttl,
+            "jti": uuid.uuid4().hex,
+        }
+        signed = jws.JWS(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        signed.add_signature(key, None, protected={"alg": key_alg, "kid": key.key_id, "typ": "at+jwt"})
+        minted["tokens"] += 1
+        return {"access_token": signed.serialize(compact=True), "token_type": "Bearer", "expires_in": ttl}
+
+    @app.get("/stats")
+    def stats() -> Dict[str, Any]:
+        return {"keys": list(keys), "current_kid": current.key_id, "minted": minted["tokens"]}
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m examples.reference_sut.token_issuer", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9002)
+    parser.add_argument("--issuer", default=None, help="`iss` of minted tokens (default: this server's URL)")
+    parser.add_argument("--audience", default=DEFAULT_AUDIENCE)
+    parser.add_argument("--alg", default="RS256", choices=sorted(_KEY_PARAMS))
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    issuer = args.issuer or f"http://{args.host}:{args.port}"
+    uvicorn.run(create_app(issuer, args.audience, args.alg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
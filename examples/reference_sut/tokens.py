@@ -0,0 +1,256 @@
+"""JWT access-token verification for the reference SUT.
+
+Callers present JWT access tokens (RFC 9068) signed by an issuer whose JWKS the registry is
+configured with, as a file path or a URL. A token is accepted when all of these hold:
+
+- it is signed with an allowed algorithm by a key in that JWKS, found by `kid`;
+- `iss` is the configured issuer, and `aud` names this registry;
+- `exp` has not passed, and neither `nbf` nor `iat` is in the future (with `leeway`);
+- its lifetime, `exp - iat`, is within the advertised `max_token_ttl_seconds`.
+
+Its scopes (`scope`, space-separated, or a `scp` list) are returned for the endpoint to
+check.
+
+Verifying a signature costs far more than the lookup it authorizes, and clients reuse a
+token for many queries. Verified tokens are therefore cached in a bounded LRU keyed by the
+token's SHA-256 digest, not the token itself. An entry lives until the token's `exp`
+(plus the leeway). Rejected tokens are never cached.
+
+The JWKS is re-read every `refresh_seconds` in the background. It is also re-read when a
+token names a `kid` it does not hold, as after a key rollover, but at most once per
+`min_refresh_seconds`. A failed refresh keeps the keys already loaded. Cached tokens whose
+key has left the JWKS are dropped, so retiring a key revokes its tokens at the next refresh.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from jwcrypto import jwk, jws
+from jwcrypto.common import JWException
+
+ALLOWED_ALGORITHMS = ("RS256", "PS256", "ES256", "EdDSA")
+
+
+class TokenRejected(Exception):
+    """An access token failed verification; `reason` is for metrics, never for the caller."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _audiences(claims: Dict[str, Any]) -> Tuple[Any, ...]:
+    aud = claims.get("aud")
+    return tuple(aud) if isinstance(aud, list) else (aud,)
+
+
+def _scopes(claims: Dict[str, Any]) -> FrozenSet[str]:
+    scope = claims.get("scope")
+    if isinstance(scope, str):
+        return frozenset(scope.split())
+    scp = claims.get("scp")
+    return frozenset(s for s in scp if isinstance(s, str)) if isinstance(scp, list) else frozenset()
+
+
+def _number(claims: Dict[str, Any], name: str) -> Optional[float]:
+    value = claims.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TokenRejected(f"malformed_{name}")
+    return float(value)
+
+
+class AccessTokenVerifier:
+    def __init__(
+        self,
+        jwks_source: str,
+        issuer: Optional[str],
+        audience: str,
+        max_ttl_seconds: float,
+        refresh_seconds: float = 300.0,
+        min_refresh_seconds: float = 1.0,
+        max_entries: int = 10000,
+        leeway_seconds: float = 30.0,
+        fetch_timeout_seconds: float = 5.0,
+    ) -> None:
+        self.jwks_source = jwks_source
+        self.issuer = issuer
+        self.audience = audience
+        self.max_ttl_seconds = max_ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self.max_entries = max(0, max_entries)
+        self.leeway_seconds = leeway_seconds
+        self.fetch_timeout_seconds = fetch_timeout_seconds
+
+        self._keys: Dict[str, jwk.JWK] = {}
+        # digest -> (exp, scopes, kid)
+        self._cache: "OrderedDict[bytes, Tuple[float, FrozenSet[str], str]]" = OrderedDict()
+        self._last_refresh = float("-inf")
+        self._refreshing: Optional["asyncio.Future[None]"] = None
+
+        self._hits = 0
+        self._verified = 0
+        self._rejected: Dict[str, int] = {}
+        self._evictions = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+        self._revoked = 0
+        self._last_error: Optional[str] = None
+        # A missing issuer at startup is not fatal: the first unknown `kid` retries the load.
+        self.refresh()
+
+    # -- JWKS ----------------------------------------------------------------
+
+    def _fetch(self) -> Dict[str, jwk.JWK]:
+        if self.jwks_source.startswith(("http://", "https://")):
+            with urllib.request.urlopen(self.jwks_source, timeout=self.fetch_timeout_seconds) as resp:
+                raw = resp.read()
+        else:
+            with open(self.jwks_source, "rb") as fh:
+                raw = fh.read()
+        keys: Dict[str, jwk.JWK] = {}
+        for entry in json.loads(raw).get("keys", []):
+            key = jwk.JWK(**entry)
+            if key.has_private:
+                raise ValueError("the issuer JWKS must hold public keys only")
+            keys[entry.get("kid") or key.thumbprint()] = key
+        return keys
+
+    def _load(self) -> Optional[Dict[str, jwk.JWK]]:
+        self._last_refresh = time.monotonic()
+        try:
+            return self._fetch()
+        except Exception as exc:
+            self._refresh_failures += 1
+            self._last_error = f"{type(exc).__name__}: {exc}"
+            return None
+
+    def _install(self, keys: Dict[str, jwk.JWK]) -> None:
+        self._keys = keys
+        self._refreshes += 1
+        self._last_error = None
+        stale = [d for d, (_, _, kid) in self._cache.items() if kid not in keys]
+        for digest in stale:
+            del self._cache[digest]
+        self._revoked += len(stale)
+
+    def refresh(self) -> bool:
+        """Re-read the JWKS; on failure, keep the keys already loaded."""
+        keys = self._load()
+        if keys is not None:
+            self._install(keys)
+        return keys is not None
+
+    async def _refresh_async(self) -> None:
+        # Fetched off the event loop; installed on it, where the cache is used.
+        keys = await asyncio.to_thread(self._load)
+        if keys is not None:
+            self._install(keys)
+
+    async def _refresh_now(self) -> None:
+        """Refresh now; concurrent callers share one fetch."""
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh_async())
+            self._refreshing.add_done_callback(lambda _: setattr(self, "_refreshing", None))
+        await asyncio.shield(self._refreshing)
+
+    async def watch(self) -> None:
+        """Refresh the JWKS every `refresh_seconds` until cancelled."""
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self._refresh_now()
+
+    # -- Tokens --------------------------------------------------------------
+
+    async def verify(self, token: str) -> FrozenSet[str]:
+        """The scopes of a valid token; raises `TokenRejected` otherwise."""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        entry = self._cache.get(digest)
+        if entry is not None:
+            if entry[0] > time.time() - self.leeway_seconds:
+                self._cache.move_to_end(digest)
+                self._hits += 1
+                return entry[1]
+            del self._cache[digest]
+
+        try:
+            exp, scopes, kid = await self._verify(token)
+        except TokenRejected as exc:
+            self._rejected[exc.reason] = self._rejected.get(exc.reason, 0) + 1
+            raise
+        self._verified += 1
+        if self.max_entries:
+            self._cache[digest] = (exp, scopes, kid)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+        return scopes
+
+    async def _verify(self, token: str) -> Tuple[float, FrozenSet[str], str]:
+        obj = jws.JWS()
+        obj.allowed_algs = list(ALLOWED_ALGORITHMS)
+        try:
+            obj.deserialize(token)
+            header = obj.jose_header
+        except (JWException, ValueError, TypeError):
+            raise TokenRejected("malformed")
+        if not isinstance(header, dict) or header.get("alg") not in ALLOWED_ALGORITHMS:
+            raise TokenRejected("algorithm")
+        kid = header.get("kid")
+        if not isinstance(kid, str):
+            raise TokenRejected("unknown_key")
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_refresh >= self.min_refresh_seconds:
+            await self._refresh_now()
+            key = self._keys.get(kid)
+        if key is None:
+            raise TokenRejected("unknown_key")
+        try:
+            obj.verify(key, alg=header["alg"])
+            claims = json.loads(obj.payload)
+        except (JWException, ValueError, TypeError):
+            raise TokenRejected("signature")
+        if not isinstance(claims, dict):
+            raise TokenRejected("malformed")
+
+        if self.issuer is not None and claims.get("iss") != self.issuer:
+            raise TokenRejected("issuer")
+        if self.audience not in _audiences(claims):
+            raise TokenRejected("audience")
+        now = time.time()
+        exp, nbf, iat = _number(claims, "exp"), _number(claims, "nbf"), _number(claims, "iat")
+        if exp is None:
+            raise TokenRejected("malformed_exp")
+        if exp <= now - self.leeway_seconds:
+            raise TokenRejected("expired")
+        if (nbf is not None and nbf > now + self.leeway_seconds) or (iat is not None and iat > now + self.leeway_seconds):
+            raise TokenRejected("not_yet_valid")
+        if exp - (iat if iat is not None else now) > self.max_ttl_seconds:
+            raise TokenRejected("lifetime")
+        return exp, _scopes(claims), kid
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jwks_source": self.jwks_source,
+            "keys": len(self._keys),
+            "entries": len(self._cache),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "verified": self._verified,
+            "rejected": dict(self._rejected),
+            "evictions": self._evictions,
+            "revoked": self._revoked,
+            "refreshes": self._refreshes,
+            "refresh_failures": self._refresh_failures,
+            "last_error": self._last_error,
+        }
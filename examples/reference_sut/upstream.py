@@ -0,0 +1,495 @@
+"""Batched adapter to an upstream system of record.
+
+Deployments whose facts live in another service set `TSPP_REF_UPSTREAM_URL` instead of
+loading them. Per-query round trips would put one upstream call behind every
+authorization request, so `UpstreamBatcher` works like a dataloader. Lookups arriving
+within a short window are collected, identical ones share a single slot, and the
+distinct ones go upstream as one call. A batch also closes as soon as it reaches
+`max_batch` distinct keys.
+
+Wire format: `POST {url}/lookup` with
+
+    {"queries": [{"authority": ..., "entity": ..., "action": ..., "resource": ..., "at": <epoch|null>}, ...]}
+
+answered by `{"results": [true | false | null, ...]}` in query order, where null means
+the entity is unknown to the authority. `at` is the `context.time_requested` as epoch
+seconds; null asks for the upstream's current answer.
+
+`HTTPPool` keeps a bounded set of keep-alive HTTP/1.1 connections (h11 over asyncio
+streams), so batches reuse sockets rather than paying a TCP handshake each.
+
+A slow upstream must not hold requests past their usefulness:
+
+- Each lookup carries a deadline, normally from the client's remaining budget. The
+  caller stops waiting at its deadline. The batch call itself runs under the pool
+  timeout, which the upstream learns from `X-Request-Timeout-Ms`, so one caller's small
+  budget neither cuts the call short for the others nor counts as an upstream failure.
+- A call still unanswered after the p95 of recent call latencies is hedged: sent again
+  on another connection, and the first answer wins. At most about 5% of calls are
+  duplicated, and one slow upstream replica no longer sets the tail.
+- `CircuitBreaker` fails lookups fast while the upstream keeps failing, instead of
+  queueing them behind calls that will time out.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit
+
+import h11
+
+Key = Tuple[str, str, str, str, Optional[float]]
+
+
+class UpstreamError(Exception):
+    """The upstream call failed, timed out, or returned an unusable answer, or the breaker is open."""
+
+    def __init__(self, message: str, retry_after: int = 1) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Connection:
+    __slots__ = ("reader", "writer", "h11")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.h11 = h11.Connection(h11.CLIENT)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class HTTPPool:
+    """Keep-alive HTTP/1.1 connections to one origin, at most `max_connections` in use at once."""
+
+    def __init__(self, base_url: str, max_connections: int = 8, timeout: float = 2.0) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported upstream URL {base_url!r}")
+        self.base_url = base_url.rstrip("/")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.tls = parts.scheme == "https"
+        self.prefix = parts.path.rstrip("/")
+        self.authority = parts.netloc
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self._idle: Deque[_Connection] = deque()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self._opened = 0
+        self._reused = 0
+
+    async def _connect(self) -> _Connection:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.tls or None)
+        self._opened += 1
+        return _Connection(reader, writer)
+
+    async def _exchange(
+        self, conn: _Connection, path: str, body: bytes, extra: Sequence[Tuple[str, str]]
+    ) -> Tuple[int, bytes]:
+        c = conn.h11
+        headers = [
+            ("Host", self.authority),
+            ("Content-Type", "application/json"),
+            ("Accept", "application/json"),
+            ("Content-Length", str(len(body))),
+            *extra,
+        ]
+        out = c.send(h11.Request(method="POST", target=self.prefix + path, headers=headers))
+        out += c.send(h11.Data(data=body))
+        out += c.send(h11.EndOfMessage())
+        conn.writer.write(out)
+        await conn.writer.drain()
+
+        status, chunks = 0, []
+        while True:
+            event = c.next_event()
+            if event is h11.NEED_DATA:
+                c.receive_data(await conn.reader.read(65536))
+            elif isinstance(event, h11.Response):
+                status = event.status_code
+            elif isinstance(event, h11.Data):
+                chunks.append(bytes(event.data))
+            elif isinstance(event, h11.EndOfMessage):
+                return status, b"".join(chunks)
+            elif isinstance(event, h11.ConnectionClosed):
+                raise ConnectionError("upstream closed the connection mid-response")
+
+    async def post(
+        self, path: str, body: bytes, timeout: Optional[float] = None, headers: Sequence[Tuple[str, str]] = ()
+    ) -> Tuple[int, bytes]:
+        """POST `body` to `path`; return the status and response body.
+
+        `timeout` (default the pool's) covers waiting for a connection as well as the exchange.
+        A cancelled or timed-out exchange closes its connection rather than returning it.
+        """
+        return await asyncio.wait_for(self._post(path, body, headers), self.timeout if timeout is None else timeout)
+
+    async def _post(self, path: str, body: bytes, headers: Sequence[Tuple[str, str]]) -> Tuple[int, bytes]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        async with self._slots:
+            # An idle connection the upstream has since closed fails before any response
+            # byte arrives; lookups are reads, so retry on another connection.
+            while self._idle:
+                conn = self._idle.pop()
+                try:
+                    result = await self._exchange(conn, path, body, headers)
+                except (ConnectionError, h11.ProtocolError, OSError):
+                    conn.close()
+                    continue
+                except BaseException:
+                    conn.close()
+                    raise
+                self._reused += 1
+                self._release(conn)
+                return result
+            conn = await self._connect()
+            try:
+                result = await self._exchange(conn, path, body, headers)
+            except BaseException:
+                conn.close()
+                raise
+            self._release(conn)
+            return result
+
+    def _release(self, conn: _Connection) -> None:
+        c = conn.h11
+        if c.our_state is h11.DONE and c.their_state is h11.DONE:
+            c.start_next_cycle()
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "idle_connections": len(self._idle),
+            "connections_opened": self._opened,
+            "connections_reused": self._reused,
+        }
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failed upstream calls and fails fast for `reset_seconds`.
+
+    Then it is half-open: one trial call goes upstream while everything else still fails
+    fast. The trial's success closes the breaker, and its failure opens it again.
+    A threshold of 0 disables the breaker.
+    """
+
+    def __init__(self, threshold: int = 5, reset_seconds: float = 5.0) -> None:
+        self.threshold = max(0, threshold)
+        self.reset_seconds = max(0.0, reset_seconds)
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+        self._opens = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if self._trial or self._cooled() else "open"
+
+    def _cooled(self) -> bool:
+        return self._opened_at is not None and time.monotonic() - self._opened_at >= self.reset_seconds
+
+    def rejecting(self) -> bool:
+        """Whether a new lookup should fail now without queueing."""
+        if self._opened_at is None or (self._cooled() and not self._trial):
+            return False
+        self._rejected += 1
+        return True
+
+    def allow(self) -> bool:
+        """Whether an upstream call may go out now; claims the trial call when half-open."""
+        if self._opened_at is None:
+            return True
+        if self._trial or not self._cooled():
+            self._rejected += 1
+            return False
+        self._trial = True
+        return True
+
+    def retry_after(self) -> int:
+        """Whole seconds until the breaker lets a trial call through."""
+        if self._opened_at is None:
+            return 1
+        return max(1, math.ceil(self._opened_at + self.reset_seconds - time.monotonic()))
+
+    def success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def failure(self) -> None:
+        self._failures += 1
+        if self.threshold and (self._trial or self._failures >= self.threshold):
+            if self._opened_at is None or self._trial:
+                self._opens += 1
+            self._opened_at = time.monotonic()
+            self._trial = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "threshold": self.threshold,
+            "reset_seconds": self.reset_seconds,
+            "consecutive_failures": self._failures,
+            "opens": self._opens,
+            "rejected": self._rejected,
+        }
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.futures: Dict[Key, asyncio.Future] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class UpstreamBatcher:
+    def __init__(
+        self,
+        pool: HTTPPool,
+        window_ms: float = 2.0,
+        max_batch: int = 256,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: bool = True,
+        hedge_min_samples: int = 20,
+    ) -> None:
+        self.pool = pool
+        self.window_seconds = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.breaker = breaker or CircuitBreaker(0)
+        self.hedge = hedge
+        self.hedge_min_samples = max(1, hedge_min_samples)
+        self._open: Optional[_Batch] = None
+
+        self._lookups = 0
+        self._deduplicated = 0
+        self._batches = 0
+        self._keys = 0
+        self._max_batch_seen = 0
+        self._errors = 0
+        self._deadline_exceeded = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        # Per-attempt latencies, including attempts abandoned for a faster hedge (as a lower
+        # bound), so the hedge delay tracks the upstream's tail rather than the hedged one.
+        self._attempts: Deque[float] = deque(maxlen=1024)
+        self._attempt_max = 0.0
+        self._since_sort = 0
+        self._sorted: List[float] = []
+        # Per-batch latency as the waiting lookups saw it, hedging included.
+        self._calls: Deque[float] = deque(maxlen=1024)
+        self._call_total = 0.0
+
+    async def lookup(
+        self,
+        authority: str,
+        entity: str,
+        action: str,
+        resource: str,
+        at: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[bool]:
+        """The upstream's decision for one query, fetched with the current batch.
+
+        `deadline` (`time.monotonic()` seconds) bounds the wait; the pool timeout applies
+        when it is None or later. Raises `UpstreamError` on failure, on an open breaker, or
+        once the deadline passes.
+        """
+        self._lookups += 1
+        if self.breaker.rejecting():
+            raise UpstreamError("circuit breaker open", self.breaker.retry_after())
+        now = time.monotonic()
+        deadline = min(deadline if deadline is not None else math.inf, now + self.pool.timeout)
+        if deadline <= now:
+            self._deadline_exceeded += 1
+            raise UpstreamError("deadline exceeded")
+
+        loop = asyncio.get_running_loop()
+        key = (authority, entity, action, resource, at)
+        batch = self._open
+        if batch is None:
+            batch = self._open = _Batch()
+            batch.timer = loop.call_later(self.window_seconds, self._flush)
+        fut = batch.futures.get(key)
+        if fut is None:
+            fut = batch.futures[key] = loop.create_future()
+            if len(batch.futures) >= self.max_batch:
+                self._flush()
+        else:
+            self._deduplicated += 1
+        # Shielded: one caller giving up must not cancel the answer for the others.
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), deadline - time.monotonic())
+        except asyncio.TimeoutError:
+            self._deadline_exceeded += 1
+            raise UpstreamError("deadline exceeded") from None
+
+    def _flush(self) -> None:
+        batch, self._open = self._open, None
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        asyncio.ensure_future(self._fetch(batch))
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds after which a call is duplicated: the p95 of recent attempts."""
+        if not self.hedge or len(self._attempts) < self.hedge_min_samples:
+            return None
+        if self._since_sort >= 32 or not self._sorted:
+            self._sorted = sorted(self._attempts)
+            self._since_sort = 0
+        return _percentile(self._sorted, 0.95) / 1000.0
+
+    def _record_attempt(self, started: float) -> None:
+        elapsed = (time.perf_counter() - started) * 1000.0
+        self._attempts.append(elapsed)
+        self._attempt_max = max(self._attempt_max, elapsed)
+        self._since_sort += 1
+
+    async def _attempt(self, body: bytes, timeout: float) -> List[Any]:
+        started = time.perf_counter()
+        try:
+            status, raw = await self.pool.post(
+                "/lookup", body, timeout, [("X-Request-Timeout-Ms", str(max(1, int(timeout * 1000))))]
+            )
+        except asyncio.CancelledError:
+            self._record_attempt(started)
+            raise
+        self._record_attempt(started)
+        if status != 200:
+            raise UpstreamError(f"upstream answered {status}")
+        results = json.loads(raw)["results"]
+        if not isinstance(results, list):
+            raise UpstreamError("upstream returned no results list")
+        return results
+
+    async def _call(self, body: bytes, timeout: float) -> List[Any]:
+        """One upstream call, duplicated once on another connection if it outlasts the hedge delay."""
+        end = time.monotonic() + timeout
+        primary = asyncio.ensure_future(self._attempt(body, timeout))
+        delay = self._hedge_delay() if self.breaker.state == "closed" else None
+        if delay is None or delay >= timeout:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        self._hedges += 1
+        hedge = asyncio.ensure_future(self._attempt(body, end - time.monotonic()))
+        pending: Set[asyncio.Future] = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _fetch(self, batch: _Batch) -> None:
+        keys = list(batch.futures)
+        if not self.breaker.allow():
+            err = UpstreamError("circuit breaker open", self.breaker.retry_after())
+            for fut in batch.futures.values():
+                if not fut.done():
+                    fut.set_exception(err)
+            return
+        body = json.dumps(
+            {
+                "queries": [
+                    {"authority": a, "entity": e, "action": act, "resource": res, "at": at}
+                    for a, e, act, res, at in keys
+                ]
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        started = time.perf_counter()
+        try:
+            # Not bounded by any waiter's deadline: the breaker counts only the upstream's own failures.
+            results = await self._call(body, self.pool.timeout)
+            if len(results) != len(keys):
+                raise UpstreamError("upstream returned the wrong number of results")
+        except Exception as exc:
+            self._errors += 1
+            self.breaker.failure()
+            err = exc if isinstance(exc, UpstreamError) else UpstreamError(f"{type(exc).__name__}: {exc}")
+            if self.breaker.state != "closed":
+                err.retry_after = self.breaker.retry_after()
+            for fut in batch.futures.values():
+                if not fut.done():
+                    fut.set_exception(err)
+            return
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self._calls.append(elapsed)
+            self._call_total += elapsed
+
+        self.breaker.success()
+        self._batches += 1
+        self._keys += len(keys)
+        self._max_batch_seen = max(self._max_batch_seen, len(keys))
+        for key, value in zip(keys, results):
+            fut = batch.futures[key]
+            if not fut.done():
+                fut.set_result(None if value is None else bool(value))
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self._batches + self._errors
+        attempts: List[float] = sorted(self._attempts)
+        effective: List[float] = sorted(self._calls)
+        return {
+            "url": self.pool.base_url,
+            "window_ms": round(self.window_seconds * 1000.0, 3),
+            "max_batch": self.max_batch,
+            "lookups": self._lookups,
+            "deduplicated": self._deduplicated,
+            "batches": self._batches,
+            "keys": self._keys,
+            "avg_batch_size": round(self._keys / self._batches, 2) if self._batches else 0.0,
+            "max_batch_size": self._max_batch_seen,
+            "errors": self._errors,
+            "deadline_exceeded": self._deadline_exceeded,
+            "avg_upstream_ms": round(sum(attempts) / len(attempts), 3) if attempts else 0.0,
+            "p95_upstream_ms": round(_percentile(attempts, 0.95), 3),
+            "p99_upstream_ms": round(_percentile(attempts, 0.99), 3),
+            "max_upstream_ms": round(self._attempt_max, 3),
+            "avg_call_ms": round(self._call_total / calls, 3) if calls else 0.0,
+            "p99_call_ms": round(_percentile(effective, 0.99), 3),
+            "hedging": {
+                "enabled": self.hedge,
+                "delay_ms": round((self._hedge_delay() or 0.0) * 1000.0, 3),
+                "hedges": self._hedges,
+                "hedge_wins": self._hedge_wins,
+            },
+            "breaker": self.breaker.stats(),
+            "pool": self.pool.stats(),
+        }
@@ -0,0 +1,113 @@
+"""Stand-in upstream system of record for exercising the reference SUT's batching adapter.
+
+    python -m examples.reference_sut.upstream_stub --port 9001 --latency-ms 5 \\
+        harness/fixtures/bridge_golden_fixtures.json
+
+Answers `POST /lookup` (the wire format in `upstream.py`) from a `DecisionStore` loaded
+from the given fact files, after sleeping `--latency-ms` once per call to stand in for a
+remote database. `GET /stats` reports how many calls arrived and how large they were,
+so a test can check that concurrent SUT queries reached it in batches.
+
+Faults are injected per call, independently, with the given probabilities:
+
+- `slow_rate`: add `slow_ms` to the call's latency (a slow replica, a lock wait);
+- `error_rate`: answer `500` instead of results.
+
+`GET /faults` shows the current settings, and `PUT /faults` changes any of them
+(`latency_ms`, `slow_rate`, `slow_ms`, `error_rate`) while the stub runs, so a scenario
+can degrade the upstream and restore it. `--seed` makes the fault sequence repeatable.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+
+from .store import DecisionStore
+
+_FAULTS = ("latency_ms", "slow_rate", "slow_ms", "error_rate")
+
+
+def create_app(store: DecisionStore, faults: Optional[Dict[str, float]] = None, seed: Optional[int] = None) -> FastAPI:
+    app = FastAPI(title="TSPP upstream system-of-record stub")
+    settings: Dict[str, float] = {name: 0.0 for name in _FAULTS}
+    settings.update(faults or {})
+    rng = random.Random(seed)
+    sizes: List[int] = []
+    injected = {"slow": 0, "error": 0}
+
+    @app.post("/lookup")
+    async def lookup(req: Request):
+        try:
+            queries = (await req.json())["queries"]
+            terms = [
+                (q["authority"], q["entity"], q["action"], q["resource"], q.get("at"))
+                for q in queries
+            ]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="invalid_request")
+        sizes.append(len(terms))
+        delay = settings["latency_ms"]
+        if rng.random() < settings["slow_rate"]:
+            injected["slow"] += 1
+            delay += settings["slow_ms"]
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+        if rng.random() < settings["error_rate"]:
+            injected["error"] += 1
+            raise HTTPException(status_code=500, detail="injected_fault")
+        return {"results": [store.lookup(*t) for t in terms]}
+
+    @app.get("/faults")
+    def get_faults() -> Dict[str, float]:
+        return settings
+
+    @app.put("/faults")
+    async def put_faults(req: Request) -> Dict[str, float]:
+        try:
+            update = {k: float(v) for k, v in (await req.json()).items() if k in _FAULTS}
+        except (ValueError, AttributeError, TypeError):
+            raise HTTPException(status_code=400, detail="invalid_request")
+        settings.update(update)
+        return settings
+
+    @app.get("/stats")
+    def stats() -> Dict[str, Any]:
+        return {
+            "calls": len(sizes),
+            "queries": sum(sizes),
+            "max_batch_size": max(sizes, default=0),
+            "batch_sizes": sizes[-1000:],
+            "injected": dict(injected),
+        }
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m examples.reference_sut.upstream_stub", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("sources", nargs="+", help="fact files, as for TSPP_REF_DECISION_STORE")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated upstream latency per call")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="probability that a call is slowed down")
+    parser.add_argument("--slow-ms", type=float, default=0.0, help="latency added to a slowed call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability that a call answers 500")
+    parser.add_argument("--seed", type=int, default=None, help="seed for repeatable fault injection")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    faults = {name: getattr(args, name) for name in _FAULTS}
+    app = create_app(DecisionStore.load(*args.sources), faults, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import pytest
+import requests
 
 from tspp_trqp_harness.reporting import requirements
 from tspp_trqp_harness.validate import validate_json
@@ -29,3 +30,31 @@ def test_metadata_declares_context_allowlist(_client):
     data = r.json()
     assert "context_allowlist" in data
     assert isinstance(data["context_allowlist"], list)
+
+
+@requirements("TSPP-META-03")
+def test_metadata_and_jwks_support_conditional_requests(_client):
+    c = _client
+    r = c.get_metadata()
+    if r.status_code != 200:
+        pytest.skip("metadata not available")
+    etag = r.headers.get("ETag")
+    if not etag:
+        pytest.skip("metadata served without ETag; conditional requests not offered")
+    assert not etag.startswith("W/"), "metadata ETag should be strong"
+
+    r2 = c.get_metadata(if_none_match=etag)
+    assert r2.status_code == 304, f"If-None-Match with current ETag should give 304, got {r2.status_code}"
+    assert not r2.content, "304 response must not carry a body"
+    assert r2.headers.get("ETag") == etag
+
+    jwks_uri = r.json().get("signing", {}).get("jwks_uri")
+    if not jwks_uri:
+        return
+    j = requests.get(jwks_uri, timeout=10)
+    assert j.status_code == 200
+    jwks_etag = j.headers.get("ETag")
+    if jwks_etag:
+        j2 = requests.get(jwks_uri, headers={"If-None-Match": jwks_etag}, timeout=10)
+        assert j2.status_code == 304, f"JWKS If-None-Match should give 304, got {j2.status_code}"
+        assert not j2.content, "304 response must not carry a body"
@@ -30,3 +30,22 @@ def test_uniform_not_found_surface(_client, _load_queries):
         assert len(set(map(lambda x: tuple(sorted(x)) if x else tuple(), json_shapes))) == 1, f"inconsistent error JSON shapes: {samples}"
 
     # Timing equalization can't be strictly asserted here; we record samples for operator review.
+
+
+@requirements("TSPP-ERR-01")
+def test_unrepresentable_number_is_a_client_error(_client, _load_queries):
+    c = _client
+    allowlist = [k for k in (c.get_metadata().json().get("context_allowlist") or []) if k != "time_requested"]
+    if not allowlist:
+        pytest.skip("no allowlisted context key to carry the number")
+    # Valid JSON, but beyond what a double holds exactly, so RFC 8785 cannot canonicalize it.
+    huge = 2**53 + 1
+
+    for name, post in (("authorization", c.post_authorization), ("recognition", c.post_recognition)):
+        q = dict(_load_queries[f"{name}_valid"], context={allowlist[0]: huge})
+        for accept_signature in ("none", "jws"):
+            r = post(q, accept_signature=accept_signature)
+            assert r.status_code == 400, (
+                f"/{name} (Accept-Signature: {accept_signature}) answered {r.status_code} for context "
+                f"{{{allowlist[0]!r}: {huge}}}: {r.text[:200]}"
+            )
@@ -12,9 +12,9 @@ Evidence:
 
 import os
 import pytest
-from jwcrypto import jwk, jws
 
 from tspp_trqp_harness.reporting import requirements
+from tspp_trqp_harness.signatures import verify_signed_envelope
 from tspp_trqp_harness.validate import validate_json
 
 
@@ -75,19 +75,74 @@ def test_al2_signed_response_verifies_with_jwks(_client, _load_queries):
         jwks = resp.json()
     except Exception as e:
         pytest.fail(f"Failed to fetch/parse JWKS from {jwks_uri}: {e}")
-    keys = jwks.get("keys", [])
-    assert keys, "JWKS has no keys"
-
-    verifier = jws.JWS()
-    verifier.deserialize(sig["jws"])
-
-    verified = False
-    for k in keys:
-        try:
-            key = jwk.JWK.from_json(__import__("json").dumps(k))
-            verifier.verify(key)
-            verified = True
-            break
-        except Exception:
-            continue
-    assert verified, "Could not verify AL2 response signature with declared JWKS"
+    assert jwks.get("keys"), "JWKS has no keys"
+
+    # Covers both per-response JWS and Merkle-batched envelopes (signature.merkle).
+    verify_signed_envelope(body, jwks)
+
+
+@requirements("TSPP-AL2-02")
+def test_al2_each_advertised_algorithm_verifies(_client, _load_queries):
+    expected = os.environ.get("TSPP_EXPECT_AL")
+    if expected != "AL2":
+        pytest.skip("Not in AL2 mode")
+
+    c = _client
+    m = c.get_metadata()
+    if m.status_code != 200:
+        pytest.skip("metadata not available for algorithm discovery")
+    signing = m.json().get("signing", {})
+    algorithms = signing.get("algorithms") or []
+    jwks_uri = signing.get("jwks_uri")
+    if not algorithms or not jwks_uri:
+        pytest.skip("signing.algorithms or jwks_uri not declared")
+
+    import requests
+    jwks = requests.get(jwks_uri, timeout=10).json()
+    assert jwks.get("keys"), "JWKS has no keys"
+
+    q = _load_queries["authorization_valid"]
+    for alg in algorithms:
+        r = c.post_authorization(q, accept_signature=f"jws;alg={alg}")
+        assert r.status_code == 200, f"[{alg}] expected 200, got {r.status_code}: {r.text}"
+        body = r.json()
+        _, sig = _unwrap_if_signed(body)
+        assert isinstance(sig, dict) and sig.get("jws"), f"[{alg}] expected signature block with jws"
+        # Servers may fall back to a default algorithm, but only to one they advertise.
+        assert sig.get("alg") in algorithms, f"[{alg}] signature alg {sig.get('alg')!r} not advertised in metadata"
+        verify_signed_envelope(body, jwks)
+
+
+@requirements("TSPP-AL2-03")
+def test_al2_detached_payload_jws_verifies(_client, _load_queries, _load_schema):
+    expected = os.environ.get("TSPP_EXPECT_AL")
+    if expected != "AL2":
+        pytest.skip("Not in AL2 mode")
+
+    c = _client
+    m = c.get_metadata()
+    if m.status_code != 200:
+        pytest.skip("metadata not available for signing discovery")
+    signing = m.json().get("signing", {})
+    if signing.get("detached_payload") is not True:
+        pytest.skip("signing.detached_payload not declared")
+
+    import requests
+    jwks = requests.get(signing["jwks_uri"], timeout=10).json()
+    schema = _load_schema("tspp-trqp-signed-response.schema.json")
+
+    q = _load_queries["authorization_valid"]
+    for alg in signing.get("algorithms") or []:
+        r = c.post_authorization(q, accept_signature=f"jws;alg={alg};b64=false")
+        assert r.status_code == 200, f"[{alg}] expected 200, got {r.status_code}: {r.text}"
+        body = r.json()
+        validate_json(body, schema)
+        _, sig = _unwrap_if_signed(body)
+        assert isinstance(sig, dict) and sig.get("detached_payload") is True, f"[{alg}] expected a detached JWS"
+        assert verify_signed_envelope(body, jwks)["variant"] == "jws-detached"
+
+        attached = c.post_authorization(q, accept_signature=f"jws;alg={alg}")
+        assert attached.status_code == 200, f"[{alg}] expected 200, got {attached.status_code}: {attached.text}"
+        assert len(r.content) < len(attached.content), (
+            f"[{alg}] detached envelope ({len(r.content)} bytes) is not smaller than attached ({len(attached.content)} bytes)"
+        )
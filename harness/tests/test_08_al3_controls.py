@@ -13,6 +13,7 @@ import pytest
 import requests
 
 from tspp_trqp_harness.reporting import requirements
+from tspp_trqp_harness.signatures import verify_signed_envelope
 from tspp_trqp_harness.validate import validate_json
 
 
@@ -58,6 +59,50 @@ def test_al3_signed_envelope_includes_meta(_client, _load_queries, _load_schema)
     validate_json(body, schema)
 
 
+@requirements("TSPP-AL3-02", "TSPP-AL2-02")
+def test_al3_default_signed_envelope_verifies_with_jwks(_client, _load_queries):
+    expected = os.environ.get("TSPP_EXPECT_AL")
+    if expected != "AL3":
+        pytest.skip("Not in AL3 mode")
+
+    r = _client.post_authorization(_load_queries["authorization_valid"], accept_signature="none")
+    assert r.status_code == 200, f"expected 200, got {r.status_code}: {r.text}"
+    body = r.json()
+    assert "signature" in body, "AL3 requires default signing for successful machine-consumed responses"
+
+    m = _client.get_metadata()
+    assert m.status_code == 200, f"expected 200, got {m.status_code}: {m.text}"
+    jwks_uri = m.json().get("signing", {}).get("jwks_uri")
+    assert jwks_uri, "AL3 signed responses require signing.jwks_uri"
+    jwks = requests.get(jwks_uri, timeout=10).json()
+
+    # Per-response JWS and Merkle-batched envelopes are both acceptable at AL3.
+    verify_signed_envelope(body, jwks)
+
+
+@requirements("TSPP-AL3-02", "TSPP-AL2-03")
+def test_al3_default_signed_envelope_with_detached_payload_verifies(_client, _load_queries, _load_schema):
+    expected = os.environ.get("TSPP_EXPECT_AL")
+    if expected != "AL3":
+        pytest.skip("Not in AL3 mode")
+
+    m = _client.get_metadata()
+    assert m.status_code == 200, f"expected 200, got {m.status_code}: {m.text}"
+    signing = m.json().get("signing", {})
+    if signing.get("detached_payload") is not True:
+        pytest.skip("signing.detached_payload not declared")
+    jwks = requests.get(signing["jwks_uri"], timeout=10).json()
+
+    r = _client.post_authorization(_load_queries["authorization_valid"], accept_signature="jws;b64=false")
+    assert r.status_code == 200, f"expected 200, got {r.status_code}: {r.text}"
+    body = r.json()
+    validate_json(body, _load_schema("tspp-trqp-signed-response.schema.json"))
+    _, sig, meta = _unwrap_if_signed(body)
+    assert meta is not None and sig is not None, "AL3 requires a signed envelope with meta"
+    assert sig.get("detached_payload") is True, "signing.detached_payload is declared, but the JWS is not detached"
+    assert verify_signed_envelope(body, jwks)["variant"] == "jws-detached"
+
+
 @requirements("TSPP-AL3-03")
 def test_al3_independent_assessment_uri_resolves(_client):
     expected = os.environ.get("TSPP_EXPECT_AL")
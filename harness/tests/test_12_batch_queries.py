@@ -0,0 +1,105 @@
+"""TSPP harness test for batch query endpoints.
+
+What this test is proving:
+- `POST /authorization/batch` and `POST /recognition/batch` return one result per query, in order,
+  and each result matches what the single-query endpoint returns for the same query.
+- In signed mode, a single signature covers the whole batch and verifies against the declared JWKS.
+
+Why it matters:
+- Relying parties batching N lookups must get exactly the decisions they would have got one by one;
+  a batch path that drifts from the single-query path is a silent policy bypass.
+
+Evidence:
+- Conformance report sections: per-item status/decision comparison and batch signature verification.
+"""
+
+import os
+import pytest
+import requests
+
+from tspp_trqp_harness.reporting import requirements
+from tspp_trqp_harness.signatures import verify_signed_envelope
+from tspp_trqp_harness.validate import validate_json
+
+# Freshness timestamps legitimately differ between two evaluations of the same query.
+_VOLATILE_META = {"time_evaluated", "expires_at"}
+
+
+def _unwrap(body):
+    if isinstance(body, dict) and "payload" in body and "signature" in body:
+        return body["payload"]
+    return body
+
+
+def _stable(payload):
+    out = dict(payload)
+    meta = out.pop("meta", None)
+    assert isinstance(meta, dict) and _VOLATILE_META <= set(meta), "each batch item must carry its own freshness meta"
+    out["meta"] = {k: v for k, v in meta.items() if k not in _VOLATILE_META}
+    return out
+
+
+def _batch_or_skip(resp):
+    if resp.status_code in (404, 405):
+        pytest.skip("batch endpoint not implemented")
+    assert resp.status_code == 200, f"expected 200, got {resp.status_code}: {resp.text}"
+    results = _unwrap(resp.json()).get("results")
+    assert isinstance(results, list), "batch response must carry a results array"
+    return results
+
+
+def _assert_matches_single(results, queries, single):
+    assert len(results) == len(queries), f"expected {len(queries)} results, got {len(results)}"
+    for i, (item, q) in enumerate(zip(results, queries)):
+        r = single(q)
+        assert item.get("status") == r.status_code, f"item {i}: batch status {item.get('status')} != single {r.status_code}"
+        if r.status_code == 200:
+            assert _stable(item["body"]) == _stable(_unwrap(r.json())), f"item {i}: batch body differs from single-query body"
+        else:
+            assert "error" in item, f"item {i}: non-200 batch item must carry an error"
+
+
+@requirements("TSPP-BATCH-01")
+def test_authorization_batch_matches_single_queries(_client, _load_queries):
+    c = _client
+    qs = _load_queries
+    queries = [
+        qs["authorization_valid"],
+        qs["authorization_unknown_entity"],
+        qs["authorization_with_unknown_context_key"],
+        qs["authorization_valid"],
+    ]
+    results = _batch_or_skip(c.post_authorization_batch(queries))
+    _assert_matches_single(results, queries, c.post_authorization)
+
+
+@requirements("TSPP-BATCH-01")
+def test_recognition_batch_matches_single_queries(_client, _load_queries):
+    c = _client
+    q = _load_queries["recognition_valid"]
+    queries = [q, dict(q, context={"purpose": "audit"})]
+    results = _batch_or_skip(c.post_recognition_batch(queries))
+    _assert_matches_single(results, queries, c.post_recognition)
+
+
+@requirements("TSPP-BATCH-02", "TSPP-AL2-02")
+def test_signed_batch_has_one_verifiable_signature(_client, _load_queries, _load_schema):
+    expected = os.environ.get("TSPP_EXPECT_AL")
+    if expected not in ("AL2", "AL3", "AL4"):
+        pytest.skip("Signed batches are only expected from AL2+")
+
+    c = _client
+    q = _load_queries["authorization_valid"]
+    r = c.post_authorization_batch([q, _load_queries["authorization_unknown_entity"], q], accept_signature="jws")
+    _batch_or_skip(r)
+    body = r.json()
+    assert "signature" in body, "signed batch must be a single signed envelope"
+    validate_json(body, _load_schema("tspp-trqp-signed-response.schema.json"))
+
+    m = c.get_metadata()
+    if m.status_code != 200:
+        pytest.skip("metadata not available for jwks discovery")
+    jwks_uri = m.json().get("signing", {}).get("jwks_uri")
+    if not jwks_uri:
+        pytest.skip("jwks_uri not declared")
+    verify_signed_envelope(body, requests.get(jwks_uri, timeout=10).json())
@@ -0,0 +1,48 @@
+"""TSPP harness test for the streaming NDJSON query endpoints.
+
+What this test is proving:
+- `POST /authorization/stream` returns one NDJSON result per request line, in order, and each
+  result matches what the single-query endpoint returns for the same query.
+
+Why it matters:
+- Bulk re-verification runs through the streaming path; it must not drift from single-query decisions.
+
+Evidence:
+- Conformance report sections: per-line status/decision comparison.
+"""
+
+import pytest
+import requests
+
+from tspp_trqp_harness.reporting import requirements
+
+_VOLATILE_META = {"time_evaluated", "expires_at"}
+
+
+def _stable(body):
+    payload = body["payload"] if "payload" in body and "signature" in body else body
+    out = dict(payload)
+    out["meta"] = {k: v for k, v in out.get("meta", {}).items() if k not in _VOLATILE_META}
+    return out
+
+
+@requirements("TSPP-BATCH-03")
+def test_authorization_stream_matches_single_queries(_client, _load_queries):
+    c = _client
+    qs = _load_queries
+    queries = [qs["authorization_valid"], qs["authorization_unknown_entity"]] * 3 + [qs["authorization_with_unknown_context_key"]]
+    try:
+        results = list(c.stream_authorization(iter(queries), window=4))
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code in (404, 405, 415):
+            pytest.skip("streaming endpoint not implemented")
+        raise
+
+    assert len(results) == len(queries), f"expected {len(queries)} result lines, got {len(results)}"
+    for i, (item, q) in enumerate(zip(results, queries)):
+        r = c.post_authorization(q)
+        assert item.get("status") == r.status_code, f"line {i}: stream status {item.get('status')} != single {r.status_code}"
+        if r.status_code == 200:
+            assert _stable(item["body"]) == _stable(r.json()), f"line {i}: stream body differs from single-query body"
+        else:
+            assert "error" in item, f"line {i}: non-200 stream line must carry an error"
@@ -0,0 +1,101 @@
+"""TSPP harness test for the recognition matrix endpoint.
+
+What this test is proving:
+- `POST /recognition/matrix` answers every (authority, subject authority) pair with the same
+  `recognized` outcome the single recognition query returns for that pair.
+- In signed mode, one signature covers the whole matrix and verifies against the declared JWKS.
+
+Why it matters:
+- Verifiers use the matrix to replace N x M single queries. A cell that disagrees with the single
+  query silently changes a trust decision.
+
+Evidence:
+- Conformance report sections: per-cell comparison with single recognition queries, and matrix
+  signature verification.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+import requests
+
+from tspp_trqp_harness.reporting import requirements
+from tspp_trqp_harness.signatures import verify_signed_envelope
+from tspp_trqp_harness.validate import validate_json
+
+HERE = Path(__file__).resolve().parent
+_GRAPH_FIXTURES = HERE.parent / "fixtures" / "recognition_graph_fixtures.json"
+
+
+def _unwrap(body):
+    if isinstance(body, dict) and "payload" in body and "signature" in body:
+        return body["payload"]
+    return body
+
+
+def _authorities(queries):
+    """Authority ids from the query fixtures and the recognition graph fixtures, if present."""
+    q = queries["recognition_valid"]
+    ids = [q["authority_id"], q["subject_authority_id"]]
+    path = Path(os.environ.get("TSPP_RECOGNITION_FIXTURES") or _GRAPH_FIXTURES)
+    if path.exists():
+        for e in json.loads(path.read_text(encoding="utf-8")).get("edges", []):
+            ids += [e["authority"], e["subject_authority"]]
+    return list(dict.fromkeys(ids))
+
+
+def _matrix_or_skip(resp):
+    if resp.status_code in (404, 405):
+        pytest.skip("recognition matrix endpoint not implemented")
+    assert resp.status_code == 200, f"expected 200, got {resp.status_code}: {resp.text}"
+    return resp.json()
+
+
+def _single(c, query):
+    r = c.post_recognition(query)
+    if r.status_code == 404:
+        return False
+    assert r.status_code == 200, f"single recognition query failed with {r.status_code}: {r.text}"
+    return str(_unwrap(r.json()).get("recognized")).lower() == "true"
+
+
+@requirements("TSPP-BATCH-04")
+@pytest.mark.parametrize("scope", [{}, {"action": "https://example.org/vocab/action/issue-vc/v1"}])
+def test_recognition_matrix_matches_single_queries(_client, _load_queries, scope):
+    c = _client
+    ids = _authorities(_load_queries)
+    authorities, subjects = ids, list(reversed(ids))
+    payload = _unwrap(_matrix_or_skip(c.post_recognition_matrix(authorities, subjects, **scope)))
+
+    assert payload.get("authority_ids") == authorities and payload.get("subject_authority_ids") == subjects
+    rows = payload.get("recognized")
+    assert isinstance(rows, list) and len(rows) == len(authorities), "matrix must have one row per authority"
+    assert isinstance(payload.get("meta"), dict), "matrix must carry freshness meta"
+    for a, row in zip(authorities, rows):
+        assert len(row) == len(subjects), f"row for {a} must have one cell per subject authority"
+        for s, cell in zip(subjects, row):
+            single = _single(c, dict(scope, authority_id=a, subject_authority_id=s))
+            assert cell == single, f"matrix says recognized={cell} for ({a}, {s}), single query says {single}"
+
+
+@requirements("TSPP-BATCH-04", "TSPP-AL2-02")
+def test_signed_recognition_matrix_verifies(_client, _load_queries, _load_schema):
+    expected = os.environ.get("TSPP_EXPECT_AL")
+    if expected not in ("AL2", "AL3", "AL4"):
+        pytest.skip("Signed matrices are only expected from AL2+")
+
+    c = _client
+    ids = _authorities(_load_queries)
+    body = _matrix_or_skip(c.post_recognition_matrix(ids, ids, accept_signature="jws"))
+    assert "signature" in body, "signed matrix must be a single signed envelope"
+    validate_json(body, _load_schema("tspp-trqp-signed-response.schema.json"))
+
+    m = c.get_metadata()
+    if m.status_code != 200:
+        pytest.skip("metadata not available for jwks discovery")
+    jwks_uri = m.json().get("signing", {}).get("jwks_uri")
+    if not jwks_uri:
+        pytest.skip("jwks_uri not declared")
+    verify_signed_envelope(body, requests.get(jwks_uri, timeout=10).json())
@@ -0,0 +1,79 @@
+"""TSPP harness test for point-in-time (as-of) queries.
+
+What this test is proving:
+- A deployment that allowlists `context.time_requested` answers `/authorization` and
+  `/recognition` as of that time: with the system-of-record version in force then, not the
+  current one.
+- A query without `time_requested` is still answered as of now.
+
+How it runs:
+- The registry must answer from the fixture history, and `TSPP_HISTORY_FIXTURES` names that
+  file. Without it, the tests skip. The reference SUT loads the bundled history when it is
+  listed in both `TSPP_REF_DECISION_STORE` and `TSPP_REF_RECOGNITION_GRAPH`.
+
+Why it matters:
+- Audit replays ask what the answer was when a credential was presented. A registry that
+  accepts `time_requested` but evaluates "now" gives a confident, wrong historical answer.
+
+Evidence:
+- Conformance report sections: per-case outcome against the fixture history (grants,
+  suspensions, reinstatements, lapsed namespace grants and recognition intervals).
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from tspp_trqp_harness.reporting import requirements
+
+
+def _unwrap(body):
+    if isinstance(body, dict) and "payload" in body and "signature" in body:
+        return body["payload"]
+    return body
+
+
+def _cases_or_skip(c, kind):
+    # Expected outcomes hold only for a registry loaded with the fixture history, so the operator
+    # declares it by naming the file (the bundled one is `harness/fixtures/history_fixtures.json`).
+    declared = os.environ.get("TSPP_HISTORY_FIXTURES")
+    if not declared:
+        pytest.skip("TSPP_HISTORY_FIXTURES not set (the registry is not declared to hold a fixture history)")
+    path = Path(declared)
+    if not path.exists():
+        pytest.skip(f"History fixture file not found: {path}")
+    r = c.get_metadata()
+    assert r.status_code == 200, r.text
+    if "time_requested" not in (r.json().get("context_allowlist") or []):
+        pytest.skip("metadata does not allowlist context.time_requested")
+    cases = [case for case in json.loads(path.read_text(encoding="utf-8")).get("cases", []) if case.get("kind") == kind]
+    assert cases, f"fixture file has no '{kind}' cases"
+    return cases
+
+
+@requirements("TSPP-HIST-01")
+def test_authorization_as_of_time_requested(_client):
+    c = _client
+    for case in _cases_or_skip(c, "authorization"):
+        r = c.post_authorization(case["query"])
+        assert r.status_code == 200, f"[{case['id']}] expected 200, got {r.status_code}: {r.text}"
+        got = str(_unwrap(r.json()).get("decision", {}).get("authorized")).lower()
+        want = str(case["expected"]).lower()
+        assert got == want, f"[{case['id']}] expected authorized={want} as of the fixture history; got {got}"
+
+
+@requirements("TSPP-HIST-02")
+def test_recognition_as_of_time_requested(_client):
+    c = _client
+    for case in _cases_or_skip(c, "recognition"):
+        r = c.post_recognition(case["query"])
+        if r.status_code == 404:
+            got = False
+        else:
+            assert r.status_code == 200, f"[{case['id']}] expected 200 or 404, got {r.status_code}: {r.text}"
+            got = str(_unwrap(r.json()).get("recognized")).lower() == "true"
+        assert got == case["expected"], (
+            f"[{case['id']}] expected recognized={case['expected']} as of the fixture history; got {got}"
+        )
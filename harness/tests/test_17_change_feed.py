@@ -0,0 +1,131 @@
+"""TSPP harness test for the registry change feed.
+
+What this test is proving:
+- `GET /changes` pages the registry's deltas in gapless sequence order, and a client that
+  replays them reaches the hash chain of the signed checkpoint, whose signature verifies
+  against the declared JWKS.
+- A mirror built from the feed answers the fixture queries exactly as the registry does.
+- A cursor the registry never issued is refused: 400 if malformed, 410 if past the head.
+
+Why it matters:
+- Relying parties that answer locally act on the mirror, not on the registry. A feed that
+  drops, reorders or alters a delta silently changes their trust decisions, and only the
+  signed checkpoint lets them notice.
+
+Evidence:
+- Conformance report sections: feed replay against the signed checkpoint, and per-query
+  comparison of mirror answers with registry answers.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+import requests
+
+from tspp_trqp_harness.mirror import RegistryMirror
+from tspp_trqp_harness.reporting import requirements
+
+HERE = Path(__file__).resolve().parent
+_FIXTURES = HERE.parent / "fixtures"
+
+
+def _unwrap(body):
+    if isinstance(body, dict) and "payload" in body and "signature" in body:
+        return body["payload"]
+    return body
+
+
+def _feed_or_skip(c):
+    r = c.get_changes(limit=1)
+    if r.status_code in (404, 405):
+        pytest.skip("change feed not implemented")
+    assert r.status_code == 200, f"expected 200, got {r.status_code}: {r.text}"
+    return r.json()
+
+
+def _jwks(c):
+    m = c.get_metadata()
+    jwks_uri = m.json().get("signing", {}).get("jwks_uri") if m.status_code == 200 else None
+    if not jwks_uri:
+        pytest.skip("jwks_uri not declared")
+    return requests.get(jwks_uri, timeout=10).json()
+
+
+def _queries(kind, queries):
+    """Fixture queries of one kind: the query set, plus the bridge, history or recognition graph cases."""
+    if kind == "authorization":
+        out = [queries["authorization_valid"], queries["authorization_unknown_entity"]]
+        paths = [
+            Path(os.environ.get("TSPP_BRIDGE_FIXTURES") or _FIXTURES / "bridge_golden_fixtures.json"),
+            Path(os.environ.get("TSPP_HISTORY_FIXTURES") or _FIXTURES / "history_fixtures.json"),
+        ]
+    else:
+        out = [queries["recognition_valid"]]
+        paths = [
+            Path(os.environ.get("TSPP_HISTORY_FIXTURES") or _FIXTURES / "history_fixtures.json"),
+            Path(os.environ.get("TSPP_RECOGNITION_FIXTURES") or _FIXTURES / "recognition_graph_fixtures.json"),
+        ]
+    for path in paths:
+        if path.exists():
+            for case in json.loads(path.read_text(encoding="utf-8")).get("cases", []):
+                # Bridge cases carry no kind; every other fixture case that is not authorization is recognition.
+                if (case.get("kind", "authorization") == "authorization") == (kind == "authorization"):
+                    out.append(case["query"])
+    return out
+
+
+@requirements("TSPP-FEED-01")
+def test_change_feed_replays_to_signed_checkpoint(_client):
+    c = _client
+    first = _feed_or_skip(c)
+    head = first["checkpoint"]["seq"]
+    if head == 0:
+        pytest.skip("change feed is empty")
+
+    # Small pages so the replay crosses page boundaries.
+    mirror = RegistryMirror(c, jwks=_jwks(c), page_limit=max(1, head // 3))
+    assert mirror.sync() == head
+    assert mirror.sync() == 0, "a caught-up mirror must receive no further entries"
+
+    r = c.get_changes(cursor=str(head + 1))
+    assert r.status_code == 410, f"cursor past the head must be refused with 410, got {r.status_code}"
+    r = c.get_changes(cursor="not-a-cursor")
+    assert r.status_code == 400, f"malformed cursor must be refused with 400, got {r.status_code}"
+
+
+@requirements("TSPP-FEED-02")
+@pytest.mark.parametrize("kind", ["authorization", "recognition"])
+def test_mirror_answers_match_registry(_client, _load_queries, kind):
+    c = _client
+    _feed_or_skip(c)
+    mirror = RegistryMirror(c)
+    mirror.sync()
+    if not mirror.covers(kind):
+        pytest.skip(f"the change feed does not cover {kind} queries")
+
+    for query in _queries(kind, _load_queries):
+        at = (query.get("context") or {}).get("time_requested")
+        if kind == "authorization":
+            terms = [query.get(k, "") for k in ("authority_id", "entity_id", "action", "resource")]
+            local = mirror.authorized(*terms, at=at)
+            r = c.post_authorization(query)
+            if r.status_code == 404:
+                assert local is None, f"registry does not know the entity in {query}, mirror says authorized={local}"
+                continue
+            assert r.status_code == 200, f"authorization query failed with {r.status_code}: {r.text}"
+            remote = str(_unwrap(r.json())["decision"]["authorized"]).lower()
+            assert local is not None and str(local).lower() == remote, (
+                f"mirror says authorized={local} for {query}, registry says {remote}"
+            )
+        else:
+            subject = query.get("subject_authority_id") or query.get("entity_id", "")
+            local = mirror.recognized(query["authority_id"], subject, query.get("action", ""), query.get("resource", ""), at=at)
+            r = c.post_recognition(query)
+            if r.status_code == 404:
+                remote = False
+            else:
+                assert r.status_code == 200, f"recognition query failed with {r.status_code}: {r.text}"
+                remote = str(_unwrap(r.json()).get("recognized")).lower() == "true"
+            assert local == remote, f"mirror says recognized={local} for {query}, registry says {remote}"
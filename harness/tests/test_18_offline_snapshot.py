@@ -0,0 +1,97 @@
+"""TSPP harness test for the signed offline authorization snapshot.
+
+What this test is proving:
+- A deployment that declares `snapshot` in its metadata serves it as a JWS that verifies
+  against the declared JWKS, is fresh, lives no longer than the declared `max_age_seconds`,
+  and honours `If-None-Match`.
+- The snapshot has no false negatives: every fixture query the registry authorizes passes
+  the snapshot's filter, and a checker that answers negatives offline and confirms positives
+  online agrees with the registry on every query.
+
+Why it matters:
+- Offline verifiers deny whatever the snapshot rules out, without asking the registry. A
+  false negative silently rejects a legitimately authorized entity.
+
+Evidence:
+- Conformance report sections: snapshot signature and freshness checks, and per-query
+  comparison of snapshot-backed decisions with registry decisions.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+from tspp_trqp_harness.reporting import requirements
+from tspp_trqp_harness.snapshot import AuthorizationSnapshot, SnapshotChecker
+
+HERE = Path(__file__).resolve().parent
+_FIXTURES = HERE.parent / "fixtures"
+
+
+def _unwrap(body):
+    if isinstance(body, dict) and "payload" in body and "signature" in body:
+        return body["payload"]
+    return body
+
+
+def _declared_or_skip(c):
+    m = c.get_metadata()
+    assert m.status_code == 200, m.text
+    declared = m.json().get("snapshot")
+    if not declared:
+        pytest.skip("metadata does not declare an authorization snapshot")
+    jwks_uri = m.json().get("signing", {}).get("jwks_uri")
+    if not jwks_uri:
+        pytest.skip("jwks_uri not declared")
+    return declared, requests.get(jwks_uri, timeout=10).json()
+
+
+def _authorization_queries(queries):
+    out = [queries["authorization_valid"], queries["authorization_unknown_entity"]]
+    bridge = Path(os.environ.get("TSPP_BRIDGE_FIXTURES") or _FIXTURES / "bridge_golden_fixtures.json")
+    if bridge.exists():
+        out += [case["query"] for case in json.loads(bridge.read_text(encoding="utf-8")).get("cases", [])]
+    return out
+
+
+@requirements("TSPP-SNAP-01")
+def test_snapshot_is_signed_and_fresh(_client):
+    c = _client
+    declared, jwks = _declared_or_skip(c)
+    r = c.get_snapshot(declared["uri"])
+    assert r.status_code == 200, f"expected 200, got {r.status_code}: {r.text}"
+    snapshot = AuthorizationSnapshot.from_jws(r.text.strip(), jwks)
+
+    assert snapshot.doc["format"] == declared["format"], "snapshot format differs from the declared one"
+    assert snapshot.fresh(time.time()), "snapshot is not valid now"
+    assert snapshot.expires_at - snapshot.issued_at <= declared["max_age_seconds"], (
+        "snapshot lives longer than the declared max_age_seconds"
+    )
+    etag = r.headers.get("ETag")
+    if etag:
+        assert c.get_snapshot(declared["uri"], if_none_match=etag).status_code == 304
+
+
+@requirements("TSPP-SNAP-02")
+def test_snapshot_has_no_false_negatives(_client, _load_queries):
+    c = _client
+    _, jwks = _declared_or_skip(c)
+    checker = SnapshotChecker(c, AuthorizationSnapshot.fetch(c, jwks))
+
+    for query in _authorization_queries(_load_queries):
+        r = c.post_authorization(query)
+        if r.status_code == 404:
+            remote = False
+        else:
+            assert r.status_code == 200, f"authorization query failed with {r.status_code}: {r.text}"
+            remote = str(_unwrap(r.json())["decision"]["authorized"]).lower() == "true"
+        ctx = query.get("context") or {}
+        at = AuthorizationSnapshot.parse_time(ctx["time_requested"]) if "time_requested" in ctx else None
+        if remote and checker.snapshot.fresh(at):
+            terms = [query.get(k, "") for k in ("authority_id", "entity_id", "action", "resource")]
+            assert checker.snapshot.may_authorize(*terms), f"snapshot rules out {query}, which the registry authorizes"
+        assert checker.authorized(query) == remote, f"snapshot-backed decision for {query} differs from the registry"
@@ -0,0 +1,228 @@
+"""TSPP harness scenario for a degraded system of record behind the registry.
+
+What this test is proving:
+- With its system of record slow past the client's budget (`X-Request-Timeout-Ms`), the
+  registry answers within that budget, and with the uniform error surface.
+- Identical concurrent queries with different budgets are each held to their own: one
+  whose budget runs out gets the budget error, the others still get the answer. Clients
+  whose budgets run out do not make the registry shed everyone else's queries.
+- With its system of record failing, the registry fails fast with the uniform error
+  surface, stops calling the failing upstream (circuit breaking), and recovers once the
+  upstream does.
+- With its system of record slow on a few percent of calls, a registry that hedges has a
+  lower p99 than the same registry without hedging. The profiles of both are recorded.
+- The queries of one batch request reach the system of record together, in one batched
+  call, rather than one call per item.
+
+How it runs:
+- The registry's upstream is the fault-injecting stand-in
+  (`python -m examples.reference_sut.upstream_stub`), whose base URL is given in
+  `TSPP_UPSTREAM_FAULTS_URL`. The hedging comparison also needs a second deployment of
+  the same registry with hedging disabled, on the same upstream, in
+  `TSPP_TAIL_BASELINE_URL`. Without them, the tests skip.
+
+Why it matters:
+- A registry that waits on a degraded dependency holds its workers, and its callers'
+  budgets, until everything queues. Errors that differ by cause reveal internal topology.
+
+Evidence:
+- Conformance report sections: response time and error shape under injected faults; the
+  latency profiles (also written to `TSPP_LATENCY_REPORT_PATH` when set).
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+import requests
+
+from tspp_trqp_harness.client import TRQPClient
+from tspp_trqp_harness.latency import as_of_variants, measure
+from tspp_trqp_harness.reporting import requirements
+
+BUDGET_MS = 300
+SLOW_UPSTREAM_MS = 3000
+
+
+def _faults_url_or_skip():
+    url = os.environ.get("TSPP_UPSTREAM_FAULTS_URL")
+    if not url:
+        pytest.skip("TSPP_UPSTREAM_FAULTS_URL not set (no fault-injecting upstream)")
+    return url.rstrip("/")
+
+
+def _set_faults(url, **faults):
+    r = requests.put(f"{url}/faults", json=faults, timeout=10)
+    assert r.status_code == 200, f"could not set upstream faults: {r.status_code} {r.text}"
+
+
+def _clear_faults(url):
+    _set_faults(url, latency_ms=0, slow_rate=0, slow_ms=0, error_rate=0)
+
+
+def _upstream_calls(url):
+    return requests.get(f"{url}/stats", timeout=10).json()["calls"]
+
+
+def _upstream_batch_sizes_since(url, calls):
+    """Sizes of the upstream calls made after the first `calls` (the stub keeps the last 1000)."""
+    stats = requests.get(f"{url}/stats", timeout=10).json()
+    new = stats["calls"] - calls
+    return stats["batch_sizes"][-new:] if new else []
+
+
+def _shape(r):
+    body = r.json()
+    return tuple(sorted(body)) if isinstance(body, dict) else None
+
+
+@requirements("TSPP-AVAIL-02")
+def test_hedging_lowers_tail_latency(_client, _load_queries):
+    url = _faults_url_or_skip()
+    baseline_url = os.environ.get("TSPP_TAIL_BASELINE_URL")
+    if not baseline_url:
+        pytest.skip("TSPP_TAIL_BASELINE_URL not set (no deployment without hedging to compare)")
+    baseline = TRQPClient(base_url=baseline_url, token=_client.token, dpop=_client.dpop)
+    query = _load_queries["authorization_valid"]
+
+    _set_faults(url, latency_ms=2, slow_rate=0.03, slow_ms=250)
+    try:
+        # Distinct as-of times, so no answer comes from a deployment's cache.
+        variants = list(as_of_variants(query, 440))
+        profiles = {}
+        for name, client in (("hedged", _client), ("baseline", baseline)):
+            measure(client, variants[:40])  # warm-up: connections, and the latency history hedging needs
+            profiles[name] = measure(client, variants[40:])
+    finally:
+        _clear_faults(url)
+
+    report = {name: p.summary() for name, p in profiles.items()}
+    print(f"tail latency with a slow upstream: {json.dumps(report, sort_keys=True)}")
+    path = os.environ.get("TSPP_LATENCY_REPORT_PATH")
+    if path:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
+
+    for name, p in profiles.items():
+        assert set(p.statuses) == {200}, f"{name} deployment answered {dict(p.statuses)} with a slow upstream"
+    assert profiles["hedged"].percentile(0.99) < profiles["baseline"].percentile(0.99), (
+        f"hedging did not lower p99: {report}"
+    )
+
+
+@requirements("TSPP-AVAIL-01", "TSPP-ERR-01")
+def test_degraded_upstream_fails_fast_and_uniformly(_client, _load_queries):
+    c = _client
+    url = _faults_url_or_skip()
+    uniform = _shape(c.post_authorization(_load_queries["authorization_unknown_entity"]))
+    # A day back, clear of the as-of times the hedging scenario left in the decision cache.
+    variants = as_of_variants(_load_queries["authorization_valid"], 100, datetime.now(timezone.utc) - timedelta(days=1))
+
+    try:
+        # Slower than the client's budget: answered within the budget, not the upstream's time.
+        _set_faults(url, latency_ms=SLOW_UPSTREAM_MS)
+        started = time.perf_counter()
+        r = c.post_authorization(next(variants), timeout_ms=BUDGET_MS)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        assert r.status_code == 503, f"expected 503 past the budget, got {r.status_code}: {r.text}"
+        assert elapsed_ms < SLOW_UPSTREAM_MS / 2, f"answered after {elapsed_ms:.0f} ms on a {BUDGET_MS} ms budget"
+        assert _shape(r) == uniform, f"budget error shape {_shape(r)} differs from not_found {uniform}"
+        assert r.headers.get("Retry-After"), "503 must carry Retry-After"
+
+        # Failing: every query gets the same 503, and the registry stops calling upstream.
+        _set_faults(url, latency_ms=0, error_rate=1)
+        time.sleep(0.5)  # let the slow call above drain
+        before = _upstream_calls(url)
+        sent = 20
+        for _ in range(sent):
+            r = c.post_authorization(next(variants))
+            assert r.status_code == 503, f"expected 503 with a failing upstream, got {r.status_code}: {r.text}"
+            assert _shape(r) == uniform, f"upstream error shape {_shape(r)} differs from not_found {uniform}"
+        calls = _upstream_calls(url) - before
+        assert calls < sent, f"{sent} queries made {calls} upstream calls: nothing was shed while it kept failing"
+        retry_after = int(r.headers.get("Retry-After", "1"))
+    finally:
+        _clear_faults(url)
+
+    # Recovered upstream: served again once the breaker lets a trial call through.
+    deadline = time.monotonic() + min(retry_after, 30) + 5
+    while True:
+        r = c.post_authorization(next(variants))
+        if r.status_code == 200 or time.monotonic() > deadline:
+            break
+        time.sleep(0.25)
+    assert r.status_code == 200, f"registry did not recover after the upstream did: {r.status_code} {r.text}"
+
+
+@requirements("TSPP-AVAIL-01")
+def test_identical_queries_keep_their_own_budgets(_client, _load_queries):
+    c = _client
+    url = _faults_url_or_skip()
+    # Three days back, clear of the as-of times the other scenarios left in the decision cache.
+    query = next(as_of_variants(_load_queries["authorization_valid"], 1, datetime.now(timezone.utc) - timedelta(days=3)))
+
+    _set_faults(url, latency_ms=SLOW_UPSTREAM_MS // 4)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            hurried = pool.submit(c.post_authorization, query, timeout_ms=BUDGET_MS // 2)
+            time.sleep(0.1)  # the hurried query is evaluating when the patient one arrives
+            patient = pool.submit(c.post_authorization, query, timeout_ms=SLOW_UPSTREAM_MS * 2)
+            hurried, patient = hurried.result(), patient.result()
+    finally:
+        _clear_faults(url)
+
+    assert hurried.status_code == 503, f"expected 503 past the short budget, got {hurried.status_code}: {hurried.text}"
+    assert patient.status_code == 200, (
+        f"a query with budget to spare failed alongside an identical one that ran out: {patient.status_code} {patient.text}"
+    )
+
+
+@requirements("TSPP-AVAIL-01")
+def test_short_budgets_do_not_trip_the_breaker(_client, _load_queries):
+    c = _client
+    url = _faults_url_or_skip()
+    # Four days back, clear of the as-of times the other scenarios left in the decision cache.
+    variants = as_of_variants(_load_queries["authorization_valid"], 100, datetime.now(timezone.utc) - timedelta(days=4))
+
+    _set_faults(url, latency_ms=5)
+    try:
+        # More budget-exhausted batches than any sensible breaker threshold.
+        for _ in range(10):
+            r = c.post_authorization_batch([next(variants) for _ in range(3)], timeout_ms=6)
+            assert r.status_code == 200, f"batch failed: {r.status_code} {r.text}"
+        r = c.post_authorization(next(variants))
+    finally:
+        _clear_faults(url)
+
+    assert r.status_code == 200, (
+        f"a query without a budget failed after other clients' budgets ran out: {r.status_code} {r.text}"
+    )
+
+
+@requirements("TSPP-BATCH-01")
+def test_batch_request_reaches_upstream_batched(_client, _load_queries):
+    c = _client
+    url = _faults_url_or_skip()
+    items = 50
+    # Two days back, clear of the as-of times the other scenarios left in the decision cache.
+    start = datetime.now(timezone.utc) - timedelta(days=2)
+    queries = list(as_of_variants(_load_queries["authorization_valid"], items, start))
+
+    _set_faults(url, latency_ms=5)
+    try:
+        before = _upstream_calls(url)
+        r = c.post_authorization_batch(queries)
+        sizes = _upstream_batch_sizes_since(url, before)
+    finally:
+        _clear_faults(url)
+
+    assert r.status_code == 200, f"batch failed: {r.status_code} {r.text}"
+    statuses = [item.get("status") for item in r.json()["results"]]
+    assert statuses == [200] * items, f"batch items answered {statuses}"
+    # One call, or two when the registry hedged it.
+    assert 1 <= len(sizes) <= 2, f"a batch of {items} queries made {len(sizes)} upstream calls: {sizes}"
+    assert sum(sizes) / len(sizes) > 1, f"upstream calls were not batched: sizes {sizes}"
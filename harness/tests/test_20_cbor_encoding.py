@@ -0,0 +1,97 @@
+"""TSPP harness test for CBOR responses (optional).
+
+What this test is proving:
+- A registry that declares `application/cbor` in `response_media_types` serves the
+  metadata document, `/authorization` and `/recognition` in CBOR when the client prefers
+  it, and the CBOR form says the same thing as the JSON form.
+- Where the JSON response is a signed envelope, the CBOR one is too, signed with a
+  COSE_Sign1 that verifies with the declared JWKS, over the same query.
+
+Why it matters:
+- Constrained verifiers rely on the CBOR form in place of the JSON one; an answer that
+  differs by encoding, or a signature they cannot check, is worse than no CBOR at all.
+
+Evidence:
+- Conformance report sections: content negotiation, CBOR/JSON equivalence, COSE_Sign1
+  verification.
+"""
+
+import pytest
+import requests
+
+from tspp_trqp_harness.client import decode_body
+from tspp_trqp_harness.reporting import requirements
+from tspp_trqp_harness.signatures import verify_signed_envelope
+
+pytest.importorskip("cbor2")
+
+from tspp_trqp_harness.cose import MEDIA_TYPE, verify_cbor_envelope  # noqa: E402
+
+
+def _metadata_or_skip(c):
+    m = c.get_metadata()
+    if m.status_code != 200:
+        pytest.skip("metadata not available for media type discovery")
+    md = m.json()
+    if MEDIA_TYPE not in (md.get("response_media_types") or []):
+        pytest.skip("application/cbor not declared in response_media_types")
+    return m, md
+
+
+def _media_type(r):
+    return r.headers.get("Content-Type", "").split(";")[0].strip()
+
+
+def _equivalent(json_payload, cbor_payload, what):
+    # Evaluation timestamps in `meta` may differ between the two calls; the answer may not.
+    strip = lambda p: {k: v for k, v in p.items() if k != "meta"}
+    assert strip(cbor_payload) == strip(json_payload), f"{what}: CBOR payload differs from JSON"
+    assert set(cbor_payload.get("meta", {})) == set(json_payload.get("meta", {})), f"{what}: CBOR payload meta has other members"
+
+
+@requirements("TSPP-ENC-01")
+def test_cbor_metadata_matches_json(_client):
+    c = _client
+    m, md = _metadata_or_skip(c)
+
+    r = c.get_metadata(accept=MEDIA_TYPE)
+    assert r.status_code == 200, f"expected 200, got {r.status_code}: {r.text}"
+    assert _media_type(r) == MEDIA_TYPE, f"expected {MEDIA_TYPE}, got {r.headers.get('Content-Type')!r}"
+    assert decode_body(r) == md, "CBOR metadata differs from JSON metadata"
+    for resp in (m, r):
+        assert "accept" in resp.headers.get("Vary", "").lower(), "negotiated metadata must carry Vary: Accept"
+    if m.headers.get("ETag") and r.headers.get("ETag"):
+        assert m.headers["ETag"] != r.headers["ETag"], "the two representations must not share an ETag"
+
+
+@requirements("TSPP-ENC-01")
+@pytest.mark.parametrize("endpoint,query", [("authorization", "authorization_valid"), ("recognition", "recognition_valid")])
+def test_cbor_response_is_equivalent_to_json(_client, _load_queries, endpoint, query):
+    c = _client
+    _, md = _metadata_or_skip(c)
+    post = getattr(c, f"post_{endpoint}")
+    q = _load_queries[query]
+
+    as_json = post(q, accept_signature="jws")
+    as_cbor = post(q, accept_signature="jws", accept=MEDIA_TYPE)
+    assert as_json.status_code == 200, f"expected 200, got {as_json.status_code}: {as_json.text}"
+    assert as_cbor.status_code == 200, f"expected 200, got {as_cbor.status_code}: {as_cbor.text}"
+    assert _media_type(as_cbor) == MEDIA_TYPE, f"expected {MEDIA_TYPE}, got {as_cbor.headers.get('Content-Type')!r}"
+
+    json_body, cbor_body = as_json.json(), decode_body(as_cbor)
+    if "signature" not in json_body:
+        assert "signature" not in cbor_body, "CBOR response is signed where the JSON one is not"
+        _equivalent(json_body, cbor_body, endpoint)
+        return
+
+    assert isinstance(cbor_body, dict) and "cose_sign1" in cbor_body.get("signature", {}), (
+        "JSON response is a signed envelope; the CBOR one must carry signature.cose_sign1"
+    )
+    jwks = requests.get(md["signing"]["jwks_uri"], timeout=10).json()
+    verify_signed_envelope(json_body, jwks)
+    verified = verify_cbor_envelope(cbor_body, jwks)
+    assert verified["alg"] in (md["signing"].get("algorithms") or [verified["alg"]])
+    _equivalent(json_body["payload"], verified["payload"], endpoint)
+    for k in ("query_hash", "hash_alg", "canonicalization"):
+        assert cbor_body["signature"].get(k) == json_body["signature"].get(k), f"signature.{k} differs between JSON and CBOR"
+    assert cbor_body["meta"]["query_hash"] == json_body["meta"]["query_hash"], "CBOR envelope answers a different query"
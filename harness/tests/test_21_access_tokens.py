@@ -0,0 +1,122 @@
+"""TSPP harness test for JWT access-token verification.
+
+What this test is proving:
+- The registry accepts access tokens from its issuer only when they are well signed, for
+  its audience, unexpired, within the advertised `max_token_ttl_seconds`, and carry the
+  scope of the endpoint queried. Every rejected token gets the same error.
+- The registry follows its issuer's key rollover without a restart: a token signed by a
+  newly published key is accepted, and one signed by a key removed from the JWKS is no
+  longer accepted, even after the registry has accepted it before.
+
+How it runs:
+- The registry verifies tokens against the JWKS of the stand-in issuer
+  (`python -m examples.reference_sut.token_issuer`), whose base URL is given in
+  `TSPP_TOKEN_ISSUER_URL`. Without it, the tests skip.
+
+Why it matters:
+- Scopes, audience and token lifetime declared in metadata protect nothing unless they are
+  enforced. A registry that keeps honouring a retired key cannot recover from its compromise.
+
+Evidence:
+- Conformance report sections: per-claim token rejection, error shape, key rollover.
+"""
+
+import os
+import time
+
+import pytest
+import requests
+
+from tspp_trqp_harness.client import TRQPClient
+from tspp_trqp_harness.reporting import requirements
+
+AUTHORIZATION_SCOPE = "trqp.authorization.query"
+RECOGNITION_SCOPE = "trqp.recognition.query"
+
+
+def _issuer_url_or_skip():
+    url = os.environ.get("TSPP_TOKEN_ISSUER_URL")
+    if not url:
+        pytest.skip("TSPP_TOKEN_ISSUER_URL not set (no stand-in token issuer)")
+    return url.rstrip("/")
+
+
+def _mint(url, **overrides):
+    r = requests.post(f"{url}/token", json=overrides, timeout=10)
+    assert r.status_code == 200, f"issuer could not mint a token: {r.status_code} {r.text}"
+    return r.json()["access_token"]
+
+
+def _as(c, token):
+    return TRQPClient(base_url=c.base_url, token=token, dpop=c.dpop)
+
+
+def _shape(r):
+    body = r.json()
+    return tuple(sorted(body)) if isinstance(body, dict) else None
+
+
+@requirements("TSPP-AUTH-01", "TSPP-ERR-01")
+def test_access_token_claims_are_enforced(_client, _load_queries):
+    url = _issuer_url_or_skip()
+    c = _client
+    md = c.get_metadata().json()
+    auth = md.get("auth", {})
+    max_ttl = int(auth.get("max_token_ttl_seconds", 900))
+    q = _load_queries["authorization_valid"]
+
+    ok = _as(c, _mint(url)).post_authorization(q)
+    assert ok.status_code == 200, f"a valid token was refused: {ok.status_code} {ok.text}"
+
+    rejected = {
+        "expired": _mint(url, ttl_seconds=60, issued_at_offset=-3600),
+        "wrong audience": _mint(url, audience="urn:example:another-registry"),
+        "wrong issuer": _mint(url, issuer="https://issuer.invalid"),
+        "lifetime above max_token_ttl_seconds": _mint(url, ttl_seconds=max_ttl + 600),
+        "key not in the issuer's JWKS": _mint(url, unpublished=True),
+    }
+    shapes = set()
+    for name, token in rejected.items():
+        r = _as(c, token).post_authorization(q)
+        assert r.status_code in (401, 403), f"{name}: expected 401/403, got {r.status_code}: {r.text}"
+        shapes.add(_shape(r))
+    assert len(shapes) == 1, f"rejected tokens get different error shapes: {shapes}"
+
+    recognition_only = _as(c, _mint(url, scope=RECOGNITION_SCOPE))
+    r = recognition_only.post_authorization(q)
+    assert r.status_code == 403, f"a token without {AUTHORIZATION_SCOPE} was not refused: {r.status_code} {r.text}"
+    r = recognition_only.post_recognition(_load_queries["recognition_valid"])
+    assert r.status_code == 200, f"a token with {RECOGNITION_SCOPE} was refused on /recognition: {r.status_code} {r.text}"
+
+
+def _until_status(client, query, accepted, deadline_s=15.0):
+    """Retry while the registry may still be refreshing its copy of the issuer JWKS."""
+    deadline = time.monotonic() + deadline_s
+    while True:
+        r = client.post_authorization(query)
+        if (r.status_code == 200) == accepted or time.monotonic() > deadline:
+            return r
+        time.sleep(0.5)
+
+
+@requirements("TSPP-AUTH-02")
+def test_issuer_key_rollover_is_followed(_client, _load_queries):
+    url = _issuer_url_or_skip()
+    c = _client
+    q = _load_queries["authorization_valid"]
+
+    added = requests.post(f"{url}/keys", json={}, timeout=10).json()["kid"]
+    rolled = _as(c, _mint(url, kid=added))
+    r = _until_status(rolled, q, accepted=True)
+    assert r.status_code == 200, f"a token signed by a newly published key was refused: {r.status_code} {r.text}"
+
+    assert requests.delete(f"{url}/keys/{added}", timeout=10).status_code == 200
+    # A token signed by another new key makes the registry fetch the JWKS again.
+    probe = requests.post(f"{url}/keys", json={}, timeout=10).json()["kid"]
+    try:
+        r = _until_status(_as(c, _mint(url, kid=probe)), q, accepted=True)
+        assert r.status_code == 200, f"a token signed by a newly published key was refused: {r.status_code} {r.text}"
+        r = _until_status(rolled, q, accepted=False)
+        assert r.status_code in (401, 403), f"a token signed by a retired key is still accepted: {r.status_code}"
+    finally:
+        requests.delete(f"{url}/keys/{probe}", timeout=10)
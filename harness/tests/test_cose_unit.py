@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from jwcrypto import jwk
+from jwcrypto.jwa import JWA
+
+cbor2 = pytest.importorskip("cbor2")
+
+from tspp_trqp_harness.cose import verify_cbor_envelope, verify_sign1  # noqa: E402
+
+KEYS = {
+    "EdDSA": (-8, dict(kty="OKP", crv="Ed25519")),
+    "ES256": (-7, dict(kty="EC", crv="P-256")),
+    "RS256": (-257, dict(kty="RSA", size=2048)),
+}
+
+
+def _sign1(alg, key, payload, kid):
+    """A detached COSE_Sign1 per RFC 9052, written independently of the SUT."""
+    protected = cbor2.dumps({1: KEYS[alg][0], 4: kid.encode("utf-8")})
+    to_be_signed = cbor2.dumps(["Signature1", protected, b"", payload])
+    signature = JWA.signing_alg(alg).sign(key, to_be_signed)
+    return cbor2.CBORTag(18, [protected, {}, None, signature])
+
+
+def _keypair(alg, kid):
+    key = jwk.JWK.generate(kid=kid, **KEYS[alg][1])
+    return key, {"keys": [json.loads(key.export_public())]}
+
+
+def _envelope(alg, key, kid, payload_obj):
+    payload = cbor2.dumps(payload_obj, canonical=True)
+    return {
+        "meta": {"query_hash": "00" * 32},
+        "payload": payload,
+        "signature": {"alg": alg, "kid": kid, "cose_sign1": _sign1(alg, key, payload, kid)},
+    }
+
+
+@pytest.mark.parametrize("alg", sorted(KEYS))
+def test_verify_cbor_envelope_accepts_each_algorithm(alg):
+    key, jwks = _keypair(alg, f"unit-{alg}")
+    payload = {"decision": {"authorized": True}, "meta": {"time_evaluated": "2026-03-06T12:00:00Z"}}
+    out = verify_cbor_envelope(_envelope(alg, key, f"unit-{alg}", payload), jwks)
+    assert out == {"variant": "cose_sign1", "alg": alg, "payload": payload}
+
+
+def test_verify_cbor_envelope_rejects_tampered_payload():
+    key, jwks = _keypair("EdDSA", "unit-1")
+    env = _envelope("EdDSA", key, "unit-1", {"decision": {"authorized": False}})
+    env["payload"] = cbor2.dumps({"decision": {"authorized": True}}, canonical=True)
+    with pytest.raises(AssertionError, match="could not verify"):
+        verify_cbor_envelope(env, jwks)
+
+
+def test_verify_sign1_rejects_a_key_other_than_the_signer():
+    key, _ = _keypair("EdDSA", "unit-1")
+    _, other = _keypair("EdDSA", "unit-2")
+    payload = b"\xa0"
+    with pytest.raises(AssertionError, match="could not verify"):
+        verify_sign1(_sign1("EdDSA", key, payload, "unit-1"), other, payload)
+
+
+def test_verify_cbor_envelope_rejects_signature_block_that_disagrees_with_cose_header():
+    key, jwks = _keypair("EdDSA", "unit-1")
+    env = _envelope("EdDSA", key, "unit-1", {"recognized": True})
+    env["signature"]["kid"] = "unit-9"
+    with pytest.raises(AssertionError, match="differ from the COSE header"):
+        verify_cbor_envelope(env, jwks)
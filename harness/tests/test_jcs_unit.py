@@ -0,0 +1,86 @@
+import json
+import math
+import struct
+
+import pytest
+
+from tspp_trqp_harness.jcs import canonicalize, number
+
+# RFC 8785 appendix B: IEEE 754 bit patterns and their canonical serialization.
+NUMBER_VECTORS = [
+    ("0000000000000000", "0"),
+    ("8000000000000000", "0"),
+    ("0000000000000001", "5e-324"),
+    ("8000000000000001", "-5e-324"),
+    ("7fefffffffffffff", "1.7976931348623157e+308"),
+    ("ffefffffffffffff", "-1.7976931348623157e+308"),
+    ("4340000000000000", "9007199254740992"),
+    ("c340000000000000", "-9007199254740992"),
+    ("4430000000000000", "295147905179352830000"),
+    ("44b52d02c7e14af5", "9.999999999999997e+22"),
+    ("44b52d02c7e14af6", "1e+23"),
+    ("44b52d02c7e14af7", "1.0000000000000001e+23"),
+    ("444b1ae4d6e2ef4e", "999999999999999700000"),
+    ("444b1ae4d6e2ef4f", "999999999999999900000"),
+    ("444b1ae4d6e2ef50", "1e+21"),
+    ("3eb0c6f7a0b5ed8c", "9.999999999999997e-7"),
+    ("3eb0c6f7a0b5ed8d", "0.000001"),
+    ("41b3de4355555553", "333333333.3333332"),
+    ("41b3de4355555554", "333333333.33333325"),
+    ("41b3de4355555555", "333333333.3333333"),
+    ("41b3de4355555556", "333333333.3333334"),
+    ("41b3de4355555557", "333333333.33333343"),
+    ("becbf647612f3696", "-0.0000033333333333333333"),
+    ("43143ff3c1cb0959", "1424953923781206.2"),
+]
+
+
+@pytest.mark.parametrize("bits,expected", NUMBER_VECTORS)
+def test_numbers_serialize_as_ecmascript(bits, expected):
+    value = struct.unpack(">d", bytes.fromhex(bits))[0]
+    assert number(value) == expected
+    assert canonicalize(value) == expected.encode("ascii")
+
+
+def test_rfc8785_example_document():
+    src = (
+        '{"numbers":[333333333.33333329,1E30,4.50,2e-3,0.000000000000000000000000001],'
+        '"string":"\\u20ac$\\u000F\\u000aA\'\\u0042\\u0022\\u005c\\\\\\"\\/",'
+        '"literals":[null,true,false]}'
+    )
+    expected = (
+        '{"literals":[null,true,false],"numbers":[333333333.3333333,1e+30,4.5,0.002,1e-27],'
+        '"string":"€$\\u000f\\nA\'B\\"\\\\\\\\\\"/"}'
+    )
+    assert canonicalize(json.loads(src)) == expected.encode("utf-8")
+
+
+def test_members_sort_by_utf16_code_units():
+    names = ["\u20ac", "\r", "\ufb33", "1", "\U0001f600", "\u0080", "\u00f6"]
+    out = json.loads(canonicalize({n: i for i, n in enumerate(names)}))
+    # The emoji's surrogate pair (0xD83D...) sorts before U+FB33, unlike code point order.
+    assert list(out) == ["\r", "1", "\u0080", "\u00f6", "\u20ac", "\U0001f600", "\ufb33"]
+
+
+def test_fast_path_matches_general_serializer():
+    doc = {"b": [1, -2, 9007199254740992, None, True, "x\u2028\x7f\x1f"], "a": {"z": "\u00e9", "y": ()}}
+    assert canonicalize(doc) == b'{"a":{"y":[],"z":"\xc3\xa9"},"b":[1,-2,9007199254740992,null,true,"x\xe2\x80\xa8\x7f\\u001f"]}'
+    assert canonicalize(dict(doc, c=0.5)) == canonicalize(doc)[:-1] + b',"c":0.5}'
+
+
+def test_large_integers_serialize_as_doubles_or_are_rejected():
+    assert canonicalize(10**21) == b"1e+21"
+    assert canonicalize(2**60) == b"1152921504606847000"
+    with pytest.raises(ValueError):
+        canonicalize(2**53 + 1)
+
+
+@pytest.mark.parametrize("bad", [math.nan, math.inf, -math.inf, "\ud800", {"\udfff": 1}])
+def test_values_outside_json_are_rejected(bad):
+    with pytest.raises(ValueError):
+        canonicalize(bad)
+
+
+def test_non_string_member_names_are_rejected():
+    with pytest.raises(TypeError):
+        canonicalize({1: "one"})
@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+from tspp_trqp_harness.latency import LatencyProfile, as_of_variants
+
+
+def test_percentiles_use_nearest_rank():
+    p = LatencyProfile(samples_ms=[float(i) for i in range(100, 0, -1)])
+    assert p.percentile(0.50) == 50.0
+    assert p.percentile(0.95) == 95.0
+    assert p.percentile(0.99) == 99.0
+    assert p.percentile(1.0) == 100.0
+    assert p.percentile(0.0) == 1.0
+    assert LatencyProfile().percentile(0.99) == 0.0
+
+
+def test_summary_reports_tail_and_statuses():
+    p = LatencyProfile(samples_ms=[1.0] * 98 + [250.0, 300.0])
+    p.statuses[200] += 99
+    p.statuses[503] += 1
+    s = p.summary()
+    assert s["count"] == 100
+    assert s["p50_ms"] == 1.0 and s["p95_ms"] == 1.0
+    assert s["p99_ms"] == 250.0 and s["max_ms"] == 300.0
+    assert s["statuses"] == {"200": 99, "503": 1}
+
+
+def test_as_of_variants_are_distinct_and_leave_the_query_alone():
+    query = {"authority_id": "A", "entity_id": "E", "context": {"purpose": "audit"}}
+    start = datetime(2026, 1, 15, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    variants = list(as_of_variants(query, 3, start))
+    assert [v["context"]["time_requested"] for v in variants] == [
+        "2026-01-15T12:00:00Z",
+        "2026-01-15T11:59:59Z",
+        "2026-01-15T11:59:58Z",
+    ]
+    assert all(v["context"]["purpose"] == "audit" for v in variants)
+    assert query == {"authority_id": "A", "entity_id": "E", "context": {"purpose": "audit"}}
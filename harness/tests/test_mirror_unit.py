@@ -0,0 +1,77 @@
+import hashlib
+import json
+
+import pytest
+
+from tspp_trqp_harness.mirror import RegistryMirror
+from tspp_trqp_harness.signatures import canonical_json
+
+
+class _Response:
+    def __init__(self, body, status_code=200):
+        self.status_code = status_code
+        self._body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self._body
+
+
+class _Feed:
+    """A registry change feed served from a list of entries, written independently of the SUT."""
+
+    def __init__(self, entries):
+        self.entries = [dict(e, seq=i + 1) for i, e in enumerate(entries)]
+
+    def chain(self, n):
+        h = bytes(32)
+        for e in self.entries[:n]:
+            h = hashlib.sha256(h + canonical_json(e)).digest()
+        return h.hex()
+
+    def get_changes(self, cursor=None, limit=None):
+        after = int(cursor or 0)
+        if after > len(self.entries):
+            return _Response({"detail": "cursor_unknown"}, 410)
+        page = self.entries[after : after + (limit or 1000)]
+        head = len(self.entries)
+        return _Response({
+            "entries": page,
+            "next_cursor": str(after + len(page)),
+            "has_more": after + len(page) < head,
+            "checkpoint": {"seq": head, "chain_hash": self.chain(head), "hash_alg": "SHA-256", "types": ["authorization", "recognition"]},
+        })
+
+
+_GRANT = {"op": "added", "type": "authorization", "authority": "A", "entity": "E", "action": "x:act/1", "resource": "r/*", "authorized": True}
+_EDGE = {"op": "added", "type": "recognition", "authority": "A", "subject_authority": "B", "action": "*", "resource": "*", "recognized": True, "transitive": True}
+
+
+def test_mirror_replays_feed_and_answers_locally():
+    feed = _Feed([
+        _GRANT,
+        dict(_GRANT, op="revoked", authorized=False, valid_from="2022-01-01T00:00:00Z"),
+        _EDGE,
+        dict(_EDGE, authority="B", subject_authority="C", transitive=False),
+    ])
+    mirror = RegistryMirror(feed, page_limit=3, max_chain_depth=2)
+    assert mirror.sync() == 4 and mirror.seq == 4
+
+    assert mirror.authorized("A", "E", "x:act/1", "r/9", at="2021-01-01T00:00:00Z") is True
+    assert mirror.authorized("A", "E", "x:act/1", "r/9", at="2023-01-01T00:00:00Z") is False
+    assert mirror.authorized("A", "E", "x:act/2", "r/9") is False
+    assert mirror.authorized("A", "X", "x:act/1", "r/9") is None
+    assert mirror.recognized("A", "C") and not mirror.recognized("C", "A")
+
+    feed.entries.append(dict(_EDGE, op="revoked", seq=5, recognized=False, transitive=None))
+    assert mirror.sync() == 1
+    assert not mirror.recognized("A", "C")
+
+
+def test_mirror_rejects_tampered_entries():
+    feed = _Feed([_GRANT, _EDGE])
+    checkpointed = feed.chain(2)
+    feed.entries[0]["authorized"] = False  # altered after the checkpoint was issued
+    feed.chain = lambda n: checkpointed
+    with pytest.raises(AssertionError, match="chain hash"):
+        RegistryMirror(feed, max_chain_depth=1).sync()
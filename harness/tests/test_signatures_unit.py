@@ -0,0 +1,171 @@
+import base64
+import json
+
+from jwcrypto import jwk, jws
+
+from tspp_trqp_harness.signatures import (
+    canonical_json,
+    merkle_leaf_hash,
+    merkle_node_hash,
+    verify_merkle_inclusion,
+    verify_signed_envelope,
+)
+
+
+def _b64(b: bytes) -> str:
+    return base64.urlsafe_b64encode(b).rstrip(b"=").decode("ascii")
+
+
+def _tree(leaves):
+    """Reference RFC 9162 MTH and PATH, written independently of the SUT."""
+    def mth(d):
+        if len(d) == 1:
+            return d[0]
+        k = 1
+        while k * 2 < len(d):
+            k *= 2
+        return merkle_node_hash(mth(d[:k]), mth(d[k:]))
+
+    def path(m, d):
+        if len(d) == 1:
+            return []
+        k = 1
+        while k * 2 < len(d):
+            k *= 2
+        if m < k:
+            return path(m, d[:k]) + [mth(d[k:])]
+        return path(m - k, d[k:]) + [mth(d[:k])]
+
+    return mth(leaves), [path(i, leaves) for i in range(len(leaves))]
+
+
+def _jwks_and_signer():
+    key = jwk.JWK.generate(kty="OKP", crv="Ed25519", kid="unit-1")
+
+    def sign(data: bytes) -> str:
+        s = jws.JWS(payload=data)
+        s.add_signature(key, None, protected={"alg": "EdDSA", "kid": "unit-1"})
+        return s.serialize(compact=True)
+
+    return {"keys": [json.loads(key.export_public())]}, sign
+
+
+def test_merkle_inclusion_accepts_every_leaf_for_uneven_trees():
+    for n in range(1, 10):
+        leaves = [merkle_leaf_hash(f"leaf-{i}".encode()) for i in range(n)]
+        root, proofs = _tree(leaves)
+        for i in range(n):
+            assert verify_merkle_inclusion(leaves[i], i, n, proofs[i], root), (n, i)
+
+
+def test_merkle_inclusion_rejects_wrong_index_or_leaf():
+    leaves = [merkle_leaf_hash(f"leaf-{i}".encode()) for i in range(5)]
+    root, proofs = _tree(leaves)
+    assert not verify_merkle_inclusion(leaves[2], 3, 5, proofs[2], root)
+    assert not verify_merkle_inclusion(merkle_leaf_hash(b"other"), 2, 5, proofs[2], root)
+    assert not verify_merkle_inclusion(leaves[2], 2, 5, proofs[2][:-1], root)
+
+
+def test_verify_signed_envelope_accepts_per_response_jws():
+    jwks, sign = _jwks_and_signer()
+    payload = {"decision": {"authorized": "true"}, "meta": {"time_evaluated": "2026-03-06T12:00:00Z"}}
+    env = {"payload": payload, "signature": {"alg": "EdDSA", "jws": sign(canonical_json(payload))}}
+    out = verify_signed_envelope(env, jwks)
+    assert out["variant"] == "jws" and out["payload_bound"] is True
+
+
+def test_verify_signed_envelope_accepts_merkle_batch_and_rejects_tampering():
+    jwks, sign = _jwks_and_signer()
+    payloads = [{"recognized": True, "meta": {"n": i}} for i in range(3)]
+    leaves = [merkle_leaf_hash(canonical_json(p)) for p in payloads]
+    root, proofs = _tree(leaves)
+    statement = {"hash_alg": "SHA-256", "merkle_root": _b64(root), "tree_size": 3}
+    root_jws = sign(canonical_json(statement))
+
+    env = {
+        "payload": payloads[1],
+        "signature": {
+            "alg": "EdDSA",
+            "jws": root_jws,
+            "merkle": {
+                "leaf_hash": _b64(leaves[1]),
+                "leaf_index": 1,
+                "tree_size": 3,
+                "proof": [_b64(p) for p in proofs[1]],
+                "root": _b64(root),
+            },
+        },
+    }
+    assert verify_signed_envelope(env, jwks)["variant"] == "merkle"
+
+    env["payload"] = payloads[0]
+    try:
+        verify_signed_envelope(env, jwks)
+    except AssertionError as exc:
+        assert "leaf_hash" in str(exc)
+    else:
+        raise AssertionError("verify_signed_envelope should reject a payload that is not the committed leaf")
+
+
+def test_verify_signed_envelope_fails_unbound_payload_only_when_jcs_is_declared():
+    jwks, sign = _jwks_and_signer()
+    payload = {"decision": {"authorized": "true"}, "ratio": 0.5}
+    loose = json.dumps(payload).encode("utf-8")  # signed, but not canonical
+    env = {"payload": payload, "signature": {"alg": "EdDSA", "jws": sign(loose)}}
+    assert verify_signed_envelope(env, jwks)["payload_bound"] is False
+
+    env["signature"]["canonicalization"] = {"json": "RFC8785"}
+    try:
+        verify_signed_envelope(env, jwks)
+    except AssertionError as exc:
+        assert "RFC 8785" in str(exc)
+    else:
+        raise AssertionError("verify_signed_envelope should reject a JCS envelope that does not sign canonical(payload)")
+
+    env["signature"]["jws"] = sign(canonical_json(payload))
+    assert verify_signed_envelope(env, jwks)["payload_bound"] is True
+
+
+def _detached_signer():
+    key = jwk.JWK.generate(kty="OKP", crv="Ed25519", kid="unit-1")
+
+    def sign(data: bytes, b64: bool = False) -> str:
+        s = jws.JWS(payload=data)
+        protected = {"alg": "EdDSA", "kid": "unit-1"}
+        if not b64:
+            protected.update(b64=False, crit=["b64"])
+        s.add_signature(key, None, protected=protected)
+        s.detach_payload()
+        return s.serialize(compact=True)
+
+    return {"keys": [json.loads(key.export_public())]}, sign
+
+
+def test_verify_signed_envelope_accepts_detached_unencoded_jws_and_rejects_tampering():
+    jwks, sign = _detached_signer()
+    payload = {"decision": {"authorized": True}, "meta": {"expires_at": "2026-03-06T12:05:00Z"}}
+    compact = sign(canonical_json(payload))
+    assert compact.split(".")[1] == ""
+    env = {"payload": payload, "signature": {"alg": "EdDSA", "jws": compact, "detached_payload": True}}
+    out = verify_signed_envelope(env, jwks)
+    assert out["variant"] == "jws-detached" and out["payload_bound"] is True
+
+    env["payload"] = dict(payload, decision={"authorized": False})
+    try:
+        verify_signed_envelope(env, jwks)
+    except AssertionError as exc:
+        assert "could not verify" in str(exc)
+    else:
+        raise AssertionError("verify_signed_envelope should reject a payload the detached JWS does not sign")
+
+
+def test_verify_signed_envelope_requires_b64_false_for_detached_jws():
+    jwks, sign = _detached_signer()
+    payload = {"recognized": True}
+    env = {"payload": payload, "signature": {"alg": "EdDSA", "jws": sign(canonical_json(payload), b64=True)}}
+    try:
+        verify_signed_envelope(env, jwks)
+    except AssertionError as exc:
+        assert "b64" in str(exc)
+    else:
+        raise AssertionError("verify_signed_envelope should reject a detached JWS with a base64url-encoded payload")
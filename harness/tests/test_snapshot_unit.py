@@ -0,0 +1,61 @@
+import base64
+import hashlib
+import json
+import time
+
+import pytest
+from jwcrypto import jwk, jws
+
+from tspp_trqp_harness.snapshot import AuthorizationSnapshot
+
+
+def _b64(b: bytes) -> str:
+    return base64.urlsafe_b64encode(b).rstrip(b"=").decode("ascii")
+
+
+def _snapshot_doc(keys, bits=4096, hashes=5, pattern_fields=("action", "resource")):
+    """A bloom-sha256-v1 document, written independently of the SUT."""
+    filt = bytearray(bits // 8)
+    for terms in keys:
+        d = hashlib.sha256("\x1f".join(terms).encode("utf-8")).digest()
+        h1, h2 = int.from_bytes(d[:8], "big"), int.from_bytes(d[8:16], "big") | 1
+        for i in range(hashes):
+            j = (h1 + i * h2) % bits
+            filt[j // 8] |= 1 << (j % 8)
+    now = time.time()
+    stamp = lambda t: time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+    return {
+        "format": "bloom-sha256-v1",
+        "issued_at": stamp(now - 1),
+        "expires_at": stamp(now + 300),
+        "elements": len(keys),
+        "bits": bits,
+        "hashes": hashes,
+        "pattern_fields": list(pattern_fields),
+        "filter": _b64(bytes(filt)),
+    }
+
+
+_KEYS = [("A", "E1", "x:act/1", "r/1"), ("A", "E2", "x:act/*", "r/*")]
+
+
+def test_snapshot_admits_granted_keys_and_their_patterns():
+    snap = AuthorizationSnapshot(_snapshot_doc(_KEYS))
+    assert snap.fresh()
+    assert snap.may_authorize("A", "E1", "x:act/1", "r/1")
+    assert snap.may_authorize("A", "E2", "x:act/7", "r/any/thing")
+    assert not snap.may_authorize("A", "E1", "x:act/2", "r/1")
+    assert not snap.may_authorize("B", "E2", "x:act/7", "r/1")
+
+
+def test_snapshot_jws_must_verify():
+    key = jwk.JWK.generate(kty="EC", crv="P-256", kid="k1")
+    signer = jws.JWS(json.dumps(_snapshot_doc(_KEYS)).encode("utf-8"))
+    signer.add_signature(key, alg="ES256", protected=json.dumps({"alg": "ES256", "kid": "k1"}))
+    compact = signer.serialize(compact=True)
+    jwks = {"keys": [json.loads(key.export_public())]}
+    assert AuthorizationSnapshot.from_jws(compact, jwks).may_authorize("A", "E1", "x:act/1", "r/1")
+
+    other = {"keys": [json.loads(jwk.JWK.generate(kty="EC", crv="P-256", kid="k1").export_public())]}
+    with pytest.raises(AssertionError):
+        AuthorizationSnapshot.from_jws(compact, other)
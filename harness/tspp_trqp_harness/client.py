@@ -10,11 +10,19 @@ Assumptions:
 """
 
 from __future__ import annotations
+import itertools
+import json
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import requests
 
+# Queries per streaming request. Each window's request body stays small enough for the kernel
+# and server buffers to absorb while results stream back, so a half-duplex client like
+# `requests` never blocks writing while the server blocks on an unread response.
+STREAM_WINDOW = 256
+
 @dataclass
 class TRQPClient:
     base_url: str
@@ -22,10 +30,10 @@ class TRQPClient:
     dpop: Optional[str] = None
     timeout: float = 10.0
 
-    def _headers(self, accept_signature: str = "none", request_id: Optional[str] = None) -> Dict[str, str]:
+    def _headers(self, accept_signature: str = "none", request_id: Optional[str] = None, accept: str = "application/json") -> Dict[str, str]:
         h: Dict[str, str] = {
             "Content-Type": "application/json",
-            "Accept": "application/json",
+            "Accept": accept,
             "Accept-Signature": accept_signature,
         }
         if request_id:
@@ -36,14 +44,108 @@ class TRQPClient:
             h["DPoP"] = self.dpop
         return h
 
-    def get_metadata(self) -> requests.Response:
-        return requests.get(f"{self.base_url}/.well-known/trqp-metadata", headers=self._headers(), timeout=self.timeout)
+    def get_metadata(self, if_none_match: Optional[str] = None, accept: str = "application/json") -> requests.Response:
+        h = self._headers(accept=accept)
+        if if_none_match:
+            h["If-None-Match"] = if_none_match
+        return requests.get(f"{self.base_url}/.well-known/trqp-metadata", headers=h, timeout=self.timeout)
+
+    def post_authorization(
+        self, body: Dict[str, Any], accept_signature: str = "none", timeout_ms: Optional[int] = None, accept: str = "application/json"
+    ) -> requests.Response:
+        """`timeout_ms`, if given, is sent as `X-Request-Timeout-Ms`: the client's budget for the answer."""
+        h = self._headers(accept_signature, accept=accept)
+        if timeout_ms is not None:
+            h["X-Request-Timeout-Ms"] = str(timeout_ms)
+        return requests.post(f"{self.base_url}/authorization", json=body, headers=h, timeout=self.timeout)
+
+    def post_recognition(self, body: Dict[str, Any], accept_signature: str = "none", accept: str = "application/json") -> requests.Response:
+        return requests.post(f"{self.base_url}/recognition", json=body, headers=self._headers(accept_signature, accept=accept), timeout=self.timeout)
+
+    def post_authorization_batch(
+        self, bodies: List[Dict[str, Any]], accept_signature: str = "none", timeout_ms: Optional[int] = None
+    ) -> requests.Response:
+        """`timeout_ms`, if given, is sent as `X-Request-Timeout-Ms`: the client's budget for the whole batch."""
+        h = self._headers(accept_signature)
+        if timeout_ms is not None:
+            h["X-Request-Timeout-Ms"] = str(timeout_ms)
+        return requests.post(f"{self.base_url}/authorization/batch", json=bodies, headers=h, timeout=self.timeout)
+
+    def post_recognition_batch(self, bodies: List[Dict[str, Any]], accept_signature: str = "none") -> requests.Response:
+        return requests.post(f"{self.base_url}/recognition/batch", json=bodies, headers=self._headers(accept_signature), timeout=self.timeout)
+
+    def post_recognition_matrix(
+        self,
+        authority_ids: List[str],
+        subject_authority_ids: List[str],
+        accept_signature: str = "none",
+        **query: Any,
+    ) -> requests.Response:
+        """Ask whether each authority recognizes each subject authority; extra fields (action, resource, context) apply to every cell."""
+        body = {"authority_ids": list(authority_ids), "subject_authority_ids": list(subject_authority_ids), **query}
+        return requests.post(f"{self.base_url}/recognition/matrix", json=body, headers=self._headers(accept_signature), timeout=self.timeout)
+
+    def get_changes(self, cursor: Optional[str] = None, limit: Optional[int] = None, accept_signature: str = "none") -> requests.Response:
+        """One page of the registry's change feed after `cursor` (from the start if None)."""
+        params: Dict[str, Any] = {}
+        if cursor is not None:
+            params["cursor"] = cursor
+        if limit is not None:
+            params["limit"] = limit
+        return requests.get(f"{self.base_url}/changes", params=params, headers=self._headers(accept_signature), timeout=self.timeout)
+
+    def get_snapshot(self, uri: Optional[str] = None, if_none_match: Optional[str] = None) -> requests.Response:
+        """The signed authorization snapshot (a compact JWS), from `uri` as declared in metadata."""
+        h = self._headers()
+        h["Accept"] = "application/jose"
+        if if_none_match:
+            h["If-None-Match"] = if_none_match
+        return requests.get(uri or f"{self.base_url}/snapshot", headers=h, timeout=self.timeout)
+
+    def stream_authorization(self, queries: Iterable[Dict[str, Any]], accept_signature: str = "none", window: int = STREAM_WINDOW) -> Iterator[Dict[str, Any]]:
+        """Stream queries to `/authorization/stream`; yield one `{status, body|error}` result per query, in order."""
+        return self._stream("/authorization/stream", queries, accept_signature, window)
 
-    def post_authorization(self, body: Dict[str, Any], accept_signature: str = "none") -> requests.Response:
-        return requests.post(f"{self.base_url}/authorization", json=body, headers=self._headers(accept_signature), timeout=self.timeout)
+    def stream_recognition(self, queries: Iterable[Dict[str, Any]], accept_signature: str = "none", window: int = STREAM_WINDOW) -> Iterator[Dict[str, Any]]:
+        """Stream queries to `/recognition/stream`; yield one `{status, body|error}` result per query, in order."""
+        return self._stream("/recognition/stream", queries, accept_signature, window)
+
+    def _stream(self, path: str, queries: Iterable[Dict[str, Any]], accept_signature: str, window: int) -> Iterator[Dict[str, Any]]:
+        headers = self._headers(accept_signature)
+        headers["Content-Type"] = "application/x-ndjson"
+        headers["Accept"] = "application/x-ndjson"
+        it = iter(queries)
+        with requests.Session() as session:
+            while True:
+                chunk = list(itertools.islice(it, max(1, window)))
+                if not chunk:
+                    return
+                body = (json.dumps(q, separators=(",", ":")).encode("utf-8") + b"\n" for q in chunk)
+                with session.post(f"{self.base_url}{path}", data=body, headers=headers, timeout=self.timeout, stream=True) as r:
+                    r.raise_for_status()
+                    for line in r.iter_lines():
+                        if line:
+                            yield json.loads(line)
+
+
+def read_jsonl(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Lazily yield one JSON object per non-blank line of a JSONL file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_jsonl(path: Union[str, Path], records: Iterable[Dict[str, Any]]) -> int:
+    """Write records one per line as they are produced; return the number written."""
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+            n += 1
+    return n
 
-    def post_recognition(self, body: Dict[str, Any], accept_signature: str = "none") -> requests.Response:
-        return requests.post(f"{self.base_url}/recognition", json=body, headers=self._headers(accept_signature), timeout=self.timeout)
 
 def parse_ratelimit_headers(resp: requests.Response) -> Dict[str, Any]:
     out = {}
@@ -54,3 +156,12 @@ def parse_ratelimit_headers(resp: requests.Response) -> Dict[str, Any]:
             except Exception:
                 out[k] = resp.headers[k]
     return out
+
+
+def decode_body(resp: requests.Response) -> Any:
+    """A response body decoded per its media type: CBOR (needs cbor2) or JSON."""
+    if resp.headers.get("Content-Type", "").split(";")[0].strip() == "application/cbor":
+        from .cose import decode
+
+        return decode(resp.content)
+    return resp.json()
@@ -0,0 +1,80 @@
+"""CBOR response decoding and COSE_Sign1 verification for the TSPP harness.
+
+A registry may serve responses as `application/cbor` (RFC 8949). A signed CBOR envelope
+mirrors the JSON one, with the payload as a byte string holding its CBOR encoding, and a
+COSE_Sign1 (RFC 9052, tag 18) in `signature.cose_sign1` in place of the JWS:
+
+    {"meta": {...}, "payload": h'...', "signature": {"alg", "kid", "cose_sign1", ...}}
+
+The COSE_Sign1 may detach its payload (`nil`); it is verified over the envelope's
+`payload` bytes either way, with the keys of the declared JWKS, located by the `kid`
+in its protected header.
+
+Requires cbor2 (`pip install "tspp-trqp-harness[cbor]"`). Helpers raise `AssertionError`
+with a readable message on any verification failure, as `signatures.py` does.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict
+
+import cbor2
+from jwcrypto import jwk
+from jwcrypto.jwa import JWA
+
+MEDIA_TYPE = "application/cbor"
+
+COSE_ALGORITHMS = {-7: "ES256", -8: "EdDSA", -257: "RS256"}
+_COSE_ALG, _COSE_KID = 1, 4
+_COSE_SIGN1_TAG = 18
+
+
+def decode(data: bytes) -> Any:
+    return cbor2.loads(data)
+
+
+def verify_sign1(sign1: Any, jwks: Dict[str, Any], payload: bytes) -> Dict[str, Any]:
+    """Verify a COSE_Sign1 (decoded, or encoded bytes) over `payload`; return its `alg` and `kid`."""
+    if isinstance(sign1, bytes):
+        sign1 = cbor2.loads(sign1)
+    if not isinstance(sign1, cbor2.CBORTag) or sign1.tag != _COSE_SIGN1_TAG or len(sign1.value) != 4:
+        raise AssertionError("signature.cose_sign1 is not a tagged COSE_Sign1")
+    protected, unprotected, attached, signature = sign1.value
+    if attached is not None and attached != payload:
+        raise AssertionError("COSE_Sign1 carries a payload other than the envelope's")
+    header = cbor2.loads(protected) if protected else {}
+    alg = COSE_ALGORITHMS.get(header.get(_COSE_ALG))
+    if alg is None:
+        raise AssertionError(f"unsupported COSE algorithm {header.get(_COSE_ALG)!r}")
+    kid = header.get(_COSE_KID, (unprotected or {}).get(_COSE_KID))
+    kid = kid.decode("utf-8") if isinstance(kid, bytes) else kid
+
+    keys = jwks.get("keys", [])
+    if not keys:
+        raise AssertionError("JWKS has no keys")
+    to_be_signed = cbor2.dumps(["Signature1", protected, b"", payload])
+    candidates = [k for k in keys if kid and k.get("kid") == kid] or keys
+    for k in candidates:
+        try:
+            JWA.signing_alg(alg).verify(jwk.JWK.from_json(json.dumps(k)), to_be_signed, signature)
+            return {"alg": alg, "kid": kid}
+        except Exception:
+            continue
+    raise AssertionError(f"could not verify COSE_Sign1 (kid={kid!r}) with any key in the declared JWKS")
+
+
+def verify_cbor_envelope(envelope: Dict[str, Any], jwks: Dict[str, Any]) -> Dict[str, Any]:
+    """Verify a signed CBOR envelope; return a summary with the decoded payload."""
+    sig = envelope.get("signature")
+    if not isinstance(sig, dict) or "cose_sign1" not in sig:
+        raise AssertionError("envelope has no signature.cose_sign1")
+    payload = envelope.get("payload")
+    if not isinstance(payload, bytes):
+        raise AssertionError("a signed CBOR envelope carries its payload as a byte string")
+    verified = verify_sign1(sig["cose_sign1"], jwks, payload)
+    if (sig.get("alg"), sig.get("kid")) != (verified["alg"], verified["kid"]):
+        raise AssertionError(
+            f"signature.alg/kid {sig.get('alg')!r}/{sig.get('kid')!r} differ from the COSE header's {verified['alg']!r}/{verified['kid']!r}"
+        )
+    return {"variant": "cose_sign1", "alg": verified["alg"], "payload": cbor2.loads(payload)}
@@ -0,0 +1,162 @@
+"""RFC 8785 JSON Canonicalization Scheme (JCS).
+
+`canonicalize(obj)` returns the canonical UTF-8 bytes of a JSON value:
+
+- object members sorted by their names' UTF-16 code units, recursively;
+- no insignificant whitespace;
+- strings escaped as ECMAScript `JSON.stringify` does: `\\"`, `\\\\`, the short escapes
+  `\\b \\t \\n \\f \\r`, other control characters as lowercase `\\u00xx`, and everything
+  else literally;
+- numbers as IEEE 754 doubles, formatted by ECMAScript's `Number.prototype.toString`
+  (`number`). NaN, infinities, and integers a double cannot hold exactly are rejected.
+
+Both the reference SUT and the harness use this module, so a verifier can recompute
+the exact bytes a registry signed or hashed.
+
+Most registry payloads hold only strings, booleans, nulls, safe integers and ASCII
+member names. `json.dumps(sort_keys=True)` already writes those values exactly as JCS
+does, so they take that C-accelerated path. Anything else (floats, large integers,
+non-ASCII member names, whose code point order can differ from UTF-16 order) goes
+through the pure-Python serializer.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, List
+
+_MAX_SAFE_INTEGER = 2**53
+
+_string = json.encoder.encode_basestring  # type: ignore[attr-defined]
+
+
+def _unserializable(obj: Any) -> Any:
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+# Built once: `json.dumps` with non-default options constructs a new encoder per call.
+# `_plain` walks the whole value first (and never returns on a cycle), so the encoder
+# skips its circular-reference check.
+if json.encoder.c_make_encoder is not None:  # type: ignore[attr-defined]
+    _c_encoder = json.encoder.c_make_encoder(  # type: ignore[attr-defined]
+        None, _unserializable, _string, None, ":", ",", True, False, False
+    )
+
+    def _dumps_sorted(obj: Any) -> str:
+        return "".join(_c_encoder(obj, 0))
+
+else:  # pragma: no cover - interpreters without the C accelerator
+    _dumps_sorted = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode
+
+
+def number(value: float) -> str:
+    """ECMAScript `Number.prototype.toString` of a finite double (RFC 8785, section 3.2.2.3)."""
+    if math.isnan(value) or math.isinf(value):
+        raise ValueError(f"{value!r} is not a JSON number")
+    if value == 0:
+        return "0"
+    sign = "-" if value < 0 else ""
+    # repr() gives the shortest digit string that round-trips, as ECMAScript requires.
+    mantissa, _, exp = repr(abs(value)).partition("e")
+    int_part, _, frac = mantissa.partition(".")
+    digits = int_part + frac
+    point = len(int_part) + (int(exp) if exp else 0)
+    stripped = digits.lstrip("0")
+    point -= len(digits) - len(stripped)
+    digits = stripped.rstrip("0")
+    k, n = len(digits), point
+    if k <= n <= 21:
+        out = digits + "0" * (n - k)
+    elif 0 < n <= 21:
+        out = digits[:n] + "." + digits[n:]
+    elif -6 < n <= 0:
+        out = "0." + "0" * -n + digits
+    else:
+        e = n - 1
+        out = digits[0] + ("." + digits[1:] if k > 1 else "") + "e" + ("+" if e >= 0 else "-") + str(abs(e))
+    return sign + out
+
+
+def _integer(value: int) -> str:
+    if -_MAX_SAFE_INTEGER <= value <= _MAX_SAFE_INTEGER:
+        return str(value)
+    as_double = float(value)
+    if as_double != value:
+        raise ValueError(f"integer {value} has no exact IEEE 754 double representation")
+    return number(as_double)
+
+
+def _plain(obj: Any) -> bool:
+    """Whether `json.dumps(obj, sort_keys=True)` already writes `obj` canonically."""
+    t = type(obj)
+    if t is str or t is bool or obj is None:
+        return True
+    if t is dict:
+        for key, value in obj.items():
+            if type(key) is not str or not key.isascii():
+                return False
+            t = type(value)
+            if not (t is str or t is bool or value is None or _plain(value)):
+                return False
+        return True
+    if t is list or t is tuple:
+        for value in obj:
+            t = type(value)
+            if not (t is str or t is bool or value is None or _plain(value)):
+                return False
+        return True
+    if t is int:
+        return -_MAX_SAFE_INTEGER <= obj <= _MAX_SAFE_INTEGER
+    return False
+
+
+def _encode(obj: Any, parts: List[str]) -> None:
+    if obj is None:
+        parts.append("null")
+    elif obj is True:
+        parts.append("true")
+    elif obj is False:
+        parts.append("false")
+    elif isinstance(obj, str):
+        parts.append(_string(obj))
+    elif isinstance(obj, int):
+        parts.append(_integer(obj))
+    elif isinstance(obj, float):
+        parts.append(number(obj))
+    elif isinstance(obj, dict):
+        for key in obj:
+            if not isinstance(key, str):
+                raise TypeError(f"object member names must be strings, not {type(key).__name__}")
+        parts.append("{")
+        # Big-endian UTF-16 bytes compare exactly as the code units do.
+        for i, key in enumerate(sorted(obj, key=lambda k: k.encode("utf-16-be", "surrogatepass"))):
+            if i:
+                parts.append(",")
+            parts.append(_string(key))
+            parts.append(":")
+            _encode(obj[key], parts)
+        parts.append("}")
+    elif isinstance(obj, (list, tuple)):
+        parts.append("[")
+        for i, value in enumerate(obj):
+            if i:
+                parts.append(",")
+            _encode(value, parts)
+        parts.append("]")
+    else:
+        raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def canonicalize(obj: Any) -> bytes:
+    """The RFC 8785 canonical UTF-8 encoding of `obj`."""
+    if _plain(obj):
+        text = _dumps_sorted(obj)
+    else:
+        parts: List[str] = []
+        _encode(obj, parts)
+        text = "".join(parts)
+    try:
+        return text.encode("utf-8")
+    except UnicodeEncodeError as exc:
+        raise ValueError("lone surrogates cannot be canonicalized") from exc
@@ -0,0 +1,67 @@
+"""Tail-latency measurement for authorization queries.
+
+`measure` sends queries one at a time and records each response's wall-clock latency
+and status in a `LatencyProfile`. Concurrency would mostly measure the client. The
+tail percentiles (p95, p99) are what a slow dependency moves first.
+
+A registry answers repeated queries from its decision cache, so repeating a query
+measures the cache, not the system behind it. `as_of_variants` gives each copy a
+distinct `context.time_requested`, a second apart, so every query is evaluated afresh.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .client import TRQPClient
+
+
+@dataclass
+class LatencyProfile:
+    samples_ms: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile, `q` in [0, 1]; 0.0 without samples."""
+        if not self.samples_ms:
+            return 0.0
+        ordered = sorted(self.samples_ms)
+        rank = min(len(ordered), max(1, math.ceil(len(ordered) * q)))
+        return ordered[rank - 1]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": len(self.samples_ms),
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(max(self.samples_ms, default=0.0), 3),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+        }
+
+
+def as_of_variants(query: Dict[str, Any], count: int, start: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """`count` copies of `query` as of one second apart, going back from `start` (default now)."""
+    start = start or datetime.now(timezone.utc)
+    for i in range(count):
+        q = copy.deepcopy(query)
+        at = (start - timedelta(seconds=i)).replace(microsecond=0)
+        q.setdefault("context", {})["time_requested"] = at.isoformat().replace("+00:00", "Z")
+        yield q
+
+
+def measure(client: TRQPClient, queries: Iterable[Dict[str, Any]], timeout_ms: Optional[int] = None) -> LatencyProfile:
+    """Send each query in turn with `POST /authorization` and profile the latencies."""
+    profile = LatencyProfile()
+    for q in queries:
+        started = time.perf_counter()
+        r = client.post_authorization(q, timeout_ms=timeout_ms)
+        profile.samples_ms.append((time.perf_counter() - started) * 1000.0)
+        profile.statuses[r.status_code] += 1
+    return profile
@@ -0,0 +1,213 @@
+"""Local replica of a registry, kept up to date from its change feed.
+
+`RegistryMirror` pages `GET /changes` from the last sequence number it applied and
+upserts each entry into local indexes:
+
+- authorization facts by `(authority, entity)`, then `(action, resource)`, each key's
+  versions sorted by `valid_from` so an as-of lookup is one binary search;
+- recognition edges by authority.
+
+It answers `/authorization` and `/recognition` queries with the registry's own rules:
+namespace prefix grants (most specific first), version history, and recognition chains
+up to `max_chain_depth` edges over transitive edges.
+
+Every sync recomputes the feed's hash chain over the entries it applied. It then checks
+that the chain reaches the hash in the registry's checkpoint and, given the registry's
+JWKS, that the checkpoint signature verifies. A mismatch raises `AssertionError`, like
+the helpers in `signatures.py`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .client import TRQPClient
+from .signatures import canonical_json, verify_jws
+
+_SEPARATORS = "/:#"
+
+
+def _epoch(value: Optional[str], default: float) -> float:
+    if not value:
+        return default
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _patterns(value: str) -> Iterator[str]:
+    """`value` and the namespace patterns covering it, most specific first."""
+    yield value
+    for pos in range(len(value) - 1, -1, -1):
+        if value[pos] in _SEPARATORS:
+            yield value[: pos + 1] + "*"
+    yield "*"
+
+
+def _covers(pattern: str, value: str) -> bool:
+    return pattern == "*" or pattern == value or (pattern.endswith("*") and value.startswith(pattern[:-1]))
+
+
+class _Versions:
+    """One fact key's versions, sorted by `valid_from`."""
+
+    __slots__ = ("starts", "values")
+
+    def __init__(self) -> None:
+        self.starts: List[float] = []
+        self.values: List[Tuple[float, bool]] = []
+
+    def put(self, valid_from: float, valid_until: float, authorized: bool) -> None:
+        i = bisect_left(self.starts, valid_from)
+        if i < len(self.starts) and self.starts[i] == valid_from:
+            self.values[i] = (valid_until, authorized)
+            return
+        self.starts.insert(i, valid_from)
+        self.values.insert(i, (valid_until, authorized))
+
+    def at(self, when: float) -> Optional[bool]:
+        i = bisect_right(self.starts, when) - 1
+        if i < 0 or when >= self.values[i][0]:
+            return None
+        return self.values[i][1]
+
+
+class RegistryMirror:
+    def __init__(
+        self,
+        client: TRQPClient,
+        jwks: Optional[Dict[str, Any]] = None,
+        page_limit: Optional[int] = None,
+        max_chain_depth: Optional[int] = None,
+    ) -> None:
+        self.client = client
+        self.jwks = jwks
+        self.page_limit = page_limit
+        self.max_chain_depth = max_chain_depth
+        self.checkpoint: Optional[Dict[str, Any]] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.seq = 0
+        self._chain = bytes(32)
+        self._grants: Dict[Tuple[str, str], Dict[Tuple[str, str], _Versions]] = {}
+        # authority -> (subject, action, resource, valid_from) -> (expires_at, transitive)
+        self._edges: Dict[str, Dict[Tuple[str, str, str, float], Tuple[float, bool]]] = {}
+
+    def sync(self) -> int:
+        """Apply every entry the registry has after `seq`; return how many were applied."""
+        if self.max_chain_depth is None:
+            r = self.client.get_metadata()
+            assert r.status_code == 200, f"metadata request failed with {r.status_code}"
+            self.max_chain_depth = int((r.json().get("recognition_policy") or {}).get("max_chain_depth", 1))
+        applied, restarted = 0, False
+        while True:
+            r = self.client.get_changes(str(self.seq), self.page_limit)
+            if r.status_code == 410 and not restarted:
+                # The cursor belongs to another log (the registry was rebuilt): start over.
+                self._reset()
+                applied, restarted = 0, True
+                continue
+            assert r.status_code == 200, f"change feed request failed with {r.status_code}: {r.text}"
+            page = r.json()
+            for entry in page["entries"]:
+                self._apply(entry)
+                applied += 1
+            assert page["next_cursor"] == str(self.seq), (
+                f"next_cursor {page['next_cursor']!r} does not follow the last applied entry {self.seq}"
+            )
+            if not page["has_more"]:
+                self._check(page["checkpoint"])
+                return applied
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        assert entry.get("seq") == self.seq + 1, f"expected entry {self.seq + 1}, got {entry.get('seq')!r}"
+        self._chain = hashlib.sha256(self._chain + canonical_json(entry)).digest()
+        self.seq += 1
+
+        valid_from = _epoch(entry.get("valid_from"), -math.inf)
+        if entry["type"] == "authorization":
+            facts = self._grants.setdefault((entry["authority"], entry["entity"]), {})
+            versions = facts.setdefault((entry["action"], entry["resource"]), _Versions())
+            versions.put(valid_from, _epoch(entry.get("valid_until"), math.inf), bool(entry["authorized"]))
+        elif entry["type"] == "recognition":
+            key = (entry["subject_authority"], entry["action"], entry["resource"], valid_from)
+            edges = self._edges.setdefault(entry["authority"], {})
+            if entry.get("recognized"):
+                edges[key] = (_epoch(entry.get("expires_at"), math.inf), bool(entry.get("transitive")))
+            else:
+                edges.pop(key, None)
+
+    def _check(self, checkpoint: Dict[str, Any]) -> None:
+        assert checkpoint.get("seq") == self.seq, (
+            f"checkpoint is at seq {checkpoint.get('seq')!r} but the feed ended at {self.seq}"
+        )
+        assert checkpoint.get("chain_hash") == self._chain.hex(), (
+            f"replayed chain hash {self._chain.hex()} does not match the checkpoint's {checkpoint.get('chain_hash')!r}"
+        )
+        if self.jwks is not None:
+            statement = {k: v for k, v in checkpoint.items() if k != "signature"}
+            signed = json.loads(verify_jws(checkpoint["signature"]["jws"], self.jwks))
+            assert signed == statement, "checkpoint signature does not cover the checkpoint it is attached to"
+        self.checkpoint = checkpoint
+
+    def covers(self, kind: str) -> bool:
+        """Whether the mirror can answer `kind` ("authorization" or "recognition") queries itself.
+
+        Authorization is left to the registry when it runs a rules policy, which the feed
+        does not carry.
+        """
+        if self.checkpoint is None or kind not in self.checkpoint.get("types", []):
+            return False
+        return kind != "authorization" or not self.checkpoint.get("policy_version")
+
+    def authorized(
+        self, authority: str, entity: str, action: str = "", resource: str = "", at: Optional[str] = None
+    ) -> Optional[bool]:
+        """The decision as of `at` (RFC 3339, default now); None if the entity is unknown to the authority."""
+        facts = self._grants.get((authority, entity))
+        if facts is None:
+            return None
+        when = _epoch(at, time.time())
+        for act in _patterns(action):
+            for res in _patterns(resource):
+                versions = facts.get((act, res))
+                value = versions.at(when) if versions is not None else None
+                if value is not None:
+                    return value
+        return False
+
+    def recognized(
+        self, authority: str, subject: str, action: str = "", resource: str = "", at: Optional[str] = None
+    ) -> bool:
+        """Whether `authority` recognizes `subject` as of `at`, directly or over transitive edges."""
+        when = _epoch(at, time.time())
+        frontier, seen = [authority], {authority}
+        for _ in range(self.max_chain_depth or 0):
+            nxt: List[str] = []
+            for node in frontier:
+                for (target, act, res, start), (expires_at, transitive) in self._edges.get(node, {}).items():
+                    if not (start <= when < expires_at and _covers(act, action) and _covers(res, resource)):
+                        continue
+                    if target == subject:
+                        return True
+                    if transitive and target not in seen:
+                        seen.add(target)
+                        nxt.append(target)
+            frontier = nxt
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "authority_entity_pairs": len(self._grants),
+            "fact_keys": sum(len(f) for f in self._grants.values()),
+            "edges": sum(len(e) for e in self._edges.values()),
+        }
@@ -0,0 +1,140 @@
+"""Signed-envelope verification helpers for the TSPP harness.
+
+Supports the envelope variants a TSPP deployment may return:
+
+- per-response signatures: `signature.jws` is a compact JWS over canonical(payload);
+  when `signature.canonicalization.json` declares RFC 8785 (JCS), the signed bytes
+  must be exactly `jcs.canonicalize(payload)`;
+- detached per-response signatures (RFC 7797): `signature.jws` is `header..signature`
+  with `b64: false`, signing `jcs.canonicalize(payload)` unencoded, which the verifier
+  supplies since the JWS does not carry it;
+- Merkle-batched signatures: `signature.jws` signs a batch statement carrying a
+  Merkle root, and `signature.merkle` carries the leaf hash and an RFC 9162
+  inclusion proof binding canonical(payload) to that root.
+
+Helpers raise `AssertionError` with a readable message on any verification failure,
+matching the style of `validate.py`.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from jwcrypto import jwk, jws
+
+from .jcs import canonicalize
+
+JCS_NAMES = frozenset({"JCS", "RFC8785"})
+
+
+def canonical_json(obj: Any) -> bytes:
+    return canonicalize(obj)
+
+
+def b64url_decode(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+
+def merkle_leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha256(b"\x00" + data).digest()
+
+
+def merkle_node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def verify_merkle_inclusion(leaf: bytes, index: int, tree_size: int, proof: List[bytes], root: bytes) -> bool:
+    """RFC 9162 section 2.1.3.2 inclusion proof verification."""
+    if index < 0 or index >= tree_size:
+        return False
+    fn, sn, r = index, tree_size - 1, leaf
+    for p in proof:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = merkle_node_hash(p, r)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            r = merkle_node_hash(r, p)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and r == root
+
+
+def protected_header(compact: str) -> Dict[str, Any]:
+    """The decoded protected header of a compact JWS."""
+    return json.loads(b64url_decode(compact.split(".", 1)[0]))
+
+
+def is_detached(compact: str) -> bool:
+    """Whether a compact JWS leaves its payload out (`header..signature`)."""
+    parts = compact.split(".")
+    return len(parts) == 3 and parts[1] == ""
+
+
+def verify_jws(compact: str, jwks: Dict[str, Any], detached_payload: Optional[bytes] = None) -> bytes:
+    """Verify a compact JWS against a JWKS document and return its payload bytes.
+
+    A detached JWS is verified over `detached_payload`, which is then returned.
+    """
+    keys = jwks.get("keys", [])
+    if not keys:
+        raise AssertionError("JWKS has no keys")
+    verifier = jws.JWS()
+    verifier.deserialize(compact)
+    kid = verifier.jose_header.get("kid")
+    candidates = [k for k in keys if kid and k.get("kid") == kid] or keys
+    for k in candidates:
+        try:
+            verifier.verify(jwk.JWK.from_json(json.dumps(k)), detached_payload=detached_payload)
+            return detached_payload if detached_payload is not None else verifier.payload
+        except Exception:
+            continue
+    raise AssertionError(f"could not verify JWS (kid={kid!r}) with any key in the declared JWKS")
+
+
+def verify_signed_envelope(envelope: Dict[str, Any], jwks: Dict[str, Any]) -> Dict[str, Any]:
+    """Verify a signed response envelope; return a summary of what was verified."""
+    sig = envelope.get("signature")
+    if not isinstance(sig, dict) or not sig.get("jws"):
+        raise AssertionError("envelope has no signature.jws")
+    payload_bytes = canonical_json(envelope.get("payload"))
+    merkle: Optional[Dict[str, Any]] = sig.get("merkle")
+
+    if is_detached(sig["jws"]) or sig.get("detached_payload"):
+        if merkle is not None:
+            raise AssertionError("a Merkle-batched signature.jws signs the batch statement and cannot be detached")
+        if not is_detached(sig["jws"]):
+            raise AssertionError("signature.detached_payload is set but signature.jws carries a payload")
+        header = protected_header(sig["jws"])
+        if header.get("b64") is not False or "b64" not in header.get("crit", []):
+            raise AssertionError(f"detached signature.jws must be unencoded (b64: false, crit: [b64]), got header {header}")
+        # The only signing input a verifier can rebuild is the canonical payload.
+        verify_jws(sig["jws"], jwks, detached_payload=payload_bytes)
+        return {"variant": "jws-detached", "alg": sig.get("alg"), "payload_bound": True}
+
+    signed = verify_jws(sig["jws"], jwks)
+    if merkle is None:
+        bound = signed == payload_bytes
+        declared = (sig.get("canonicalization") or {}).get("json")
+        if declared in JCS_NAMES and not bound:
+            raise AssertionError(f"signature.jws does not sign the RFC 8785 canonical payload (declared {declared!r})")
+        # An operator-defined signing input cannot be recomputed, so a mismatch is only reported.
+        return {"variant": "jws", "alg": sig.get("alg"), "payload_bound": bound}
+
+    leaf = merkle_leaf_hash(payload_bytes)
+    if b64url_decode(merkle["leaf_hash"]) != leaf:
+        raise AssertionError("signature.merkle.leaf_hash does not match canonical(payload)")
+    root = b64url_decode(merkle["root"])
+    proof = [b64url_decode(p) for p in merkle.get("proof", [])]
+    if not verify_merkle_inclusion(leaf, int(merkle["leaf_index"]), int(merkle["tree_size"]), proof, root):
+        raise AssertionError("Merkle inclusion proof does not reach signature.merkle.root")
+    statement = json.loads(signed)
+    if statement.get("merkle_root") != merkle["root"] or statement.get("tree_size") != merkle["tree_size"]:
+        raise AssertionError("signed batch statement does not commit to signature.merkle.root/tree_size")
+    return {"variant": "merkle", "alg": sig.get("alg"), "tree_size": merkle["tree_size"]}
@@ -0,0 +1,135 @@
+"""Offline authorization checks against a registry's signed snapshot.
+
+A registry that declares `snapshot` in its metadata publishes a compact JWS whose payload
+is a Bloom filter (`bloom-sha256-v1`) of every `(authority, entity, action, resource)`
+key that grants authorization between the payload's `issued_at` and `expires_at`.
+
+`AuthorizationSnapshot` verifies the JWS against the registry's JWKS and answers
+`may_authorize`. False means definitely not authorized. True means possibly authorized:
+a grant, a denial that shadows a broader grant, or a filter false positive.
+`SnapshotChecker` uses the snapshot for the negatives and confirms everything else with
+`POST /authorization`. That includes queries made outside the snapshot's validity window
+and queries it cannot judge.
+
+Verification failures raise `AssertionError`, like the helpers in `signatures.py`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from .client import TRQPClient
+from .signatures import b64url_decode, verify_jws
+
+FORMAT = "bloom-sha256-v1"
+_FIELDS = ("authority", "entity", "action", "resource")
+_QUERY_FIELDS = ("authority_id", "entity_id", "action", "resource")
+_SEPARATORS = "/:#"
+
+
+def _patterns(value: str) -> Iterator[str]:
+    """`value` and the namespace patterns covering it, most specific first."""
+    yield value
+    for pos in range(len(value) - 1, -1, -1):
+        if value[pos] in _SEPARATORS:
+            yield value[: pos + 1] + "*"
+    yield "*"
+
+
+class AuthorizationSnapshot:
+    @staticmethod
+    def parse_time(value: str) -> float:
+        """RFC 3339 timestamp as epoch seconds."""
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+
+    def __init__(self, doc: Dict[str, Any]) -> None:
+        if doc.get("format") != FORMAT:
+            raise AssertionError(f"unsupported snapshot format {doc.get('format')!r}")
+        self.doc = doc
+        self.issued_at = self.parse_time(doc["issued_at"])
+        self.expires_at = self.parse_time(doc["expires_at"])
+        self.bits = int(doc["bits"])
+        self.hashes = int(doc["hashes"])
+        self.pattern_fields = list(doc.get("pattern_fields", []))
+        self._filter = b64url_decode(doc["filter"])
+        if len(self._filter) * 8 < self.bits:
+            raise AssertionError("snapshot filter is shorter than its declared bit count")
+
+    @classmethod
+    def from_jws(cls, compact: str, jwks: Dict[str, Any]) -> "AuthorizationSnapshot":
+        """Verify a snapshot JWS against the registry's JWKS and parse its payload."""
+        return cls(json.loads(verify_jws(compact, jwks)))
+
+    @classmethod
+    def fetch(cls, client: TRQPClient, jwks: Dict[str, Any]) -> Optional["AuthorizationSnapshot"]:
+        """Download and verify the snapshot the registry's metadata declares; None if it declares none."""
+        m = client.get_metadata()
+        assert m.status_code == 200, f"metadata request failed with {m.status_code}"
+        declared = m.json().get("snapshot")
+        if not declared:
+            return None
+        r = client.get_snapshot(declared["uri"])
+        assert r.status_code == 200, f"snapshot request failed with {r.status_code}: {r.text}"
+        return cls.from_jws(r.text.strip(), jwks)
+
+    def fresh(self, at: Optional[float] = None) -> bool:
+        when = time.time() if at is None else at
+        return self.issued_at <= when < self.expires_at
+
+    def _contains(self, terms: List[str]) -> bool:
+        digest = hashlib.sha256("\x1f".join(terms).encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hashes):
+            j = (h1 + i * h2) % self.bits
+            if not self._filter[j >> 3] >> (j & 7) & 1:
+                return False
+        return True
+
+    def may_authorize(self, authority: str, entity: str, action: str = "", resource: str = "") -> bool:
+        """False if no key covering the query grants anything; True if one might."""
+        options = [
+            list(_patterns(value)) if field in self.pattern_fields else [value]
+            for field, value in zip(_FIELDS, (authority, entity, action, resource))
+        ]
+        return self._probe(options, [])
+
+    def _probe(self, options: List[List[str]], prefix: List[str]) -> bool:
+        if len(prefix) == len(options):
+            return self._contains(prefix)
+        return any(self._probe(options, prefix + [value]) for value in options[len(prefix)])
+
+
+class SnapshotChecker:
+    """Authorization decisions from a snapshot, falling back to the registry for positives."""
+
+    def __init__(self, client: TRQPClient, snapshot: AuthorizationSnapshot) -> None:
+        self.client = client
+        self.snapshot = snapshot
+        self.offline = 0
+        self.online = 0
+
+    def authorized(self, query: Dict[str, Any]) -> bool:
+        """Whether `query` is authorized; an entity unknown to the authority is not."""
+        ctx = query.get("context") or {}
+        at = self.snapshot.parse_time(ctx["time_requested"]) if isinstance(ctx.get("time_requested"), str) else None
+        if self.snapshot.fresh(at):
+            terms = [query.get(k) if isinstance(query.get(k), str) else "" for k in _QUERY_FIELDS]
+            if not self.snapshot.may_authorize(*terms):
+                self.offline += 1
+                return False
+        self.online += 1
+        r = self.client.post_authorization(query)
+        if r.status_code == 404:
+            return False
+        assert r.status_code == 200, f"authorization query failed with {r.status_code}: {r.text}"
+        body = r.json()
+        payload = body["payload"] if "payload" in body and "signature" in body else body
+        return str(payload["decision"]["authorized"]).lower() == "true"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Benchmark response serialization: the former double `json.dumps` path against JCS.
+
+Before, a signed response was serialized twice: `json.dumps(sort_keys=True)` of the
+payload for the signature, then the whole envelope, payload included, again by
+`JSONResponse` for the body. Now the payload is canonicalized (RFC 8785) once, and
+those bytes are both the signing input and the `payload` member of the body.
+
+Signing itself is the same in both paths and is left out. Run from the repository
+root with the harness installed (`pip install -e harness`):
+
+    python scripts/bench_canonicalization.py --batch 100
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import timeit
+
+from tspp_trqp_harness.jcs import canonicalize
+
+JWS = "eyJhbGciOiJFZERTQSIsImtpZCI6InJlZi0xIn0." + "A" * 120 + "." + "B" * 86
+
+
+def _dumps_canonical(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _dumps_body(obj):
+    # What `JSONResponse.render` does.
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _query():
+    return {
+        "authority_id": "did:example:authority-1",
+        "entity_id": "did:example:entity-42",
+        "action": "urn:example:action:issue",
+        "resource": "urn:example:credential:diploma",
+        "context": {"time_requested": "2026-03-06T12:00:00Z", "purpose": "verification"},
+    }
+
+
+def _payload():
+    return {
+        "decision": {"authorized": True},
+        "meta": {"time_evaluated": "2026-03-06T12:00:00Z", "expires_at": "2026-03-06T12:05:00Z"},
+        "context": {"time_requested": "2026-03-06T12:00:00Z", "purpose": "verification"},
+    }
+
+
+def _signature(qh):
+    return {
+        "alg": "EdDSA",
+        "kid": "ref-ed25519-1",
+        "jws": JWS,
+        "query_hash": qh,
+        "hash_alg": "SHA-256",
+        "canonicalization": {"json": "RFC8785", "unicode": "none", "context_keys_included": ["time_requested"]},
+        "issued_at": "2026-03-06T12:00:00Z",
+    }
+
+
+def _meta(qh):
+    return {"query_hash": qh, "iat": "2026-03-06T12:00:00Z", "exp": "2026-03-06T12:05:00Z"}
+
+
+def _bound(query):
+    bound = dict(query)
+    bound["context"] = {"time_requested": query["context"]["time_requested"]}
+    return bound
+
+
+def before(query, payload, signed):
+    qh = hashlib.sha256(_dumps_canonical(_bound(query))).hexdigest()
+    if not signed:
+        return _dumps_body(payload)
+    _dumps_canonical(payload)  # signing input
+    return _dumps_body({"payload": payload, "signature": _signature(qh), "meta": _meta(qh)})
+
+
+def after(query, payload, signed):
+    qh = hashlib.sha256(canonicalize(_bound(query))).hexdigest()
+    if not signed:
+        return canonicalize(payload)
+    canonical = canonicalize(payload)  # signing input, and the body's payload member
+    return b'{"meta":' + canonicalize(_meta(qh)) + b',"payload":' + canonical + b',"signature":' + canonicalize(_signature(qh)) + b"}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--number", type=int, default=20000, help="iterations per case")
+    ap.add_argument("--batch", type=int, default=100, help="results in the batch case")
+    args = ap.parse_args()
+
+    query = _query()
+    cases = [
+        ("authorization, unsigned", _payload(), False, args.number),
+        ("authorization, signed", _payload(), True, args.number),
+        (
+            f"batch of {args.batch}, signed",
+            {"results": [{"status": 200, "body": _payload()} for _ in range(args.batch)]},
+            True,
+            max(1, args.number // args.batch),
+        ),
+    ]
+    print(f"{'case':<28} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for name, payload, signed, number in cases:
+        old, new = before(query, payload, signed), after(query, payload, signed)
+        if json.loads(old) != json.loads(new):
+            print(f"[FAIL] {name}: the two paths render different documents")
+            return 1
+        t_old = min(timeit.repeat(lambda: before(query, payload, signed), number=number, repeat=5)) / number
+        t_new = min(timeit.repeat(lambda: after(query, payload, signed), number=number, repeat=5)) / number
+        print(f"{name:<28} {t_old * 1e6:>10.2f} {t_new * 1e6:>10.2f} {t_old / t_new:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark response rendering: per-response dicts against the SUT's byte templates.
+
+Before, every answer built its payload, signature block and envelope `meta` as fresh
+dicts, formatted three timestamps from `datetime.now()`, and canonicalized the lot. Now
+`examples/reference_sut/render.py` splices the variable parts into pre-rendered byte
+templates, with timestamps from a clock that formats each second once.
+
+Both paths must render identical bytes for the same values; each case checks that
+before timing it. Signing is the same in both paths and is left out. Run from the
+repository root with the harness installed (`pip install -e harness`):
+
+    python scripts/bench_rendering.py --batch 100
+"""
+
+import argparse
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from examples.reference_sut import render  # noqa: E402
+from tspp_trqp_harness.jcs import canonicalize  # noqa: E402
+
+JWS = "eyJhbGciOiJFZERTQSIsImtpZCI6InJlZi0xIn0." + "A" * 120 + "." + "B" * 86
+KID = "ref-ed25519-1"
+QH = "9f" * 32
+EXPIRES = 300
+CONTEXT = {"time_requested": "2026-03-06T12:00:00Z", "purpose": "verification"}
+CTX_KEYS = ("time_requested", "purpose")
+CLOCK = render.SecondClock()
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _dict_payload(kind, now):
+    meta = {"time_evaluated": _iso(now), "expires_at": _iso(now + timedelta(seconds=EXPIRES))}
+    if kind == render.AUTHORIZATION:
+        return {"decision": {"authorized": "true"}, "meta": meta, "context": CONTEXT}
+    return {"recognized": True, "meta": meta, "context": CONTEXT}
+
+
+def before(kind, signed, items):
+    """The former path: dicts per response, `datetime` timestamps, generic canonicalization."""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    if items:
+        canonical = canonicalize({"results": [{"status": 200, "body": _dict_payload(kind, now)} for _ in range(items)]})
+    else:
+        canonical = canonicalize(_dict_payload(kind, now))
+    if not signed:
+        return canonical
+    signature = {
+        "alg": "EdDSA",
+        "kid": KID,
+        "jws": JWS,
+        "query_hash": QH,
+        "hash_alg": "SHA-256",
+        "canonicalization": {"json": "RFC8785", "unicode": "none", "context_keys_included": list(CTX_KEYS)},
+        "issued_at": _iso(now),
+    }
+    meta = {"query_hash": QH, "iat": _iso(now), "exp": _iso(now + timedelta(seconds=EXPIRES))}
+    return b'{"meta":' + canonicalize(meta) + b',"payload":' + canonical + b',"signature":' + canonicalize(signature) + b"}"
+
+
+def after(kind, signed, items):
+    now = CLOCK.now()
+    value = "true" if kind == render.AUTHORIZATION else True
+    answer = render.Answer(kind, value, CONTEXT, CLOCK.stamp(now), CLOCK.stamp(now + EXPIRES), now + EXPIRES)
+    canonical = render.batch([render.batch_item(answer) for _ in range(items)]) if items else answer.render()
+    if not signed:
+        return canonical
+    template = render.signature_template("EdDSA", KID, CTX_KEYS, False)
+    issued_at = CLOCK.stamp(now)
+    signature = template.render(issued_at, JWS, QH)
+    return render.signed_envelope(QH, issued_at, CLOCK.stamp(now + EXPIRES), canonical, signature)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--number", type=int, default=20000, help="iterations per case")
+    ap.add_argument("--batch", type=int, default=100, help="results in the batch case")
+    args = ap.parse_args()
+
+    cases = [
+        ("authorization, unsigned", render.AUTHORIZATION, False, 0, args.number),
+        ("authorization, signed", render.AUTHORIZATION, True, 0, args.number),
+        ("recognition, signed", render.RECOGNITION, True, 0, args.number),
+        (f"batch of {args.batch}, signed", render.AUTHORIZATION, True, args.batch, max(1, args.number // args.batch)),
+    ]
+    print(f"{'case':<28} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for name, kind, signed, items, number in cases:
+        # Retried once in case the two calls straddle a second boundary.
+        if before(kind, signed, items) != after(kind, signed, items) and before(kind, signed, items) != after(kind, signed, items):
+            print(f"[FAIL] {name}: the two paths render different bytes")
+            return 1
+        t_old = min(timeit.repeat(lambda: before(kind, signed, items), number=number, repeat=5)) / number
+        t_new = min(timeit.repeat(lambda: after(kind, signed, items), number=number, repeat=5)) / number
+        print(f"{name:<28} {t_old * 1e6:>10.2f} {t_new * 1e6:>10.2f} {t_old / t_new:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())